@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Benchmark hors ligne du parsing et de la classification des arrêtés.
+
+Mesure, sans accès au site BOVP, le débit de chaque étape sur les pages de résultats
+enregistrées dans fixtures/ et les titres de data/arretes.csv :
+- pages/s    : parsing d'une page de résultats (recherche des headings "Arrêté n°")
+- headings/s : extraction des métadonnées d'un arrêté (_parse_arrete_from_h3)
+- titles/s   : classification d'un titre (classify_arrete)
+- rows/s     : écriture des lignes dans le CSV (_save_to_csv)
+- starts/s   : démarrage à froid (import de scraper.py et construction du scraper, avec
+               ouverture du CSV et des index, dans un nouvel interpréteur), qui domine la
+               durée d'un sondage fréquent sans nouvel arrêté
+
+Les résultats sont comparés à benchmark_baseline.json pour repérer les régressions.
+
+Usage:
+    python benchmark.py                    # Mesurer et comparer à la baseline
+    python benchmark.py --update-baseline  # Enregistrer les mesures comme nouvelle baseline
+    python benchmark.py --check            # Code retour 1 en cas de régression (CI)
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+os.environ.setdefault('DRY_RUN', 'true')
+
+# Ajouter src au path
+ROOT_DIR = Path(__file__).parent
+sys.path.insert(0, str(ROOT_DIR / 'src'))
+
+from config import CSV_FILE, classify_arrete
+from arrete_index import ArreteIndex
+from csv_writer import CsvAppendWriter
+from location import extract_location
+from metrics import Metrics
+from parsers import PARSERS
+from scraper import ArretesScraper
+
+FIXTURES_DIR = ROOT_DIR / 'fixtures'
+BASELINE_FILE = ROOT_DIR / 'benchmark_baseline.json'
+
+# Baisse de débit tolérée avant de signaler une régression
+DEFAULT_TOLERANCE = 0.25
+
+
+def _measure(func: Callable[[], int], min_duration: float) -> Dict:
+    """
+    Exécute func en boucle pendant au moins min_duration secondes.
+
+    func retourne le nombre d'éléments traités à chaque appel. Le pic mémoire est
+    mesuré avec tracemalloc sur un appel séparé pour ne pas fausser le chronométrage ;
+    il ne couvre que les allocations Python (pas celles de libxml2 côté lxml).
+    """
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    items = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_duration:
+        items += func()
+        elapsed = time.perf_counter() - start
+
+    return {
+        'throughput': items / elapsed,
+        'peak_memory_kb': peak / 1024,
+    }
+
+
+def _make_scraper(engine: str) -> ArretesScraper:
+    """Scraper sans S3 ni chargement du CSV, avec le moteur de parsing demandé."""
+    instance = ArretesScraper.__new__(ArretesScraper)
+    instance.parser = PARSERS[engine]()
+    instance.existing_arretes = set()
+    instance.new_arretes = []
+    instance.index = ArreteIndex(':memory:', csv_path=None)
+    instance.index.open()
+    instance.parquet_store = None
+    instance._parquet_pending = False
+    instance.search_index = None
+    instance.metrics = Metrics()
+    return instance
+
+
+def bench_pages(engine: str, pages: List[str], min_duration: float) -> Dict:
+    """Débit de parsing des pages de résultats (pages/s)."""
+    parser = PARSERS[engine]()
+
+    def run():
+        for content in pages:
+            parser.find_arrete_headings(content)
+        return len(pages)
+
+    return _measure(run, min_duration)
+
+
+def bench_headings(engine: str, pages: List[str], min_duration: float) -> Dict:
+    """Débit d'extraction des métadonnées par heading (headings/s)."""
+    instance = _make_scraper(engine)
+    headings = [h for content in pages for h in instance.parser.find_arrete_headings(content)]
+
+    async def parse_all():
+        for heading in headings:
+            await instance._parse_arrete_from_h3(heading)
+
+    def run():
+        asyncio.run(parse_all())
+        return len(headings)
+
+    return _measure(run, min_duration)
+
+
+def bench_titles(titles: List[str], min_duration: float) -> Dict:
+    """Débit de classification des titres (titles/s)."""
+    def run():
+        for titre in titles:
+            classify_arrete(titre)
+        return len(titles)
+
+    return _measure(run, min_duration)
+
+
+def bench_rows(rows: List[Dict], min_duration: float) -> Dict:
+    """Débit d'écriture des lignes dans le CSV (rows/s), sur un fichier temporaire."""
+    instance = _make_scraper('bs4')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        instance.csv_writer = CsvAppendWriter(Path(tmp_dir) / 'arretes.csv')
+        instance.csv_writer.open()
+        instance.index.csv_path = instance.csv_writer.path
+
+        def run():
+            # Une sauvegarde par page de résultats, comme pendant un scraping
+            for start in range(0, len(rows), 50):
+                instance.new_arretes = rows[start:start + 50]
+                asyncio.run(instance._save_to_csv())
+            return len(rows)
+
+        try:
+            return _measure(run, min_duration)
+        finally:
+            instance.csv_writer.close()
+
+
+def bench_startup(min_duration: float) -> Dict:
+    """
+    Démarrage à froid (starts/s) : interpréteur lancé pour importer scraper.py et construire
+    ArretesScraper, comme au début de chaque run (réparation du CSV, ouverture du CSV en ajout
+    et des index déjà synchronisés avec lui). Le pic mémoire est celui des imports et de la
+    construction (tracemalloc dans le sous-processus).
+
+    Le scraper travaille sur une copie du projet (src/ lié, data/arretes.csv copié) pour ne
+    pas toucher à data/ ; un premier démarrage non chronométré y construit les index.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        project_dir = Path(tmp_dir)
+        (project_dir / 'src').symlink_to(ROOT_DIR / 'src', target_is_directory=True)
+        (project_dir / 'data').mkdir()
+        shutil.copyfile(CSV_FILE, project_dir / 'data' / CSV_FILE.name)
+        env = {**os.environ, 'PYTHONPATH': str(project_dir / 'src')}
+
+        def start(code: str) -> str:
+            return subprocess.run([sys.executable, '-c', code], env=env, cwd=project_dir,
+                                  check=True, capture_output=True, text=True).stdout
+
+        start("import scraper; scraper.ArretesScraper()")
+        # Dernière ligne : les logs du scraper sont aussi écrits sur la sortie standard
+        peak = int(start("import tracemalloc; tracemalloc.start(); import scraper; "
+                         "scraper.ArretesScraper(); print(tracemalloc.get_traced_memory()[1])").splitlines()[-1])
+
+        starts = 0
+        begin = time.perf_counter()
+        elapsed = 0.0
+        # Au moins 3 démarrages : un seul est trop sensible au cache disque
+        while elapsed < min_duration or starts < 3:
+            start("import scraper; scraper.ArretesScraper()")
+            starts += 1
+            elapsed = time.perf_counter() - begin
+
+    return {
+        'throughput': starts / elapsed,
+        'peak_memory_kb': peak / 1024,
+    }
+
+
+def run_benchmarks(min_duration: float) -> Dict:
+    """Lance toutes les mesures et retourne les résultats par étape."""
+    pages = [fixture.read_text(encoding='utf-8') for fixture in sorted(FIXTURES_DIR.glob('debug_page_*.html'))]
+    if not pages:
+        raise FileNotFoundError(f"Aucune page enregistrée dans {FIXTURES_DIR}")
+
+    with open(CSV_FILE, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    titles = [row['titre'] for row in rows]
+    # Lignes telles que produites par le parsing (avec la localisation, même si le CSV ne l'a pas encore)
+    rows = [row if 'arrondissement' in row else {**row, **extract_location(row['titre'])} for row in rows]
+
+    results = {}
+    for engine in PARSERS:
+        results[f'pages[{engine}]'] = {'unit': 'pages/s', **bench_pages(engine, pages, min_duration)}
+        results[f'headings[{engine}]'] = {'unit': 'headings/s', **bench_headings(engine, pages, min_duration)}
+    results['titles'] = {'unit': 'titles/s', **bench_titles(titles, min_duration)}
+    results['rows'] = {'unit': 'rows/s', **bench_rows(rows[:1000], min_duration)}
+    results['startup'] = {'unit': 'starts/s', **bench_startup(min_duration)}
+    return results
+
+
+def compare_to_baseline(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Affiche les mesures face à la baseline et retourne la liste des régressions."""
+    regressions = []
+    print(f"{'Étape':<16} {'Débit':>10} {'Unité':<11} {'Baseline':>10} {'Écart':>7}  {'Pic mémoire':>11}")
+    for stage, result in results.items():
+        reference = baseline.get('stages', {}).get(stage)
+        line = f"{stage:<16} {result['throughput']:>10.0f} {result['unit']:<11}"
+        if reference:
+            ratio = result['throughput'] / reference['throughput'] - 1
+            line += f" {reference['throughput']:>10.0f} {ratio:>+7.0%}"
+        else:
+            ratio = 0.0
+            line += f" {'-':>10} {'-':>7}"
+        line += f"  {result['peak_memory_kb']:>8.0f} Ko"
+        if ratio < -tolerance:
+            line += " ❌"
+            regressions.append(stage)
+        print(line)
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark hors ligne du parsing et de la classification")
+    arg_parser.add_argument('--min-duration', type=float, default=1.0,
+                            help="Durée minimale de mesure par étape, en secondes (défaut: 1)")
+    arg_parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                            help="Baisse de débit tolérée avant régression (défaut: 0.25 = 25%%)")
+    arg_parser.add_argument('--update-baseline', action='store_true',
+                            help="Enregistrer les mesures dans benchmark_baseline.json")
+    arg_parser.add_argument('--check', action='store_true',
+                            help="Code retour 1 si une étape régresse par rapport à la baseline")
+    args = arg_parser.parse_args()
+
+    # Les warnings du parsing (arrêtés sans explnum_id, etc.) n'ont pas d'intérêt ici
+    logging.disable(logging.WARNING)
+
+    results = run_benchmarks(args.min_duration)
+
+    baseline = {}
+    if BASELINE_FILE.exists():
+        baseline = json.loads(BASELINE_FILE.read_text(encoding='utf-8'))
+
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+
+    if args.update_baseline:
+        BASELINE_FILE.write_text(json.dumps({
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'stages': results,
+        }, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+        print(f"\n✓ Baseline enregistrée dans {BASELINE_FILE.name}")
+    elif regressions:
+        print(f"\n❌ Régressions détectées: {', '.join(regressions)}")
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,372 @@
+"""Index SQLite des arrêtés déjà scrapés, synchronisé avec le CSV."""
+import argparse
+import csv
+import hashlib
+import io
+import logging
+import sqlite3
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from config import CSV_FILE, INDEX_DB_FILE
+from dates import DATE_COLUMNS, to_iso_date
+from location import extract_location, normalize_voie, split_values
+
+logger = logging.getLogger(__name__)
+
+# Nombre de lignes insérées par requête lors d'une reconstruction
+BATCH_SIZE = 1000
+
+# Octets hachés au début et à la fin de la partie synchronisée du CSV
+FINGERPRINT_SIZE = 64 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS arretes (
+    numero_arrete TEXT PRIMARY KEY,
+    explnum_id INTEGER,
+    pdf_s3_url TEXT,
+    date_scrape TEXT,
+    date_publication TEXT,
+    date_signature TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_arretes_explnum_id ON arretes (explnum_id);
+CREATE INDEX IF NOT EXISTS idx_arretes_date_publication ON arretes (date_publication);
+CREATE INDEX IF NOT EXISTS idx_arretes_date_signature ON arretes (date_signature);
+CREATE TABLE IF NOT EXISTS arrete_locations (
+    numero_arrete TEXT NOT NULL,
+    arrondissement INTEGER,
+    voie TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_locations_arrondissement_voie ON arrete_locations (arrondissement, voie);
+CREATE INDEX IF NOT EXISTS idx_locations_voie ON arrete_locations (voie);
+CREATE INDEX IF NOT EXISTS idx_locations_numero ON arrete_locations (numero_arrete);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _to_int(value) -> Optional[int]:
+    """Convertit un explnum_id du CSV ('44443', '44443.0', '') en entier."""
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def location_rows(row: Dict) -> List[tuple]:
+    """
+    Lignes (numero_arrete, arrondissement, voie normalisée) de l'index de localisation d'un
+    arrêté : une par couple arrondissement/voie, None pour la partie inconnue. Les colonnes
+    `arrondissement` et `voies` sont recalculées depuis le titre si le CSV ne les a pas encore.
+    """
+    if 'arrondissement' not in row or 'voies' not in row:
+        row = {**row, **extract_location(row.get('titre') or '')}
+    arrondissements = [int(value) for value in split_values(row.get('arrondissement')) if value.isdigit()] or [None]
+    voies = [normalize_voie(voie) for voie in split_values(row.get('voies'))] or [None]
+    numero = str(row['numero_arrete'])
+    if arrondissements == [None] and voies == [None]:
+        return []
+    return [(numero, arrondissement, voie) for arrondissement in arrondissements for voie in voies]
+
+
+def iter_csv_rows(csv_path: Path, offset: int = 0) -> Iterator[Dict]:
+    """
+    Lit les lignes du CSV à partir d'un offset en octets (0 = tout le fichier).
+
+    Le CSV étant en ajout seul, l'offset d'une synchronisation précédente (sa taille à ce
+    moment-là) tombe toujours sur un début de ligne.
+    """
+    with open(csv_path, 'rb') as f:
+        header = next(csv.reader([f.readline().decode('utf-8')]))
+        if offset:
+            f.seek(offset)
+        reader = csv.DictReader(io.TextIOWrapper(f, encoding='utf-8', newline=''), fieldnames=header)
+        yield from reader
+
+
+def csv_fingerprint(csv_path: Path, size: int) -> str:
+    """
+    Empreinte (SHA-256) du début et de la fin des `size` premiers octets du CSV.
+
+    Mémorisée avec la taille au point de synchronisation : tant que le CSV est seulement
+    complété, l'empreinte de ses `size` premiers octets ne change pas. Un CSV réécrit en dehors
+    de rewrite_csv (édition manuelle, git checkout), même de taille égale ou supérieure, la change.
+    """
+    digest = hashlib.sha256()
+    with open(csv_path, 'rb') as f:
+        digest.update(f.read(min(size, FINGERPRINT_SIZE)))
+        tail_start = max(FINGERPRINT_SIZE, size - FINGERPRINT_SIZE)
+        if tail_start < size:
+            f.seek(tail_start)
+            digest.update(f.read(size - tail_start))
+    return digest.hexdigest()
+
+
+def csv_sync_point(csv_path: Optional[Path]) -> Tuple[int, str]:
+    """(taille, empreinte) actuelles du CSV, (0, '') s'il est absent."""
+    if not csv_path or not csv_path.exists():
+        return 0, ''
+    size = csv_path.stat().st_size
+    return size, csv_fingerprint(csv_path, size)
+
+
+def csv_appended_since(csv_path: Path, synced_size: Union[int, str, None],
+                       synced_hash: Optional[str]) -> Optional[int]:
+    """
+    Offset à partir duquel relire le CSV depuis une synchronisation (taille, empreinte), ou
+    None s'il faut tout reconstruire : point de synchronisation absent, CSV tronqué ou réécrit.
+    """
+    if not synced_size or int(synced_size) == 0 or not synced_hash:
+        return None
+    size = int(synced_size)
+    if size > csv_path.stat().st_size or csv_fingerprint(csv_path, size) != synced_hash:
+        return None
+    return size
+
+
+class ArreteIndex:
+    """
+    Index persistant des arrêtés, clé `numero_arrete`, indexé aussi sur `explnum_id`, sur les
+    dates de publication et de signature (ISO, requêtes par période) et sur la localisation
+    (arrondissement, voie normalisée) extraite du titre.
+
+    Le CSV reste la source de vérité : l'index est reconstructible à partir de lui.
+    La taille du CSV au moment de la dernière synchronisation est mémorisée, avec une
+    empreinte de son début et de sa fin ; au démarrage, seules les lignes ajoutées depuis
+    sont relues (le CSV est en ajout seul), ce qui garde un coût de démarrage constant quand
+    l'historique grossit. Un CSV réécrit entre-temps change l'empreinte : l'index est reconstruit.
+    """
+
+    def __init__(self, db_path: Union[Path, str] = INDEX_DB_FILE, csv_path: Optional[Path] = CSV_FILE):
+        self.db_path = db_path
+        self.csv_path = csv_path
+        self.conn: Optional[sqlite3.Connection] = None
+
+    def open(self, reset: bool = False):
+        """
+        Ouvre la base (mode WAL) et crée le schéma si nécessaire.
+
+        Avec `reset`, les tables de l'index (arretes, arrete_locations, meta) sont d'abord
+        supprimées, avant une reconstruction depuis le CSV : les autres tables de la base
+        (index plein texte) restent en place.
+        """
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        if reset:
+            for table in ('arrete_locations', 'arretes', 'meta'):
+                self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+        tables = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        rebuild = 'arretes' in tables and 'arrete_locations' not in tables
+        if 'arretes' in tables:
+            # Index créé avant les colonnes de date : les ajouter, puis les remplir par une reconstruction
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(arretes)")}
+            for name in DATE_COLUMNS:
+                if name not in columns:
+                    self.conn.execute(f"ALTER TABLE arretes ADD COLUMN {name} TEXT")
+                    rebuild = True
+        self.conn.executescript(SCHEMA)
+        # Index créé avant la table de localisation ou les colonnes de date : le reconstruire
+        if rebuild:
+            self._set_meta('csv_size', '0')
+        self.conn.commit()
+
+    def close(self):
+        """Ferme la base."""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def __contains__(self, numero_arrete: str) -> bool:
+        return self.contains(numero_arrete)
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM arretes").fetchone()[0]
+
+    def contains(self, numero_arrete: str) -> bool:
+        """Vérifie si un arrêté est déjà connu (recherche par clé primaire)."""
+        row = self.conn.execute(
+            "SELECT 1 FROM arretes WHERE numero_arrete = ?", (numero_arrete,)
+        ).fetchone()
+        return row is not None
+
+    def find_by_location(self, arrondissement: Optional[int] = None, voie: Optional[str] = None) -> List[str]:
+        """
+        Numéros des arrêtés d'un arrondissement et/ou d'une voie (recherche indexée).
+        La voie est comparée sous sa forme normalisée : "Rue d’Enghien" trouve "rue d'Enghien".
+        """
+        conditions = []
+        params: List = []
+        if arrondissement is not None:
+            conditions.append("arrondissement = ?")
+            params.append(arrondissement)
+        if voie:
+            conditions.append("voie = ?")
+            params.append(normalize_voie(voie))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self.conn.execute(
+            f"SELECT DISTINCT numero_arrete FROM arrete_locations {where} ORDER BY numero_arrete", params
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def voies_by_arrondissement(self, arrondissement: int) -> List[Tuple[str, int]]:
+        """Voies normalisées d'un arrondissement avec leur nombre d'arrêtés, les plus fréquentes d'abord."""
+        return self.conn.execute(
+            """
+            SELECT voie, COUNT(DISTINCT numero_arrete) AS nombre
+            FROM arrete_locations
+            WHERE arrondissement = ? AND voie IS NOT NULL
+            GROUP BY voie
+            ORDER BY nombre DESC, voie
+            """,
+            (arrondissement,)
+        ).fetchall()
+
+    def find_by_date(self, column: str = 'date_publication', start: Optional[date] = None,
+                     end: Optional[date] = None) -> List[Tuple[str, str]]:
+        """
+        (numéro, date ISO) des arrêtés dont la date de publication ou de signature est dans
+        [start, end] (bornes incluses, None = sans borne), par date croissante.
+
+        Les dates ISO se trient comme des chaînes : la recherche parcourt seulement la plage
+        demandée de l'index trié (B-tree) de la colonne, sans lire les autres arrêtés.
+        """
+        if column not in DATE_COLUMNS:
+            raise ValueError(f"Colonne de date inconnue: {column}")
+        conditions = [f"{column} IS NOT NULL"]
+        params: List[str] = []
+        if start is not None:
+            conditions.append(f"{column} >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            conditions.append(f"{column} <= ?")
+            params.append(end.isoformat())
+        return self.conn.execute(
+            f"SELECT numero_arrete, {column} FROM arretes WHERE {' AND '.join(conditions)} "
+            f"ORDER BY {column}, numero_arrete",
+            params
+        ).fetchall()
+
+    def upsert_many(self, rows: Iterable[Dict], commit: bool = True):
+        """Insère ou met à jour des arrêtés par lots (une requête pour tout le lot), avec leur localisation."""
+        rows = [row for row in rows if row.get('numero_arrete')]
+        self.conn.executemany(
+            """
+            INSERT INTO arretes (numero_arrete, explnum_id, pdf_s3_url, date_scrape,
+                                 date_publication, date_signature)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (numero_arrete) DO UPDATE SET
+                explnum_id = excluded.explnum_id,
+                pdf_s3_url = excluded.pdf_s3_url,
+                date_scrape = excluded.date_scrape,
+                date_publication = excluded.date_publication,
+                date_signature = excluded.date_signature
+            """,
+            (
+                (str(row['numero_arrete']), _to_int(row.get('explnum_id')),
+                 row.get('pdf_s3_url', ''), row.get('date_scrape', ''),
+                 to_iso_date(row.get('date_publication')) or None, to_iso_date(row.get('date_signature')) or None)
+                for row in rows
+            )
+        )
+        self.conn.executemany(
+            "DELETE FROM arrete_locations WHERE numero_arrete = ?",
+            ((str(row['numero_arrete']),) for row in rows)
+        )
+        self.conn.executemany(
+            "INSERT INTO arrete_locations (numero_arrete, arrondissement, voie) VALUES (?, ?, ?)",
+            (location for row in rows for location in location_rows(row))
+        )
+        if commit:
+            self.conn.commit()
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+    def mark_csv_synced(self):
+        """Mémorise la taille et l'empreinte actuelles du CSV comme point de synchronisation."""
+        size, fingerprint = csv_sync_point(self.csv_path)
+        self._set_meta('csv_size', str(size))
+        self._set_meta('csv_hash', fingerprint)
+        self.conn.commit()
+
+    def _iter_csv_rows(self, offset: int = 0) -> Iterator[Dict]:
+        return iter_csv_rows(self.csv_path, offset)
+
+    def _load_rows(self, rows: Iterator[Dict]) -> int:
+        count = 0
+        batch: List[Dict] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                self.upsert_many(batch, commit=False)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.upsert_many(batch, commit=False)
+            count += len(batch)
+        return count
+
+    def rebuild_from_csv(self) -> int:
+        """Reconstruit entièrement l'index à partir du CSV. Retourne le nombre de lignes lues."""
+        self.conn.execute("DELETE FROM arretes")
+        self.conn.execute("DELETE FROM arrete_locations")
+        count = 0
+        if self.csv_path and self.csv_path.exists():
+            count = self._load_rows(self._iter_csv_rows())
+        self.mark_csv_synced()
+        logger.info(f"Index des arrêtés reconstruit depuis le CSV: {count} lignes")
+        return count
+
+    def sync_with_csv(self):
+        """
+        Met l'index à jour avec le CSV.
+
+        Si le CSV a seulement grossi depuis la dernière synchronisation, seules les
+        nouvelles lignes sont lues ; sinon (CSV absent de l'index, réécrit, tronqué),
+        l'index est reconstruit.
+        """
+        if not self.csv_path or not self.csv_path.exists():
+            return
+
+        offset = csv_appended_since(self.csv_path, self._get_meta('csv_size'), self._get_meta('csv_hash'))
+        if offset is None:
+            self.rebuild_from_csv()
+        elif offset < self.csv_path.stat().st_size:
+            count = self._load_rows(self._iter_csv_rows(offset=offset))
+            self.mark_csv_synced()
+            logger.info(f"Index des arrêtés mis à jour: {count} nouvelles lignes du CSV")
+
+
+def main():
+    """Commandes de maintenance de l'index."""
+    parser = argparse.ArgumentParser(description="Index SQLite des arrêtés")
+    parser.add_argument('--rebuild', action='store_true', help="Reconstruire l'index depuis le CSV")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    index = ArreteIndex()
+    index.open()
+    try:
+        if args.rebuild:
+            index.rebuild_from_csv()
+        else:
+            index.sync_with_csv()
+        print(f"{len(index)} arrêtés dans l'index {index.db_path}")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Requêtes sur le dataset Parquet des arrêtés (filtres et colonnes appliqués à la lecture)."""
+import argparse
+import time
+from datetime import date
+from pathlib import Path
+from typing import List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from config import PARQUET_DIR
+from location import SEPARATOR
+from parquet_store import PARTITIONING
+
+
+def open_dataset(root: Path = PARQUET_DIR) -> ds.Dataset:
+    """Ouvre le dataset Parquet (la colonne `year` provient des répertoires year=YYYY)."""
+    return ds.dataset(str(root), format='parquet', partitioning=PARTITIONING)
+
+
+def build_filter(year: Optional[int] = None,
+                 concerne_circulation: Optional[bool] = None,
+                 concerne_stationnement: Optional[bool] = None,
+                 est_temporaire: Optional[bool] = None,
+                 published_from: Optional[date] = None,
+                 published_to: Optional[date] = None,
+                 arrondissement: Optional[int] = None) -> Optional[ds.Expression]:
+    """
+    Construit le prédicat pyarrow. Le filtre sur l'année élimine les partitions sans les
+    ouvrir ; les autres sont évalués sur les statistiques des row groups puis sur les lignes.
+    Les critères à None sont ignorés.
+    """
+    conditions = []
+    if year is not None:
+        conditions.append(ds.field('year') == year)
+    for name, value in (('concerne_circulation', concerne_circulation),
+                        ('concerne_stationnement', concerne_stationnement),
+                        ('est_temporaire', est_temporaire)):
+        if value is not None:
+            conditions.append(ds.field(name) == value)
+    if published_from is not None:
+        conditions.append(ds.field('date_publication') >= published_from)
+    if published_to is not None:
+        conditions.append(ds.field('date_publication') <= published_to)
+    if arrondissement is not None:
+        # Valeurs multiples "1;4" : l'arrondissement doit être l'une d'elles ("1" ne trouve pas "15")
+        conditions.append(pc.match_substring_regex(
+            ds.field('arrondissement'), pattern=f'(^|{SEPARATOR}){arrondissement}({SEPARATOR}|$)'))
+
+    if not conditions:
+        return None
+    expression = conditions[0]
+    for condition in conditions[1:]:
+        expression = expression & condition
+    return expression
+
+
+def query_arretes(columns: Optional[List[str]] = None, root: Path = PARQUET_DIR, **criteria) -> pa.Table:
+    """
+    Lit les arrêtés correspondant aux critères de `build_filter`, en ne décodant que les
+    colonnes demandées (toutes par défaut).
+
+    Exemple : les arrêtés de stationnement temporaires publiés en 2026
+        query_arretes(['numero_arrete', 'titre'], year=2026,
+                      concerne_stationnement=True, est_temporaire=True)
+    """
+    return open_dataset(root).to_table(columns=columns, filter=build_filter(**criteria))
+
+
+def _parse_bool(value: str) -> bool:
+    return value.lower() in ('true', '1', 'yes', 'oui')
+
+
+def main():
+    """Interroge le dataset en ligne de commande."""
+    parser = argparse.ArgumentParser(description="Requêtes sur le dataset Parquet des arrêtés")
+    parser.add_argument('--year', type=int, help="Année de publication")
+    parser.add_argument('--circulation', type=_parse_bool, help="true/false")
+    parser.add_argument('--stationnement', type=_parse_bool, help="true/false")
+    parser.add_argument('--temporaire', type=_parse_bool, help="true/false")
+    parser.add_argument('--from', dest='published_from', type=date.fromisoformat,
+                        help="Publié à partir du (AAAA-MM-JJ)")
+    parser.add_argument('--to', dest='published_to', type=date.fromisoformat,
+                        help="Publié jusqu'au (AAAA-MM-JJ)")
+    parser.add_argument('--arrondissement', type=int, help="Arrondissement cité par le titre (1 à 20)")
+    parser.add_argument('--columns', default='numero_arrete,date_publication,titre',
+                        help="Colonnes à lire, séparées par des virgules")
+    parser.add_argument('--count', action='store_true', help="Afficher seulement le nombre de résultats")
+    parser.add_argument('--limit', type=int, default=20, help="Nombre de lignes affichées")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = query_arretes(
+        columns=args.columns.split(','),
+        year=args.year,
+        concerne_circulation=args.circulation,
+        concerne_stationnement=args.stationnement,
+        est_temporaire=args.temporaire,
+        published_from=args.published_from,
+        published_to=args.published_to,
+        arrondissement=args.arrondissement,
+    )
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if not args.count:
+        print(table.slice(0, args.limit).to_pandas().to_string(index=False))
+    print(f"{table.num_rows} arrêtés ({elapsed_ms:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Classification des arrêtés par mots-clés du titre, en un seul parcours du titre."""
+import json
+import re
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Set
+
+# Catégories attendues dans le fichier de mots-clés
+CATEGORIES = ('stationnement_genant', 'circulation', 'stationnement', 'temporaire', 'permanent')
+STATIONNEMENT_GENANT, CIRCULATION, STATIONNEMENT, TEMPORAIRE, PERMANENT = (1 << bit for bit in range(len(CATEGORIES)))
+
+# Au-delà, les chevauchements de mots-clés sont gérés par un lookahead (plus lent) plutôt que fusionnés
+MAX_MERGED_PATTERNS = 5000
+
+
+def load_keywords(path: Path) -> Dict[str, List[str]]:
+    """Charge les tables de mots-clés (JSON : catégorie -> liste de mots-clés en minuscules)."""
+    data = json.loads(Path(path).read_text(encoding='utf-8'))
+    missing = [category for category in CATEGORIES if category not in data]
+    if missing:
+        raise ValueError(f"Catégories manquantes dans {path}: {', '.join(missing)}")
+    return {category: [str(mot).lower() for mot in data[category] if mot] for category in CATEGORIES}
+
+
+def _overlap_merges(keywords: Set[str], limit: int) -> Set[str]:
+    """
+    Ajoute aux mots-clés leurs fusions par chevauchement ("accès" + "stationnement" ->
+    "accèstationnement"), jusqu'à stabilité. Retourne un ensemble vide si la limite est dépassée.
+    """
+    patterns = set(keywords)
+    frontier = set(keywords)
+    while frontier:
+        merged = set()
+        for pattern in frontier:
+            for mot in keywords:
+                for size in range(1, min(len(pattern), len(mot))):
+                    if pattern.endswith(mot[:size]):
+                        merged.add(pattern + mot[size:])
+        frontier = merged - patterns
+        patterns |= frontier
+        if len(patterns) > limit:
+            return set()
+    return patterns
+
+
+def _trie_regex(patterns: Iterable[str]) -> str:
+    """Alternance factorisée en arbre de préfixes, qui retient le plus long motif à une position."""
+    trie: Dict = {}
+    for pattern in patterns:
+        node = trie
+        for char in pattern:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # Motif terminé ici : la suite est optionnelle (gourmande, donc le plus long d'abord)
+        return f"(?:{body})?" if '' in node else body
+
+    return build(trie)
+
+
+class KeywordClassifier:
+    """
+    Moteur de classification compilé une fois pour toutes à partir des tables de mots-clés.
+
+    Tous les mots-clés sont réunis dans une seule expression régulière en arbre de préfixes,
+    et le titre est parcouru une seule fois (findall). Une recherche sans chevauchement ne
+    retient que le plus long motif à chaque position et reprend après lui ; deux précautions
+    rendent le résultat identique à un test `mot in titre` par mot-clé :
+    - chaque motif porte les catégories de tous les mots-clés qu'il contient
+      ("stationnement gênant" implique "stationnement", "provisoirement" implique "provisoire") ;
+    - les mots-clés qui peuvent se chevaucher sont aussi ajoutés fusionnés
+      ("accès" + "stationnement" -> "accèstationnement").
+    """
+
+    def __init__(self, keywords: Mapping[str, List[str]]):
+        self.keywords = {category: list(keywords.get(category, [])) for category in CATEGORIES}
+        all_keywords = {mot for mots in self.keywords.values() for mot in mots}
+
+        patterns = _overlap_merges(all_keywords, MAX_MERGED_PATTERNS)
+        if patterns:
+            regex = _trie_regex(patterns)
+        else:
+            # Trop de fusions : le lookahead teste chaque position (chevauchements inclus)
+            patterns = all_keywords
+            regex = f"(?=({_trie_regex(patterns)}))"
+
+        # Catégories de chaque motif, en masque de bits (une catégorie par bit, dans l'ordre de CATEGORIES)
+        self.mask_by_pattern: Dict[str, int] = {
+            pattern: sum(
+                1 << bit
+                for bit, category in enumerate(CATEGORIES)
+                if any(mot in pattern for mot in self.keywords[category])
+            )
+            for pattern in patterns
+        }
+        # Sans mot-clé, un motif qui ne correspond jamais
+        self.pattern = re.compile(regex if all_keywords else r"(?!)")
+
+    @classmethod
+    def from_file(cls, path: Path) -> 'KeywordClassifier':
+        return cls(load_keywords(path))
+
+    def _mask(self, titre: str) -> int:
+        mask = 0
+        for match in self.pattern.findall(titre.lower()):
+            mask |= self.mask_by_pattern[match]
+        return mask
+
+    def categories(self, titre: str) -> FrozenSet[str]:
+        """Catégories dont au moins un mot-clé apparaît dans le titre."""
+        mask = self._mask(titre)
+        return frozenset(category for bit, category in enumerate(CATEGORIES) if mask & (1 << bit))
+
+    def classify(self, titre: str) -> Dict[str, bool]:
+        """
+        Args:
+            titre: Titre complet de l'arrêté
+
+        Returns:
+            Dict avec clés: concerne_circulation, concerne_stationnement, est_temporaire
+        """
+        mask = self._mask(titre)
+        est_temporaire = bool(mask & TEMPORAIRE)
+
+        # Cas spécial : "stationnement gênant la circulation" est un arrêté de stationnement UNIQUEMENT
+        # Il ne s'agit pas d'un arrêté de circulation, mais d'un arrêté interdisant le stationnement
+        # pour ne pas gêner la circulation
+        if mask & STATIONNEMENT_GENANT:
+            return {
+                'concerne_circulation': False,
+                'concerne_stationnement': True,
+                'est_temporaire': est_temporaire
+            }
+
+        # Temporaire si mots-clés présents, permanent sinon (les mots-clés "permanent" ne changent rien)
+        return {
+            'concerne_circulation': bool(mask & CIRCULATION),
+            'concerne_stationnement': bool(mask & STATIONNEMENT),
+            'est_temporaire': est_temporaire
+        }
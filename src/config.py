@@ -1,15 +1,34 @@
 """Configuration pour le scraper d'arrêtés de Paris."""
 import os
+from functools import lru_cache
 from pathlib import Path
-from dotenv import load_dotenv
-
-# Charger les variables d'environnement
-load_dotenv()
+from classifier import KeywordClassifier
 
 # Chemins
 PROJECT_ROOT = Path(__file__).parent.parent
+
+# Charger les variables d'environnement du fichier .env (src/ ou racine du projet), s'il existe :
+# sans fichier (GitHub Actions, variables déjà exportées), python-dotenv n'est pas importé
+for _env_file in (Path(__file__).parent / '.env', PROJECT_ROOT / '.env'):
+    if _env_file.is_file():
+        from dotenv import load_dotenv
+        load_dotenv(_env_file)
+        break
 DATA_DIR = PROJECT_ROOT / "data"
 CSV_FILE = DATA_DIR / "arretes.csv"
+INDEX_DB_FILE = DATA_DIR / "arretes_index.sqlite"  # Index des arrêtés, reconstructible depuis le CSV
+# Index des PDFs par contenu (SHA-256 -> clé S3), reconstructible seulement depuis le bucket :
+# base séparée, sauvegardée dans le bucket à la fin de chaque run qui l'a modifiée
+CONTENT_INDEX_DB_FILE = DATA_DIR / "pdf_contents.sqlite"
+# Texte extrait des PDFs, reconstructible seulement en relisant tous les PDFs : base séparée
+TEXT_DB_FILE = DATA_DIR / "arretes_texts.sqlite"
+CRAWL_STATE_FILE = DATA_DIR / "crawl_state.json"  # High-water mark du crawl incrémental
+CHECKPOINT_FILE = DATA_DIR / "checkpoint.json"  # Reprise d'un crawl interrompu (--resume)
+PARQUET_DIR = DATA_DIR / "parquet"  # Dataset Parquet partitionné par année, reconstructible depuis le CSV
+# Mots-clés de classification des titres (circulation, stationnement, temporaire)
+CLASSIFICATION_KEYWORDS_FILE = Path(
+    os.getenv("CLASSIFICATION_KEYWORDS_FILE", Path(__file__).parent / "classification_keywords.json")
+)
 
 # URL du site
 BASE_URL = "https://bovp.apps.paris.fr"
@@ -28,14 +47,87 @@ MAX_CONCURRENT_PAGES = int(os.getenv("MAX_CONCURRENT_PAGES", "5"))
 MAX_PAGES_TO_SCRAPE = int(os.getenv("MAX_PAGES_TO_SCRAPE", "0"))  # 0 = toutes
 DRY_RUN = os.getenv("DRY_RUN", "false").lower() in ("true", "1", "yes")
 
+# Limitation adaptative du débit (AIMD) vers BOVP
+# La concurrence démarre à MAX_CONCURRENT_PAGES, augmente tant que le site répond vite
+# et est divisée par deux sur 429 / 5xx / timeout, entre les bornes ci-dessous
+ADAPTIVE_MIN_CONCURRENCY = int(os.getenv("ADAPTIVE_MIN_CONCURRENCY", "1"))
+ADAPTIVE_MAX_CONCURRENCY = int(os.getenv("ADAPTIVE_MAX_CONCURRENCY", "10"))
+# Plafond de requêtes par seconde (token bucket). Par défaut, l'ancien rythme :
+# MAX_CONCURRENT_PAGES requêtes toutes les SCRAPE_DELAY_SECONDS secondes
+MAX_REQUESTS_PER_SECOND = float(os.getenv(
+    "MAX_REQUESTS_PER_SECOND",
+    str(MAX_CONCURRENT_PAGES / SCRAPE_DELAY_SECONDS if SCRAPE_DELAY_SECONDS > 0 else 0)
+))  # 0 = pas de plafond
+
+# Pipeline producteur/consommateur (pages de résultats -> téléchargement -> upload -> CSV)
+# Taille maximale des files entre les étapes : quand une file est pleine, l'étape amont attend
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "100"))
+
 # Filtrage des arrêtés
 # Options: "all" (tous), "circulation" (seulement circulation), "stationnement" (seulement stationnement)
 FILTER_TYPE = os.getenv("FILTER_TYPE", "all").lower()
 
+# Moteur de parsing des pages de résultats
+# Options: "bs4" (BeautifulSoup, historique), "lxml" (XPath compilés, beaucoup plus rapide)
+PARSER_ENGINE = os.getenv("PARSER_ENGINE", "bs4").lower()
+
 # Timeouts Playwright (en millisecondes)
 PAGE_LOAD_TIMEOUT = int(os.getenv("PAGE_LOAD_TIMEOUT", "90000"))  # 90 secondes pour charger une page
 PDF_DOWNLOAD_TIMEOUT = int(os.getenv("PDF_DOWNLOAD_TIMEOUT", "60000"))  # 60 secondes pour télécharger un PDF
 
+# Interception des requêtes des pages Playwright : seul le HTML des pages est utile au parsing,
+# les autres ressources et les appels AJAX de l'OPAC sont abandonnés sans être téléchargés
+BLOCK_RESOURCES = os.getenv("BLOCK_RESOURCES", "true").lower() in ("true", "1", "yes")
+BLOCKED_RESOURCE_TYPES = [
+    t.strip().lower() for t in os.getenv("BLOCKED_RESOURCE_TYPES", "image,media,font,stylesheet,script").split(",")
+    if t.strip()
+]
+BLOCKED_URL_PATTERNS = [
+    p.strip() for p in os.getenv("BLOCKED_URL_PATTERNS", "ajax.php,cart_info.php").split(",") if p.strip()
+]
+
+# Nombre de pages Playwright utilisées pour charger les pages de résultats en parallèle
+# 1 = chargement séquentiel ; >1 = pool de pages (utile pour les backfills complets)
+LISTING_POOL_SIZE = int(os.getenv("LISTING_POOL_SIZE", "1"))
+
+# Client HTTP pour le téléchargement des PDFs (connexions keep-alive mutualisées)
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))  # Connexions simultanées au total
+HTTP_POOL_SIZE_PER_HOST = int(os.getenv("HTTP_POOL_SIZE_PER_HOST", "10"))  # Connexions simultanées vers BOVP
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))  # Secondes avant fermeture d'une connexion inactive
+
+# Transfert des PDFs en streaming (BOVP -> S3) pour borner la mémoire
+PDF_CHUNK_SIZE = int(os.getenv("PDF_CHUNK_SIZE", str(64 * 1024)))  # Taille des blocs lus sur la réponse HTTP
+PDF_SPOOL_THRESHOLD = int(os.getenv("PDF_SPOOL_THRESHOLD", str(1024 * 1024)))  # Au-delà, le PDF est stocké sur disque
+S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", str(8 * 1024 * 1024)))  # Upload multipart au-delà
+S3_MULTIPART_CHUNKSIZE = int(os.getenv("S3_MULTIPART_CHUNKSIZE", str(8 * 1024 * 1024)))  # Taille des parts
+
+# Upload S3 : les appels boto3 (bloquants) tournent dans un pool de threads dédié
+S3_UPLOAD_WORKERS = int(os.getenv("S3_UPLOAD_WORKERS", "8"))  # Uploads simultanés au maximum
+# Connexions HTTP du client S3, partagées par tous les threads (multipart compris)
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", str(2 * S3_UPLOAD_WORKERS)))
+# Inventaire des clés S3 existantes (un listing par année au lieu d'un head_object par PDF)
+S3_INVENTORY_TTL = float(os.getenv("S3_INVENTORY_TTL", "3600"))  # Secondes avant relisting, 0 = désactivé
+
+# Index plein texte (FTS5) des arrêtés dans data/arretes_index.sqlite, mis à jour à chaque sauvegarde du CSV
+FULLTEXT_INDEX = os.getenv("FULLTEXT_INDEX", "true").lower() in ("true", "1", "yes")
+
+# Extraction du texte des PDFs (table arrete_texts de l'index SQLite) pendant le scraping
+PDF_TEXT_EXTRACTION = os.getenv("PDF_TEXT_EXTRACTION", "false").lower() in ("true", "1", "yes")
+# Processus d'extraction (CPU) : par défaut un par cœur
+TEXT_EXTRACTION_WORKERS = int(os.getenv("TEXT_EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+
+# Export Parquet (data/parquet/year=YYYY/), mis à jour à chaque sauvegarde du CSV
+PARQUET_EXPORT = os.getenv("PARQUET_EXPORT", "true").lower() in ("true", "1", "yes")
+
+# Métriques par étape écrites à la fin de chaque run : fichier texte Prometheus (collecteur textfile
+# de node_exporter) et résumé JSON
+METRICS_EXPORT = os.getenv("METRICS_EXPORT", "true").lower() in ("true", "1", "yes")
+METRICS_TEXTFILE = Path(os.getenv("METRICS_TEXTFILE", str(DATA_DIR / "metrics" / "scraper.prom")))
+RUN_SUMMARY_FILE = Path(os.getenv("RUN_SUMMARY_FILE", str(DATA_DIR / "metrics" / "run_summary.json")))
+
+# Rapports du profilage (python scraper.py --profile), un sous-répertoire par run
+PROFILE_DIR = DATA_DIR / "profile"
+
 # Pagination
 RESULTS_PER_PAGE = 50  # Compromis entre vitesse et nombre de requêtes
 
@@ -53,80 +145,34 @@ CSV_COLUMNS = [
     "est_temporaire",            # Booléen: arrêté temporaire (vs permanent)
     "explnum_id",
     "pdf_s3_url",
-    "date_scrape"
+    "date_scrape",
+    # Colonnes ajoutées après la publication du CSV : toujours en fin de ligne, pour ne pas
+    # décaler les colonnes des lecteurs qui accèdent au CSV par position
+    "arrondissement",            # Arrondissements cités par le titre, séparés par ';' ("1;4")
+    "voies"                      # Voies citées par le titre, séparées par ';'
 ]
 
 # Fonctions de classification des arrêtés
+@lru_cache(maxsize=1)
+def get_classifier():
+    """Moteur de classification, compilé au premier appel depuis CLASSIFICATION_KEYWORDS_FILE."""
+    return KeywordClassifier.from_file(CLASSIFICATION_KEYWORDS_FILE)
+
+
 def classify_arrete(titre: str) -> dict:
     """
     Analyse le titre d'un arrêté pour extraire ses caractéristiques.
 
+    Les mots-clés (circulation, stationnement, temporaire) sont définis dans
+    CLASSIFICATION_KEYWORDS_FILE et recherchés en un seul parcours du titre.
+
     Args:
         titre: Titre complet de l'arrêté
 
     Returns:
         Dict avec clés: concerne_circulation, concerne_stationnement, est_temporaire
     """
-    titre_lower = titre.lower()
-
-    # Cas spécial : "stationnement gênant la circulation" est un arrêté de stationnement UNIQUEMENT
-    # Il ne s'agit pas d'un arrêté de circulation, mais d'un arrêté interdisant le stationnement
-    # pour ne pas gêner la circulation
-    if 'stationnement gênant' in titre_lower or 'stationnement génant' in titre_lower:
-        return {
-            'concerne_circulation': False,
-            'concerne_stationnement': True,
-            'est_temporaire': 'à titre provisoire' in titre_lower or 'provisoire' in titre_lower or 'temporaire' in titre_lower
-        }
-
-    # Mots-clés pour la circulation
-    mots_circulation = [
-        'circulation',
-        'sens unique',
-        'sens interdit',
-        'voie',
-        'interdiction de circuler',
-        'accès',
-        'fermeture',
-        'déviation',
-        'circulation générale',
-    ]
-
-    # Mots-clés pour le stationnement
-    mots_stationnement = [
-        'stationnement',
-        'parking',
-        'zone bleue',
-        'livraison',
-        'règles de stationnement',
-    ]
-
-    # Mots-clés pour temporaire
-    mots_temporaire = [
-        'à titre provisoire',
-        'provisoire',
-        'temporaire',
-        'provisoirement',
-    ]
-
-    # Mots-clés pour permanent (rare mais possible)
-    mots_permanent = [
-        'permanent',
-        'définitif',
-        'définitiv',
-    ]
-
-    concerne_circulation = any(mot in titre_lower for mot in mots_circulation)
-    concerne_stationnement = any(mot in titre_lower for mot in mots_stationnement)
-
-    # Temporaire si mots-clés présents, permanent sinon
-    est_temporaire = any(mot in titre_lower for mot in mots_temporaire)
-
-    return {
-        'concerne_circulation': concerne_circulation,
-        'concerne_stationnement': concerne_stationnement,
-        'est_temporaire': est_temporaire
-    }
+    return get_classifier().classify(titre)
 
 
 def should_keep_arrete(classification: dict) -> bool:
@@ -170,6 +216,23 @@ def validate_config():
     if FILTER_TYPE not in ["all", "circulation", "stationnement"]:
         errors.append(f"FILTER_TYPE invalide: '{FILTER_TYPE}' (options: all, circulation, stationnement)")
 
+    # Valider PARSER_ENGINE
+    if PARSER_ENGINE not in ["bs4", "lxml"]:
+        errors.append(f"PARSER_ENGINE invalide: '{PARSER_ENGINE}' (options: bs4, lxml)")
+
+    # Valider BLOCKED_RESOURCE_TYPES (types de ressources Playwright, le document n'est jamais bloqué)
+    from request_blocker import RESOURCE_TYPES
+    unknown_types = [t for t in BLOCKED_RESOURCE_TYPES if t not in RESOURCE_TYPES or t == 'document']
+    if BLOCK_RESOURCES and unknown_types:
+        errors.append(f"BLOCKED_RESOURCE_TYPES invalide: {', '.join(unknown_types)} "
+                      f"(options: {', '.join(t for t in RESOURCE_TYPES if t != 'document')})")
+
+    # Compiler les mots-clés de classification (fichier manquant ou incomplet)
+    try:
+        get_classifier()
+    except (OSError, ValueError) as e:
+        errors.append(f"CLASSIFICATION_KEYWORDS_FILE invalide: {e}")
+
     if errors:
         raise ValueError(f"Configuration invalide: {', '.join(errors)}")
 
@@ -0,0 +1,253 @@
+"""Index des PDFs par contenu (SHA-256) : clé S3 canonique de chaque document."""
+import argparse
+import csv
+import hashlib
+import logging
+import sqlite3
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from config import CONTENT_INDEX_DB_FILE, CSV_FILE, INDEX_DB_FILE, PDF_CHUNK_SIZE, S3_UPLOAD_WORKERS
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pdf_contents (
+    sha256 TEXT PRIMARY KEY,
+    s3_key TEXT NOT NULL,
+    size INTEGER,
+    numero_arrete TEXT,
+    created_at TEXT
+);
+"""
+
+# Préfixe des PDFs dans le bucket (voir S3Uploader.build_s3_key)
+S3_PREFIX = 'arretes/'
+# Copie de la base dans le bucket, hors du préfixe des PDFs
+BUCKET_KEY = 'index/pdf_contents.sqlite'
+
+
+def numero_from_key(s3_key: str) -> Optional[str]:
+    """Numéro d'arrêté d'une clé S3 : "arretes/2025/2025_T_17858_a1b2c3d4.pdf" -> "2025 T 17858"."""
+    filename = s3_key.rsplit('/', 1)[-1]
+    if not filename.endswith('.pdf') or '_' not in filename:
+        return None
+    return filename[:-len('.pdf')].rsplit('_', 1)[0].replace('_', ' ')
+
+
+def key_from_url(s3_url: str) -> Optional[str]:
+    """Clé S3 d'une URL "s3://bucket/arretes/..." (None pour les valeurs d'erreur du CSV)."""
+    if not s3_url or not s3_url.startswith('s3://'):
+        return None
+    parts = s3_url[len('s3://'):].split('/', 1)
+    return parts[1] if len(parts) == 2 else None
+
+
+class ContentIndex:
+    """
+    Association SHA-256 du contenu -> clé S3 canonique (la première clé sous laquelle ce
+    contenu a été uploadé).
+
+    Reconstructible seulement depuis le bucket (le hash n'apparaît que dans le contenu des
+    PDFs) : la base est séparée de l'index des arrêtés, que le scraper peut reconstruire à
+    tout moment depuis le CSV, et une copie est gardée dans le bucket (`BUCKET_KEY`). Le
+    scraper y fusionne la copie du bucket avant la première déduplication du run et la
+    remplace à la fin du run s'il a ajouté des contenus (voir S3Uploader).
+    """
+
+    def __init__(self, db_path: Union[Path, str] = CONTENT_INDEX_DB_FILE,
+                 legacy_db_path: Optional[Path] = None):
+        """
+        Args:
+            legacy_db_path: Base d'où reprendre la table pdf_contents à la création de la base
+                (index des arrêtés, qui contenait l'index des contenus auparavant)
+        """
+        self.db_path = db_path
+        self.legacy_db_path = legacy_db_path
+        self.conn: Optional[sqlite3.Connection] = None
+        # Contenus enregistrés depuis l'ouverture (la copie du bucket est alors à remplacer)
+        self.added = 0
+
+    def open(self):
+        """Ouvre la base (mode WAL) et crée le schéma si nécessaire."""
+        created = str(self.db_path) == ':memory:' or not Path(self.db_path).exists()
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        if created and self.legacy_db_path is not None and Path(self.legacy_db_path).exists():
+            count = self.merge(self.legacy_db_path)
+            if count:
+                logger.info(f"Index des contenus repris de {self.legacy_db_path}: {count} contenus")
+
+    def close(self):
+        """Ferme la base."""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM pdf_contents").fetchone()[0]
+
+    def get(self, sha256: str) -> Optional[str]:
+        """Clé S3 canonique d'un contenu déjà uploadé, ou None."""
+        row = self.conn.execute("SELECT s3_key FROM pdf_contents WHERE sha256 = ?", (sha256,)).fetchone()
+        return row[0] if row else None
+
+    def add(self, sha256: str, s3_key: str, size: int, numero_arrete: Optional[str]):
+        """Enregistre un contenu uploadé. La première clé enregistrée reste la clé canonique."""
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO pdf_contents (sha256, s3_key, size, numero_arrete, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (sha256, s3_key, size, numero_arrete, datetime.now().isoformat())
+        )
+        self.conn.commit()
+        self.added += cursor.rowcount
+
+    def merge(self, db_path: Union[Path, str]) -> int:
+        """
+        Ajoute les contenus d'une autre base (copie du bucket, ancienne base) absents de
+        l'index. Une clé canonique déjà connue n'est pas remplacée. Retourne le nombre de
+        contenus ajoutés.
+        """
+        self.conn.execute("ATTACH DATABASE ? AS other", (str(db_path),))
+        try:
+            has_table = self.conn.execute(
+                "SELECT 1 FROM other.sqlite_master WHERE type = 'table' AND name = 'pdf_contents'"
+            ).fetchone()
+            if not has_table:
+                return 0
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO pdf_contents (sha256, s3_key, size, numero_arrete, created_at) "
+                "SELECT sha256, s3_key, size, numero_arrete, created_at FROM other.pdf_contents"
+            )
+            self.conn.commit()
+            return cursor.rowcount
+        finally:
+            self.conn.execute("DETACH DATABASE other")
+
+    @staticmethod
+    def download_from_bucket(s3_client, bucket_name: str, path: Path) -> bool:
+        """
+        Télécharge la copie du bucket dans `path` (sans utiliser la connexion : appelable
+        depuis un thread d'upload). Retourne False si le bucket n'en a pas encore.
+        """
+        from botocore.exceptions import ClientError
+
+        try:
+            body = s3_client.get_object(Bucket=bucket_name, Key=BUCKET_KEY)['Body']
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                return False
+            raise
+        with open(path, 'wb') as f:
+            for chunk in body.iter_chunks(PDF_CHUNK_SIZE):
+                f.write(chunk)
+        return True
+
+    def upload_to_bucket(self, s3_client, bucket_name: str):
+        """Remplace la copie du bucket par un instantané cohérent de la base (API de sauvegarde SQLite)."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            snapshot_path = Path(tmp_dir) / 'pdf_contents.sqlite'
+            snapshot = sqlite3.connect(str(snapshot_path))
+            try:
+                self.conn.backup(snapshot)
+            finally:
+                snapshot.close()
+            with open(snapshot_path, 'rb') as f:
+                s3_client.upload_fileobj(f, bucket_name, BUCKET_KEY,
+                                         ExtraArgs={'ContentType': 'application/vnd.sqlite3'})
+        logger.info(f"Index des contenus sauvegardé dans le bucket: {len(self)} contenus ({BUCKET_KEY})")
+
+    def rebuild_from_bucket(self, s3_client, bucket_name: str, workers: int = S3_UPLOAD_WORKERS) -> int:
+        """
+        Reconstruit l'index en relisant tous les PDFs du bucket (coûteux : chaque objet est
+        téléchargé pour être haché). Parmi des objets identiques, le plus ancien est canonique.
+
+        Returns:
+            Nombre d'objets lus
+        """
+        objects: List[Dict] = []
+        paginator = s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=S3_PREFIX):
+            objects.extend(page.get('Contents', []))
+        objects.sort(key=lambda obj: (obj['LastModified'], obj['Key']))
+        logger.info(f"Reconstruction de l'index des contenus: {len(objects)} PDFs à hacher dans {bucket_name}")
+
+        def sha256_of(key: str) -> str:
+            digest = hashlib.sha256()
+            body = s3_client.get_object(Bucket=bucket_name, Key=key)['Body']
+            for chunk in body.iter_chunks(PDF_CHUNK_SIZE):
+                digest.update(chunk)
+            return digest.hexdigest()
+
+        self.conn.execute("DELETE FROM pdf_contents")
+        duplicates = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # map conserve l'ordre : les objets les plus anciens sont insérés en premier
+            hashes = executor.map(sha256_of, [obj['Key'] for obj in objects])
+            for count, (obj, sha256) in enumerate(zip(objects, hashes), start=1):
+                canonical_key = self.get(sha256)
+                if canonical_key:
+                    duplicates += 1
+                    logger.info(f"Contenu identique: {obj['Key']} = {canonical_key}")
+                else:
+                    self.add(sha256, obj['Key'], obj['Size'], numero_from_key(obj['Key']))
+                if count % 500 == 0:
+                    logger.info(f"{count}/{len(objects)} PDFs hachés")
+
+        logger.info(f"Index des contenus reconstruit: {len(self)} contenus distincts, {duplicates} doublons")
+        return len(objects)
+
+
+def find_republished(csv_path: Path = CSV_FILE) -> List[Dict]:
+    """
+    Arrêtés du CSV dont le PDF pointe vers le contenu d'un autre arrêté (document republié
+    sous un autre numéro).
+    """
+    republished = []
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            s3_key = key_from_url(row.get('pdf_s3_url', ''))
+            original = numero_from_key(s3_key) if s3_key else None
+            if original and original != row['numero_arrete']:
+                republished.append({'numero_arrete': row['numero_arrete'], 'original': original,
+                                    'pdf_s3_url': row['pdf_s3_url']})
+    return republished
+
+
+def main():
+    """Commandes de maintenance de l'index des contenus."""
+    parser = argparse.ArgumentParser(description="Index des PDFs par contenu (SHA-256)")
+    parser.add_argument('--rebuild-from-bucket', action='store_true',
+                        help="Reconstruire l'index en hachant tous les PDFs du bucket S3")
+    parser.add_argument('--republished', action='store_true',
+                        help="Lister les arrêtés du CSV dont le PDF est identique à celui d'un autre arrêté")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.republished:
+        for row in find_republished():
+            print(f"{row['numero_arrete']} -> même PDF que {row['original']} ({row['pdf_s3_url']})")
+        return
+
+    index = ContentIndex(legacy_db_path=INDEX_DB_FILE)
+    index.open()
+    try:
+        if args.rebuild_from_bucket:
+            from s3_uploader import S3Uploader
+            uploader = S3Uploader(dry_run=False)
+            index.rebuild_from_bucket(uploader.s3_client, uploader.bucket_name)
+            index.upload_to_bucket(uploader.s3_client, uploader.bucket_name)
+        print(f"{len(index)} contenus dans l'index {index.db_path}")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""État persistant du crawl : high-water mark des résultats déjà vus et checkpoint de reprise."""
+import csv
+import json
+import logging
+import os
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import CHECKPOINT_FILE, CRAWL_STATE_FILE, CSV_FILE
+from dates import DATE_COLUMNS, parse_date, to_iso_date
+
+logger = logging.getLogger(__name__)
+
+
+def format_date(value: Optional[date]) -> Optional[str]:
+    """
+    Formate une date au format ISO ('2025-10-24'), comme le CSV, None si absente.
+    Les fichiers écrits avant la migration (format BOVP '24/10/2025') restent lisibles : parse_date
+    accepte les deux formats.
+    """
+    return value.isoformat() if value else None
+
+
+def write_json_atomic(path: Path, data: Dict):
+    """
+    Écrit un fichier JSON de façon atomique : fichier temporaire synchronisé sur disque
+    puis renommé. Un crash laisse soit l'ancienne version, soit la nouvelle, jamais un
+    fichier tronqué.
+    """
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class CrawlState:
+    """
+    High-water mark du crawl : plus grand `explnum_id` et plus récente `date_publication`
+    vus lors des crawls précédents.
+
+    Les résultats BOVP sont triés par date de publication décroissante : dès qu'un résultat
+    est à la fois sous le plus grand explnum_id connu et publié avant la date la plus
+    récente connue, tout ce qui suit a déjà été vu et le parcours peut s'arrêter. Les
+    arrêtés publiés le même jour que la marque sont encore parsés (l'ordre au sein d'une
+    même journée n'est pas garanti) et dédupliqués par l'index.
+
+    La marque n'avance qu'à la fin d'un crawl complet (arrivé à la marque précédente ou à
+    la dernière page) : un crawl interrompu ou limité par MAX_PAGES_TO_SCRAPE ne doit pas
+    faire oublier les pages qu'il n'a pas parcourues.
+    """
+
+    def __init__(self, path: Path = CRAWL_STATE_FILE, csv_path: Optional[Path] = CSV_FILE):
+        self.path = path
+        self.csv_path = csv_path
+        self.max_explnum_id: Optional[int] = None
+        self.latest_date_publication: Optional[date] = None
+        # Plus hauts résultats vus pendant le crawl en cours (y compris ceux écartés par FILTER_TYPE)
+        self.seen_max_explnum_id: Optional[int] = None
+        self.seen_latest_date_publication: Optional[date] = None
+
+    @property
+    def has_mark(self) -> bool:
+        return self.max_explnum_id is not None
+
+    def load(self):
+        """Charge l'état depuis le fichier JSON, ou l'initialise depuis le CSV s'il n'existe pas."""
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding='utf-8'))
+                self.max_explnum_id = _to_int(data.get('max_explnum_id'))
+                self.latest_date_publication = parse_date(data.get('latest_date_publication') or '')
+                logger.info(f"État du crawl chargé: {self.describe()}")
+                return
+            except (OSError, ValueError) as e:
+                logger.warning(f"État du crawl illisible ({e}), reconstruction depuis le CSV")
+        self.bootstrap_from_csv()
+
+    def bootstrap_from_csv(self):
+        """Initialise la marque à partir des arrêtés déjà présents dans le CSV."""
+        self.max_explnum_id = None
+        self.latest_date_publication = None
+        if self.csv_path and self.csv_path.exists():
+            with open(self.csv_path, newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    self._raise_mark(_to_int(row.get('explnum_id')), parse_date(row.get('date_publication') or ''))
+        logger.info(f"État du crawl initialisé depuis le CSV: {self.describe()}")
+
+    def _raise_mark(self, explnum_id: Optional[int], date_publication: Optional[date]):
+        if explnum_id is not None and (self.max_explnum_id is None or explnum_id > self.max_explnum_id):
+            self.max_explnum_id = explnum_id
+        if date_publication is not None and (self.latest_date_publication is None
+                                             or date_publication > self.latest_date_publication):
+            self.latest_date_publication = date_publication
+
+    def is_past_mark(self, explnum_id: str, get_date_publication: Callable[[], str]) -> bool:
+        """
+        Indique si un résultat est déjà couvert par la marque.
+
+        La date de publication n'est lue (via get_date_publication) que si l'explnum_id
+        est sous la marque, pour ne pas extraire les métadonnées des nouveaux résultats deux fois.
+        """
+        explnum = _to_int(explnum_id)
+        if not self.has_mark or explnum is None or explnum > self.max_explnum_id:
+            return False
+        if self.latest_date_publication is None:
+            return True
+        date_publication = parse_date(get_date_publication())
+        return date_publication is None or date_publication < self.latest_date_publication
+
+    def observe(self, explnum_id: str, date_publication: str):
+        """Enregistre un résultat vu pendant le crawl en cours."""
+        explnum = _to_int(explnum_id)
+        if explnum is not None and (self.seen_max_explnum_id is None or explnum > self.seen_max_explnum_id):
+            self.seen_max_explnum_id = explnum
+        published = parse_date(date_publication)
+        if published is not None and (self.seen_latest_date_publication is None
+                                      or published > self.seen_latest_date_publication):
+            self.seen_latest_date_publication = published
+
+    def advance(self):
+        """Avance la marque jusqu'aux résultats vus pendant le crawl et la sauvegarde."""
+        self._raise_mark(self.seen_max_explnum_id, self.seen_latest_date_publication)
+        self.save()
+        logger.info(f"État du crawl mis à jour: {self.describe()}")
+
+    def save(self):
+        """Écrit l'état de façon atomique."""
+        write_json_atomic(self.path, {
+            'max_explnum_id': self.max_explnum_id,
+            'latest_date_publication': format_date(self.latest_date_publication),
+            'updated_at': datetime.now().isoformat(),
+        })
+
+    def describe(self) -> str:
+        if not self.has_mark:
+            return "aucune marque (crawl complet)"
+        latest = format_date(self.latest_date_publication) or 'n/a'
+        return f"explnum_id max {self.max_explnum_id}, publication la plus récente {latest}"
+
+
+class CrawlCheckpoint:
+    """
+    Journal de reprise d'un crawl interrompu (crash, timeout du job GitHub Actions).
+
+    Enregistre la dernière page de résultats entièrement sauvegardée dans le CSV, la
+    dernière page parcourue, et les arrêtés découverts dont le PDF n'est pas encore
+    sauvegardé. Le checkpoint est réécrit juste après chaque sauvegarde du CSV : s'il
+    manque la dernière sauvegarde (crash entre les deux écritures), les arrêtés en
+    attente qu'elle contenait sont déjà dans le CSV et sont ignorés à la reprise.
+    """
+
+    def __init__(self, path: Path = CHECKPOINT_FILE):
+        self.path = path
+        self.last_committed_page = 0
+        self.last_listed_page = 0
+        self.total_pages = 0
+        # (page_num, métadonnées) des arrêtés découverts mais pas encore dans le CSV
+        self.pending: List[Tuple[int, Dict]] = []
+        # Plus hauts résultats vus par le crawl interrompu, pour avancer la marque à la fin
+        self.seen_max_explnum_id: Optional[int] = None
+        self.seen_latest_date_publication: Optional[date] = None
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self) -> bool:
+        """Charge le checkpoint. Retourne False s'il n'existe pas."""
+        if not self.path.exists():
+            return False
+        data = json.loads(self.path.read_text(encoding='utf-8'))
+        self.last_committed_page = data.get('last_committed_page', 0)
+        self.last_listed_page = data.get('last_listed_page', 0)
+        self.total_pages = data.get('total_pages', 0)
+        self.pending = [(entry['page'], self._iso_dates(entry['metadata'])) for entry in data.get('pending', [])]
+        self.seen_max_explnum_id = _to_int(data.get('seen_max_explnum_id'))
+        self.seen_latest_date_publication = parse_date(data.get('seen_latest_date_publication') or '')
+        return True
+
+    @staticmethod
+    def _iso_dates(metadata: Dict) -> Dict:
+        """Dates d'un arrêté en attente au format ISO (checkpoint écrit avant la migration des dates)."""
+        for name in DATE_COLUMNS:
+            if metadata.get(name):
+                # Une valeur illisible est conservée telle quelle, comme lors de la migration du CSV
+                metadata[name] = to_iso_date(metadata[name]) or metadata[name]
+        return metadata
+
+    def save(self):
+        """Écrit le checkpoint de façon atomique."""
+        write_json_atomic(self.path, {
+            'last_committed_page': self.last_committed_page,
+            'last_listed_page': self.last_listed_page,
+            'total_pages': self.total_pages,
+            'pending': [{'page': page_num, 'metadata': metadata} for page_num, metadata in self.pending],
+            'seen_max_explnum_id': self.seen_max_explnum_id,
+            'seen_latest_date_publication': format_date(self.seen_latest_date_publication),
+            'updated_at': datetime.now().isoformat(),
+        })
+
+    def clear(self):
+        """Supprime le checkpoint (crawl terminé)."""
+        if self.path.exists():
+            self.path.unlink()
+
+    def describe(self) -> str:
+        return (f"page {self.last_committed_page} sauvegardée, page {self.last_listed_page} parcourue "
+                f"sur {self.total_pages}, {len(self.pending)} arrêtés en attente")
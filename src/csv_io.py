@@ -0,0 +1,70 @@
+"""Lecture et réécriture complète du CSV des arrêtés (migrations, reclassification)."""
+import csv
+import logging
+import os
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+from config import CSV_FILE, FULLTEXT_INDEX, INDEX_DB_FILE, PARQUET_DIR, PARQUET_EXPORT
+
+logger = logging.getLogger(__name__)
+
+# Lignes converties à la fois lors de la réécriture du CSV
+WRITE_BATCH_SIZE = 100_000
+
+
+def read_csv_as_strings(csv_path: Path) -> pa.Table:
+    """Lit le CSV en laissant toutes les colonnes en chaînes, pour le réécrire à l'identique."""
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f))
+    return pa_csv.read_csv(
+        csv_path,
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={name: pa.string() for name in header},
+            strings_can_be_null=False,
+        ),
+    )
+
+
+def write_csv_atomic(table: pa.Table, csv_path: Path):
+    """Réécrit le CSV (mêmes règles de quoting que l'écriture en ajout) via un fichier temporaire renommé."""
+    tmp_path = csv_path.with_name(csv_path.name + '.tmp')
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(table.column_names)
+        for batch in table.to_batches(max_chunksize=WRITE_BATCH_SIZE):
+            writer.writerows(zip(*(column.to_pylist() for column in batch.columns)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, csv_path)
+
+
+def rewrite_csv(table: pa.Table, csv_path: Path = CSV_FILE, db_path: Path = INDEX_DB_FILE,
+                parquet_dir: Path = PARQUET_DIR):
+    """Réécrit le CSV puis reconstruit depuis lui les index et le dataset Parquet."""
+    from arrete_index import ArreteIndex
+    from parquet_store import ParquetStore
+    from search_index import SearchIndex
+
+    write_csv_atomic(table, csv_path)
+    logger.info(f"CSV réécrit: {csv_path}")
+
+    # Une réécriture peut changer n'importe quelle colonne indexée (dates, localisation recalculée
+    # par un extracteur amélioré...) : recaler les index sur la nouvelle taille du CSV garderait
+    # les anciennes valeurs, ils sont donc reconstruits
+    indexes = [ArreteIndex(db_path, csv_path)]
+    if FULLTEXT_INDEX:
+        indexes.append(SearchIndex(db_path, csv_path))
+    for index in indexes:
+        index.open()
+        try:
+            index.rebuild_from_csv()
+        finally:
+            index.close()
+
+    if PARQUET_EXPORT:
+        # Le dataset Parquet stocke toutes les colonnes : il est reconstruit
+        ParquetStore(parquet_dir).rebuild_from_csv(csv_path)
@@ -0,0 +1,190 @@
+"""Écriture en ajout seul du CSV des arrêtés, sans pandas, avec reprise après écriture interrompue."""
+import csv
+import io
+import logging
+import os
+from pathlib import Path
+from typing import Dict, IO, Iterable, List, Optional, Tuple
+
+from config import CSV_COLUMNS, CSV_FILE
+
+logger = logging.getLogger(__name__)
+
+# Octets relus à la fois pour retrouver le dernier enregistrement complet
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class CsvAppendWriter:
+    """
+    Ajoute les arrêtés au CSV en gardant le fichier ouvert pendant tout le run.
+
+    Chaque lot (une page de résultats) est d'abord formaté en mémoire avec le module csv,
+    puis écrit en un seul appel et synchronisé sur disque (fsync) : une sauvegarde est
+    soit entièrement sur disque, soit interrompue en cours de dernière ligne. Dans ce
+    second cas, `open()` tronque le fichier après le dernier enregistrement complet, pour
+    que l'index et le dataset Parquet, qui relisent le CSV, ne tombent jamais sur une ligne
+    tronquée.
+    """
+
+    def __init__(self, path: Path = CSV_FILE):
+        self.path = path
+        self.fieldnames: List[str] = list(CSV_COLUMNS)
+        self.file: Optional[IO[bytes]] = None
+        self.rows_written = 0
+
+    def open(self):
+        """Répare une éventuelle écriture interrompue puis ouvre le fichier en ajout."""
+        self._recover()
+        if self.path.exists() and self.path.stat().st_size > 0:
+            with open(self.path, newline='', encoding='utf-8') as f:
+                # Conserver l'ordre des colonnes du fichier existant
+                self.fieldnames = next(csv.reader(f))
+        self.file = open(self.path, 'ab')
+        if self.file.tell() == 0:
+            self._write_and_sync(self._format(None, header=True))
+
+    def close(self):
+        """Ferme le fichier."""
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def write_rows(self, rows: Iterable[Dict]) -> int:
+        """
+        Ajoute un lot de lignes et le synchronise sur disque.
+        Les colonnes absentes d'une ligne sont laissées vides, les clés en trop ignorées.
+
+        Returns:
+            Nombre de lignes écrites
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        self._write_and_sync(self._format(rows))
+        self.rows_written += len(rows)
+        return len(rows)
+
+    def _format(self, rows: Optional[List[Dict]], header: bool = False) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.fieldnames, restval='',
+                                extrasaction='ignore', lineterminator='\n')
+        if header:
+            writer.writeheader()
+        if rows:
+            writer.writerows(rows)
+        return buffer.getvalue().encode('utf-8')
+
+    def _write_and_sync(self, data: bytes):
+        self.file.write(data)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def _recover(self):
+        """
+        Tronque le fichier après son dernier enregistrement complet.
+
+        Un champ entre guillemets peut contenir un saut de ligne : un '\\n' ne termine un
+        enregistrement que s'il suit un nombre pair de guillemets depuis le début du fichier.
+        Le cas courant (fichier intact) est vérifié sur la fin du fichier seulement ; sinon le
+        fichier est relu une fois (comptage des guillemets, sans parsing), puis le dernier
+        enregistrement retenu est validé avec csv.reader (nombre de colonnes de l'en-tête) ;
+        s'il ne l'est pas, il est supprimé lui aussi.
+        """
+        if not self.path.exists():
+            return
+        with open(self.path, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            if self._ends_with_complete_records(f, size):
+                return
+            keep, record_start = self._last_record_ends(f, size)
+            if record_start > 0 and not self._is_complete_record(f, record_start, keep):
+                keep = record_start
+            if keep == size:
+                return
+
+            f.truncate(keep)
+            f.flush()
+            os.fsync(f.fileno())
+        logger.warning(f"Dernier enregistrement du CSV tronqué par une écriture interrompue: "
+                       f"{size - keep} octets supprimés de {self.path}")
+
+    def _ends_with_complete_records(self, f: IO[bytes], size: int) -> bool:
+        """
+        Le fichier se termine-t-il par un enregistrement complet ? Vérifié sur ses
+        READ_CHUNK_SIZE derniers octets, sans relire le début du fichier.
+
+        Si le dernier '\\n' est hors guillemets, un '\\n' du bloc termine un enregistrement quand
+        il est suivi d'un nombre pair de guillemets. Les deux derniers enregistrements ainsi
+        délimités doivent alors avoir autant de colonnes que l'en-tête : une fin de fichier
+        au milieu d'un champ entre guillemets fausse ce découpage et la vérification échoue.
+        False aussi quand le bloc ne contient pas deux enregistrements entiers.
+        """
+        start = max(0, size - READ_CHUNK_SIZE)
+        f.seek(start)
+        tail = f.read(size - start)
+        if not tail.endswith(b'\n'):
+            return False
+
+        ends = [len(tail)]
+        position = len(tail) - 1
+        while len(ends) < 3:
+            position = tail.rfind(b'\n', 0, position)
+            if position < 0:
+                break
+            if tail.count(b'"', position) % 2 == 0:
+                ends.append(position + 1)
+        if len(ends) < 3:
+            if start > 0:
+                return False
+            # Le bloc commence au début du fichier, donc au début d'un enregistrement
+            ends.append(0)
+
+        f.seek(0)
+        header = next(csv.reader(io.StringIO(f.readline().decode('utf-8', errors='replace'))))
+        for record_end, record_start in zip(ends, ends[1:]):
+            text = tail[record_start:record_end].decode('utf-8', errors='replace')
+            records = list(csv.reader(io.StringIO(text, newline='')))
+            if len(records) != 1 or len(records[0]) != len(header):
+                return False
+        return True
+
+    @staticmethod
+    def _last_record_ends(f: IO[bytes], size: int) -> Tuple[int, int]:
+        """
+        Fins (position après le '\\n') des deux derniers enregistrements complets du fichier :
+        (fin du dernier, fin de l'avant-dernier), 0 à défaut.
+        """
+        last = previous = 0
+        quotes = 0
+        f.seek(0)
+        offset = 0
+        while offset < size:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            quotes_at_end = quotes + chunk.count(b'"')
+            # Derniers sauts de ligne hors guillemets du bloc, en remontant depuis sa fin
+            found = []
+            position = chunk.rfind(b'\n')
+            while position >= 0 and len(found) < 2:
+                if (quotes_at_end - chunk.count(b'"', position)) % 2 == 0:
+                    found.append(offset + position + 1)
+                position = chunk.rfind(b'\n', 0, position)
+            if len(found) == 2:
+                last, previous = found
+            elif found:
+                last, previous = found[0], last
+            quotes = quotes_at_end
+            offset += len(chunk)
+        return last, previous
+
+    def _is_complete_record(self, f: IO[bytes], start: int, end: int) -> bool:
+        """L'enregistrement entre start et end a-t-il autant de colonnes que l'en-tête ?"""
+        f.seek(0)
+        header = next(csv.reader(io.StringIO(f.readline().decode('utf-8', errors='replace'))))
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8', errors='replace')
+        records = list(csv.reader(io.StringIO(text, newline='')))
+        return len(records) == 1 and len(records[0]) == len(header)
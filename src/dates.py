@@ -0,0 +1,111 @@
+"""Dates des arrêtés au format ISO (AAAA-MM-JJ) : conversion, migration du CSV et requêtes par période."""
+import argparse
+import logging
+import time
+from datetime import date, timedelta
+from typing import Optional
+
+# Colonnes de date du CSV, stockées au format ISO
+DATE_COLUMNS = ('date_publication', 'date_signature')
+
+# Format des dates affichées par le BOVP (et des CSV antérieurs à la migration)
+BOVP_DATE_FORMAT = '%d/%m/%Y'
+
+
+def parse_date(value) -> Optional[date]:
+    """
+    Convertit une date ISO ('2025-10-24') ou BOVP ('24/10/2025') en date, None si vide
+    ou invalide. Les deux formats coexistent dans un CSV pas encore migré.
+    """
+    if isinstance(value, date):
+        return value
+    text = str(value or '').strip()
+    if not text:
+        return None
+    try:
+        if '/' in text:
+            # Format BOVP_DATE_FORMAT strict (JJ/MM/AAAA, champs complétés par des zéros), découpé
+            # à la main : plusieurs fois plus rapide que strptime, appelé pour chaque arrêté parsé
+            day, month, year = text.split('/')
+            digits = day + month + year
+            if len(day) != 2 or len(month) != 2 or len(year) != 4 or not (digits.isascii() and digits.isdigit()):
+                return None
+            return date(int(year), int(month), int(day))
+        return date.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def to_iso_date(value) -> str:
+    """Date au format ISO ('24/10/2025' -> '2025-10-24'), chaîne vide si vide ou invalide."""
+    parsed = parse_date(value)
+    return parsed.isoformat() if parsed else ''
+
+
+def migrate_table(table):
+    """
+    Convertit au format ISO les colonnes de date d'une table pyarrow lue depuis le CSV.
+
+    Returns:
+        La table mise à jour et le nombre de valeurs converties
+    """
+    import pyarrow as pa
+
+    converted = 0
+    for name in DATE_COLUMNS:
+        if name not in table.column_names:
+            continue
+        values = table.column(name).to_pylist()
+        # Une valeur illisible est conservée telle quelle plutôt que perdue
+        iso_values = [to_iso_date(value) or value for value in values]
+        converted += sum(1 for old, new in zip(values, iso_values) if old != new)
+        table = table.set_column(table.schema.get_field_index(name), name, pa.array(iso_values, pa.string()))
+    return table, converted
+
+
+def main():
+    """Dates des arrêtés : migration du CSV et arrêtés publiés ou signés sur une période."""
+    parser = argparse.ArgumentParser(description="Dates des arrêtés (format ISO)")
+    parser.add_argument('--migrate', action='store_true',
+                        help="Convertir au format ISO les dates JJ/MM/AAAA du CSV")
+    parser.add_argument('--dry-run', action='store_true', help="Avec --migrate : compter sans réécrire le CSV")
+    parser.add_argument('--from', dest='start', type=date.fromisoformat, help="À partir du (AAAA-MM-JJ)")
+    parser.add_argument('--to', dest='end', type=date.fromisoformat, help="Jusqu'au (AAAA-MM-JJ, inclus)")
+    parser.add_argument('--since-days', type=int,
+                        help="Depuis N jours (1 = depuis hier), à la place de --from")
+    parser.add_argument('--signature', action='store_true',
+                        help="Filtrer sur la date de signature plutôt que de publication")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.migrate:
+        from config import CSV_FILE
+        from csv_io import read_csv_as_strings, rewrite_csv
+
+        table, converted = migrate_table(read_csv_as_strings(CSV_FILE))
+        print(f"{converted} dates converties au format ISO ({table.num_rows} arrêtés)")
+        if converted and not args.dry_run:
+            rewrite_csv(table)
+        return
+
+    from arrete_index import ArreteIndex
+
+    start = date.today() - timedelta(days=args.since_days) if args.since_days is not None else args.start
+    column = 'date_signature' if args.signature else 'date_publication'
+    index = ArreteIndex()
+    index.open()
+    try:
+        index.sync_with_csv()
+        started = time.perf_counter()
+        results = index.find_by_date(column, start, args.end)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for numero, value in results:
+            print(f"{value} {numero}")
+        print(f"{len(results)} arrêtés ({elapsed_ms:.1f} ms)")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""Extraction de la localisation (arrondissements, voies) depuis le titre des arrêtés."""
+import argparse
+import logging
+import re
+import time
+import unicodedata
+from typing import Dict, List, Tuple
+
+# Colonnes du CSV remplies depuis le titre
+LOCATION_COLUMNS = ('arrondissement', 'voies')
+
+# Séparateur des valeurs multiples dans les colonnes `arrondissement` et `voies` du CSV
+SEPARATOR = ';'
+
+# Paris Centre regroupe les quatre premiers arrondissements depuis 2020
+PARIS_CENTRE = (1, 2, 3, 4)
+
+# Types de voies (singulier, pluriel) reconnus dans les titres
+VOIE_TYPES = {
+    'rue': 'rues', 'avenue': 'avenues', 'boulevard': 'boulevards', 'place': 'places', 'quai': 'quais',
+    'passage': 'passages', 'impasse': 'impasses', 'villa': 'villas', 'square': 'squares',
+    'allée': 'allées', 'cité': 'cités', 'chemin': 'chemins', 'cours': 'cours', 'pont': 'ponts',
+    'port': 'ports', 'porte': 'portes', 'esplanade': 'esplanades', 'parvis': 'parvis',
+    'route': 'routes', 'sentier': 'sentiers', 'hameau': 'hameaux', 'carrefour': 'carrefours',
+    'rond-point': 'ronds-points', 'galerie': 'galeries', 'promenade': 'promenades',
+    'sente': 'sentes', 'ruelle': 'ruelles', 'mail': 'mails', 'voie': 'voies',
+}
+SINGULAR = {plural: singular for singular, plural in VOIE_TYPES.items()}
+SINGULAR.update({singular: singular for singular in VOIE_TYPES})
+
+# Accents courants, apostrophe typographique et ponctuation des noms de voies (les autres
+# caractères non ASCII passent par une décomposition Unicode, plus lente)
+_NORMALIZE_TABLE = str.maketrans("àâäáãçéèêëíìîïñóòôöõúùûüýÿ’-.", "aaaaaceeeeiiiinooooouuuuyy'  ")
+
+# Abréviations développées dans la forme normalisée des voies
+ABBREVIATIONS = {'bd': 'boulevard', 'bld': 'boulevard', 'av': 'avenue', 'pl': 'place',
+                 'st': 'saint', 'ste': 'sainte', 'gal': 'general', 'mal': 'marechal'}
+
+_SUFFIX = r'(?:er|ère|re|ième|ieme|ème|eme|è|e)'
+_ORDINAL = rf'(\d{{1,2}})\s*{_SUFFIX}'
+_ORDINALS = rf'{_ORDINAL}(?:\s*(?:,|et)\s*{_ORDINAL})*'
+# Les expressions ci-dessous s'appliquent au titre en minuscules (plus rapide qu'IGNORECASE)
+# "à paris 15e", "à paris, 1er et 4e", "à paris 12", "à paris dans le 20e arrondissement"
+_PARIS_RE = re.compile(
+    rf'paris\s*,?\s*(?:dans le\s+)?(\d{{1,2}}(?:\s*{_SUFFIX})?(?:\s*(?:,|et)\s*\d{{1,2}}(?:\s*{_SUFFIX})?)*)(?![\d\w])'
+)
+# "du 11e arrondissement", "1er et 4e arrondissements"
+_ARRONDISSEMENT_RE = re.compile(rf'{_ORDINALS}\s+arrondissements?\b')
+# Ordinal en fin de titre, sans "Paris" : "rue du ranelagh, 16e."
+_TRAILING_RE = re.compile(rf'[\s,]({_ORDINALS})\s*\.?\s*$')
+_CENTRE_RE = re.compile(r'\bparis\s*,?\s*centre\b')
+_ORDINAL_WORD_RE = re.compile(rf'^{_ORDINAL}$', re.IGNORECASE)
+# Fin de titre examinée pour un ordinal sans "Paris"
+_TRAILING_LENGTH = 40
+
+# Mots (en minuscules) qui terminent le nom d'une voie
+_NAME_STOP_WORDS = {
+    'et', 'à', 'a', 'entre', 'dans', 'sur', 'pour', 'pendant', 'vers', 'depuis', 'jusqu', "jusqu'à",
+    'ainsi', 'côté', 'le', 'les', 'par', 'au', 'aux', 'en', 'lors', 'afin', 'quartier', 'paris',
+    'intérieur', 'extérieur', 'dont', 'qui', 'entre', 'face', 'partie', 'autres', 'voies',
+}
+# Particules admises dans un nom de voie (en minuscules)
+_NAME_PARTICLES = {'de', 'du', 'des', "d'", "l'", 'la', 'le', 'les', 'aux', 'au', 'sur', 'sous', 'et'}
+# Mots précédant un type de voie employé comme nom commun ("mise en place", "en cours")
+_NOT_A_VOIE_BEFORE = {'en', 'plusieurs', 'diverses', 'certaines', 'les', 'des'}
+_TOKEN_RE = re.compile(r"[\w'’.-]+|[,.;:()\"«»]", re.UNICODE)
+_APOSTROPHE_SPACE_RE = re.compile(r"([dlDL][’'])\s+")
+# Types de voie tels qu'écrits dans les titres ("rue", "Rue", "RUE") -> type au singulier
+_TYPE_WORDS = {variant: singular for word, singular in SINGULAR.items()
+               for variant in (word, word.capitalize(), word.upper())}
+
+
+def _arrondissements_from(text: str) -> List[int]:
+    return [int(number) for number in re.findall(r'\d{1,2}', text)]
+
+
+def extract_arrondissements(titre: str) -> List[int]:
+    """
+    Arrondissements cités par le titre, dans l'ordre ("à Paris 1er et 4e" -> [1, 4]).
+    Paris Centre donne [1, 2, 3, 4] ; les numéros hors de 1..20 sont ignorés.
+    """
+    lower = titre.lower()
+    found: List[int] = []
+    if 'paris' in lower:
+        if 'centre' in lower and _CENTRE_RE.search(lower):
+            found.extend(PARIS_CENTRE)
+        # Chercher "paris" par str.find puis appliquer l'expression à cette position
+        position = lower.find('paris')
+        while position >= 0:
+            match = _PARIS_RE.match(lower, position)
+            if match and (position == 0 or not lower[position - 1].isalnum()):
+                found.extend(_arrondissements_from(match.group(1)))
+            position = lower.find('paris', position + 5)
+    if 'arrondissement' in lower:
+        for match in _ARRONDISSEMENT_RE.finditer(lower):
+            found.extend(_arrondissements_from(match.group(0)))
+    if not found:
+        match = _TRAILING_RE.search(lower[-_TRAILING_LENGTH:])
+        if match:
+            found.extend(_arrondissements_from(match.group(1)))
+    return list(dict.fromkeys(number for number in found if 1 <= number <= 20))
+
+
+def _is_name_word(word: str) -> bool:
+    """Un mot fait partie du nom de voie s'il commence par une majuscule ou un chiffre."""
+    first = word.lstrip("'’\"«")[:1]
+    if first.isdigit():
+        return not _ORDINAL_WORD_RE.match(word.rstrip('.'))
+    return first.isupper()
+
+
+def _read_name(tokens: List[str], start: int, lowercase: bool = True) -> Tuple[List[str], int]:
+    """
+    Lit un nom de voie à partir de tokens[start] : des mots commençant par une majuscule,
+    éventuellement reliés par des particules ("de la", "d'", "du"...). Avec `lowercase`, un nom
+    écrit entièrement en minuscules ("rue des trois bornes") est aussi accepté.
+    """
+    name: List[str] = []
+    capitalized = False
+    position = start
+    while position < len(tokens):
+        token = tokens[position]
+        lower = token.lower()
+        # Début d'une autre voie en minuscules ("... et rue ..."), ou "d'un", "d'une"
+        if token in _TYPE_WORDS or lower.replace('’', "'") in ("d'un", "d'une"):
+            break
+        if _is_name_word(token):
+            name.append(token)
+            capitalized = True
+            position += 1
+            continue
+        # Particule suivie d'un mot du nom : "de la Gaité", "d'Aubervilliers", "aux Ours"
+        if lower in _NAME_PARTICLES or lower.startswith(("d'", "d’", "l'", "l’")):
+            lookahead = position
+            while lookahead < len(tokens) and (tokens[lookahead].lower() in _NAME_PARTICLES
+                                               and tokens[lookahead].lower() != 'et'):
+                lookahead += 1
+            if lower.startswith(("d'", "d’", "l'", "l’")) and len(token) > 2:
+                name.append(token)
+                position += 1
+                continue
+            if lower != 'et' and lookahead < len(tokens) and (_is_name_word(tokens[lookahead])
+                                                            or (lowercase and not capitalized)):
+                name.extend(tokens[position:lookahead + 1])
+                capitalized = capitalized or _is_name_word(tokens[lookahead])
+                position = lookahead + 1
+                continue
+        # Nom entièrement en minuscules ("rue aux ours", "boulevard périphérique")
+        if lowercase and not capitalized and lower not in _NAME_STOP_WORDS and token[0].isalpha():
+            name.append(token)
+            position += 1
+            continue
+        break
+    return name, position
+
+
+def extract_voies(titre: str) -> List[str]:
+    """
+    Voies citées par le titre, au singulier et avec la casse d'origine
+    ("rues de la Gaité et Vandamme" -> ["rue de la Gaité", "rue Vandamme"]).
+    """
+    tokens = _TOKEN_RE.findall(titre)
+    # Positions des types de voie, sans passer chaque mot en minuscules
+    candidates = [index for index, token in enumerate(tokens) if token in _TYPE_WORDS]
+    voies: List[str] = []
+    position = 0
+    for index in candidates:
+        if index < position:
+            continue
+        token = tokens[index]
+        voie_type = _TYPE_WORDS[token]
+        if index and tokens[index - 1].lower() in _NOT_A_VOIE_BEFORE:
+            continue
+        plural = token.lower() != voie_type and token.lower() == VOIE_TYPES[voie_type]
+        name, position = _read_name(tokens, index + 1)
+        # "voie" seul est trop générique ("voies sur berges", "plusieurs voies") sans nom propre
+        if not name or (voie_type == 'voie' and not _is_name_word(name[0])):
+            continue
+        voies.append(f"{voie_type} {' '.join(name)}")
+        # "rues X, Y et Z" : les noms suivants partagent le type de voie
+        while plural and position + 1 < len(tokens) and tokens[position] in (',', 'et'):
+            if tokens[position + 1] in _TYPE_WORDS:
+                break
+            name, next_position = _read_name(tokens, position + 1, lowercase=False)
+            if not name:
+                break
+            voies.append(f"{voie_type} {' '.join(name)}")
+            position = next_position
+    return list(dict.fromkeys(_tidy(voie) for voie in voies))
+
+
+def _tidy(voie: str) -> str:
+    voie = _APOSTROPHE_SPACE_RE.sub(r"\1", voie)
+    return voie.rstrip('.').strip()
+
+
+def normalize_voie(voie: str) -> str:
+    """
+    Forme normalisée d'une voie pour l'index : minuscules, sans accents ni tirets, apostrophes
+    unifiées, abréviations développées et sans particule après le type de voie
+    ("Bd St-Germain" -> "boulevard saint germain", "rue d’Enghien" -> "rue enghien").
+    """
+    text = voie.lower().translate(_NORMALIZE_TABLE)
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+    words = [ABBREVIATIONS.get(word, word) for word in text.split()]
+    # Particule après le type de voie, écrite ou non selon les arrêtés : "rue (de) Lourmel"
+    if len(words) > 2 and words[1] in ('de', 'du', 'des'):
+        del words[1]
+        if len(words) > 2 and words[1] == 'la':
+            del words[1]
+    elif len(words) > 1 and words[1].startswith("d'") and len(words[1]) > 2:
+        words[1] = words[1][2:]
+    return ' '.join(words)
+
+
+def extract_location(titre: str) -> Dict[str, str]:
+    """
+    Colonnes `arrondissement` et `voies` du CSV pour un titre : valeurs multiples séparées
+    par ';' ("1;4", "rue de Bercy;rue de Pommard"), chaîne vide si rien n'est trouvé.
+    """
+    return {
+        'arrondissement': SEPARATOR.join(str(number) for number in extract_arrondissements(titre)),
+        'voies': SEPARATOR.join(extract_voies(titre)),
+    }
+
+
+def split_values(value) -> List[str]:
+    """Valeurs d'une colonne multiple du CSV ("1;4" -> ["1", "4"])."""
+    return [part.strip() for part in str(value or '').split(SEPARATOR) if part.strip()]
+
+
+def add_location_columns(table, csv_columns: List[str]):
+    """
+    Remplit (ou ajoute) les colonnes de localisation d'une table pyarrow lue depuis le CSV,
+    et range les colonnes dans l'ordre de CSV_COLUMNS (un CSV qui les avait au milieu de la
+    ligne les retrouve en fin de ligne).
+
+    Returns:
+        La table mise à jour et le nombre d'arrêtés dont la localisation a changé
+    """
+    import pyarrow as pa
+
+    locations = [extract_location(titre or '') for titre in table.column('titre').to_pylist()]
+    changed = [False] * table.num_rows
+    for name in LOCATION_COLUMNS:
+        values = [location[name] for location in locations]
+        column = pa.array(values, pa.string())
+        if name in table.column_names:
+            old_values = table.column(name).to_pylist()
+            changed = [flag or old != new for flag, old, new in zip(changed, old_values, values)]
+            table = table.set_column(table.schema.get_field_index(name), name, column)
+        else:
+            changed = [flag or bool(value) for flag, value in zip(changed, values)]
+            table = table.append_column(name, column)
+    ordered = [name for name in csv_columns if name in table.column_names]
+    table = table.select(ordered + [name for name in table.column_names if name not in ordered])
+    return table, sum(changed)
+
+
+def main():
+    """Localisation des arrêtés : backfill des colonnes du CSV et requêtes sur l'index."""
+    parser = argparse.ArgumentParser(description="Localisation des arrêtés (arrondissement, voies)")
+    parser.add_argument('--backfill', action='store_true',
+                        help="Ajouter ou recalculer les colonnes arrondissement et voies de tout le CSV")
+    parser.add_argument('--dry-run', action='store_true', help="Avec --backfill : compter sans réécrire le CSV")
+    parser.add_argument('--arrondissement', type=int, help="Arrêtés d'un arrondissement (1 à 20)")
+    parser.add_argument('--voie', help="Arrêtés d'une voie (ex: \"rue Lourmel\")")
+    parser.add_argument('--voies', action='store_true', help="Avec --arrondissement : lister ses voies")
+    parser.add_argument('--titre', help="Afficher la localisation extraite d'un titre")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.titre:
+        print(extract_location(args.titre))
+        return
+
+    if args.backfill:
+        from config import CSV_COLUMNS, CSV_FILE
+        from csv_io import read_csv_as_strings, rewrite_csv
+
+        table = read_csv_as_strings(CSV_FILE)
+        added = [name for name in LOCATION_COLUMNS if name not in table.column_names]
+        columns = table.column_names
+        table, changed = add_location_columns(table, CSV_COLUMNS)
+        moved = not added and table.column_names != columns
+        print(f"{changed} arrêtés localisés ou relocalisés sur {table.num_rows}"
+              + (f" (colonnes ajoutées: {', '.join(added)})" if added else "")
+              + (" (colonnes déplacées en fin de ligne)" if moved else ""))
+        if (changed or added or moved) and not args.dry_run:
+            rewrite_csv(table)
+        return
+
+    from arrete_index import ArreteIndex
+
+    index = ArreteIndex()
+    index.open()
+    try:
+        index.sync_with_csv()
+        start = time.perf_counter()
+        if args.voies and args.arrondissement is not None:
+            results = [f"{voie} ({count})" for voie, count in index.voies_by_arrondissement(args.arrondissement)]
+        else:
+            results = index.find_by_location(args.arrondissement, args.voie)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        for result in results:
+            print(result)
+        print(f"{len(results)} résultats ({elapsed_ms:.1f} ms)")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""Métriques du scraper par étape (latences, débits, compteurs) : fichier Prometheus et résumé JSON du run."""
+import argparse
+import json
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from config import METRICS_TEXTFILE, RUN_SUMMARY_FILE
+
+# Préfixe des noms de métriques Prometheus
+METRIC_PREFIX = 'bovp_scraper_'
+
+# Bornes (secondes) des histogrammes de latence : du parsing d'une page (ms) au chargement lent (min)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    Distribution de valeurs par intervalles fixes, comme un histogramme Prometheus.
+
+    Seuls le nombre de valeurs par intervalle, leur somme et leur maximum sont conservés :
+    la mémoire ne dépend pas du nombre d'observations.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # Nombre de valeurs par intervalle (non cumulé), le dernier pour les valeurs au-delà de la dernière borne
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe la durée du bloc `with`, même s'il lève une exception."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimation d'un quantile par interpolation dans son intervalle (comme histogram_quantile)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulated = 0
+        lower = 0.0
+        for upper, bucket_count in zip(self.buckets, self.bucket_counts):
+            if bucket_count and cumulated + bucket_count >= rank:
+                estimate = lower + (upper - lower) * (rank - cumulated) / bucket_count
+                return min(estimate, self.max)
+            cumulated += bucket_count
+            lower = upper
+        return self.max
+
+    def summary(self) -> Dict:
+        """Résumé pour le JSON du run."""
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6),
+            'p50': round(self.quantile(0.5), 6),
+            'p95': round(self.quantile(0.95), 6),
+            'max': round(self.max, 6),
+        }
+
+
+class Counter:
+    """Valeur qui ne fait qu'augmenter pendant le run (nombre de pages, octets, erreurs)."""
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Gauge:
+    """Valeur instantanée (concurrence, débit, durée du run)."""
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+
+Metric = Union[Histogram, Counter, Gauge]
+
+_TYPES = {Histogram: 'histogram', Counter: 'counter', Gauge: 'gauge'}
+
+
+def _format_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _write_atomic(path: Path, text: str):
+    """Écrit via un fichier temporaire renommé : un lecteur (node_exporter) ne voit jamais un fichier partiel."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class Metrics:
+    """
+    Registre des métriques d'un run, exportées à la fin au format texte Prometheus
+    (collecteur textfile de node_exporter) et en résumé JSON.
+
+    Une métrique est identifiée par son nom et ses labels, par exemple
+    `stage_seconds{stage="listing_load"}` ; elle est créée au premier accès.
+    """
+
+    def __init__(self):
+        # nom -> (aide, {labels -> métrique})
+        self.families: Dict[str, Tuple[str, Dict[Labels, Metric]]] = {}
+        self.started_at = time.time()
+
+    def _series(self, name: str, help_text: str) -> Dict[Labels, Metric]:
+        previous_help, series = self.families.get(name, ('', {}))
+        # L'aide peut être donnée à un accès ultérieur (métrique d'abord enregistrée sans aide)
+        self.families[name] = (previous_help or help_text, series)
+        return series
+
+    def _get(self, kind, name: str, help_text: str, labels: Dict[str, str], factory=None) -> Metric:
+        series = self._series(name, help_text)
+        key = tuple(sorted((label, str(value)) for label, value in labels.items()))
+        metric = series.get(key)
+        if metric is None:
+            metric = series[key] = factory() if factory else kind()
+        elif not isinstance(metric, kind):
+            raise TypeError(f"Métrique {name} déjà déclarée comme {_TYPES[type(metric)]}")
+        return metric
+
+    def histogram(self, name: str, help_text: str = '', buckets=LATENCY_BUCKETS, **labels) -> Histogram:
+        return self._get(Histogram, name, help_text, labels, lambda: Histogram(buckets))
+
+    def counter(self, name: str, help_text: str = '', **labels) -> Counter:
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str = '', **labels) -> Gauge:
+        return self._get(Gauge, name, help_text, labels)
+
+    def register(self, name: str, metric: Metric, help_text: str = '', **labels):
+        """Ajoute au registre une métrique tenue par un autre composant (ex: latences de TransferStats)."""
+        series = self._series(name, help_text)
+        series[tuple(sorted((label, str(value)) for label, value in labels.items()))] = metric
+
+    def stage(self, stage: str) -> Histogram:
+        """Histogramme des durées d'une étape du scraper (`stage_seconds{stage=...}`)."""
+        return self.histogram('stage_seconds', "Durée des étapes du scraper (secondes)", stage=stage)
+
+    def time(self, stage: str):
+        """Mesure la durée du bloc `with` dans l'histogramme de l'étape."""
+        return self.stage(stage).time()
+
+    def count(self, name: str, amount: float = 1, help_text: str = '', **labels):
+        self.counter(name, help_text, **labels).inc(amount)
+
+    def to_prometheus(self) -> str:
+        """Format texte d'exposition Prometheus (un fichier .prom du collecteur textfile)."""
+        lines: List[str] = []
+        for name in sorted(self.families):
+            help_text, series = self.families[name]
+            if not series:
+                continue
+            full_name = METRIC_PREFIX + name
+            kind = _TYPES[type(next(iter(series.values())))]
+            if help_text:
+                lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for labels in sorted(series):
+                metric = series[labels]
+                if isinstance(metric, Histogram):
+                    cumulated = 0
+                    for upper, bucket_count in zip(metric.buckets, metric.bucket_counts):
+                        cumulated += bucket_count
+                        lines.append(f"{full_name}_bucket{_format_labels(labels, (('le', _format_value(upper)),))} "
+                                     f"{cumulated}")
+                    lines.append(f"{full_name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {metric.count}")
+                    lines.append(f"{full_name}_sum{_format_labels(labels)} {_format_value(metric.sum)}")
+                    lines.append(f"{full_name}_count{_format_labels(labels)} {metric.count}")
+                else:
+                    lines.append(f"{full_name}{_format_labels(labels)} {_format_value(metric.value)}")
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self) -> Dict:
+        """Valeurs des métriques pour le résumé JSON, clés au format `nom{label="valeur"}`."""
+        values = {}
+        for name in sorted(self.families):
+            _, series = self.families[name]
+            for labels in sorted(series):
+                metric = series[labels]
+                key = name + _format_labels(labels)
+                values[key] = metric.summary() if isinstance(metric, Histogram) else metric.value
+        return values
+
+    def write(self, textfile: Optional[Path] = METRICS_TEXTFILE, summary_file: Optional[Path] = RUN_SUMMARY_FILE,
+              **run_info):
+        """
+        Écrit le fichier Prometheus et le résumé JSON du run.
+
+        Args:
+            run_info: Informations du run ajoutées au résumé (statut, nombre d'arrêtés...)
+        """
+        finished_at = time.time()
+        self.gauge('run_duration_seconds', "Durée du dernier run (secondes)").set(finished_at - self.started_at)
+        self.gauge('run_finished_timestamp_seconds', "Fin du dernier run (timestamp Unix)").set(int(finished_at))
+        if textfile:
+            _write_atomic(Path(textfile), self.to_prometheus())
+        if summary_file:
+            summary = {
+                'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+                'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(finished_at)),
+                'duration_seconds': round(finished_at - self.started_at, 3),
+                **run_info,
+                'metrics': self.to_dict(),
+            }
+            _write_atomic(Path(summary_file), json.dumps(summary, indent=2, ensure_ascii=False) + '\n')
+
+
+def main():
+    """Affiche le résumé des métriques du dernier run."""
+    parser = argparse.ArgumentParser(description="Métriques du dernier run du scraper")
+    parser.add_argument('--summary', type=Path, default=RUN_SUMMARY_FILE, help="Résumé JSON du run")
+    args = parser.parse_args()
+
+    if not args.summary.exists():
+        print(f"Aucun résumé de run: {args.summary}")
+        return
+    summary = json.loads(args.summary.read_text(encoding='utf-8'))
+    metrics = summary.pop('metrics', {})
+    for key, value in summary.items():
+        print(f"{key}: {value}")
+    for key, value in metrics.items():
+        if isinstance(value, dict):
+            if value['count']:
+                print(f"  {key}: {value['count']} mesures, moyenne {value['mean'] * 1000:.1f} ms, "
+                      f"p95 {value['p95'] * 1000:.1f} ms, max {value['max'] * 1000:.1f} ms")
+        else:
+            print(f"  {key}: {value:.15g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""Export des arrêtés en dataset Parquet typé, partitionné par année de publication."""
+import argparse
+import json
+import logging
+import shutil
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from arrete_index import csv_appended_since, csv_sync_point, iter_csv_rows
+from config import CSV_FILE, PARQUET_DIR
+from dates import parse_date
+from location import extract_location
+
+logger = logging.getLogger(__name__)
+
+# Schéma typé des colonnes du CSV (l'année de partition est ajoutée à la lecture)
+SCHEMA = pa.schema([
+    ('numero_arrete', pa.string()),
+    ('titre', pa.string()),
+    ('autorite_responsable', pa.string()),
+    ('signataire', pa.string()),
+    ('date_publication', pa.date32()),
+    ('date_signature', pa.date32()),
+    ('poids_pdf_ko', pa.int32()),
+    ('concerne_circulation', pa.bool_()),
+    ('concerne_stationnement', pa.bool_()),
+    ('est_temporaire', pa.bool_()),
+    ('explnum_id', pa.int64()),
+    ('pdf_s3_url', pa.string()),
+    ('date_scrape', pa.timestamp('us')),
+    ('arrondissement', pa.string()),
+    ('voies', pa.string()),
+])
+
+PARTITIONING = ds.partitioning(pa.schema([('year', pa.int16())]), flavor='hive')
+
+# Fichier de synchronisation avec le CSV (ignoré par pyarrow, préfixe '_')
+SYNC_FILE = '_sync.json'
+
+# Lignes converties par lot lors d'une reconstruction
+BATCH_SIZE = 5000
+
+
+def _to_int(value) -> Optional[int]:
+    """'103' -> 103, '12,5' -> 12, '' ou valeur aberrante -> None."""
+    try:
+        return int(float(str(value).replace(',', '.')))
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_bool(value) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('true', '1'):
+        return True
+    if text in ('false', '0'):
+        return False
+    return None
+
+
+def _to_timestamp(value) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _partition_year(row: Dict, date_publication: Optional[date]) -> Optional[int]:
+    """Année de publication, ou à défaut l'année du numéro d'arrêté ("2025 T 17858")."""
+    if date_publication:
+        return date_publication.year
+    return _to_int(str(row.get('numero_arrete', '')).split(' ')[0])
+
+
+CONVERTERS = {
+    'date_publication': parse_date,
+    'date_signature': parse_date,
+    'poids_pdf_ko': _to_int,
+    'concerne_circulation': _to_bool,
+    'concerne_stationnement': _to_bool,
+    'est_temporaire': _to_bool,
+    'explnum_id': _to_int,
+    'date_scrape': _to_timestamp,
+}
+
+
+def rows_to_table(rows: List[Dict]) -> pa.Table:
+    """Convertit des lignes du CSV (chaînes ou valeurs Python) en table Arrow typée, avec l'année."""
+    columns = {name: [] for name in SCHEMA.names}
+    years = []
+    for row in rows:
+        # CSV antérieur aux colonnes de localisation : les déduire du titre
+        if 'arrondissement' not in row or 'voies' not in row:
+            row = {**row, **extract_location(row.get('titre') or '')}
+        for name in SCHEMA.names:
+            value = row.get(name, '')
+            converter = CONVERTERS.get(name)
+            if converter:
+                value = converter(value) if value not in ('', None) else None
+            else:
+                value = '' if value is None else str(value)
+            columns[name].append(value)
+        years.append(_partition_year(row, columns['date_publication'][-1]))
+
+    table = pa.Table.from_pydict(columns, schema=SCHEMA)
+    return table.append_column(pa.field('year', pa.int16()), pa.array(years, pa.int16()))
+
+
+class ParquetStore:
+    """
+    Dataset Parquet des arrêtés (data/parquet/year=2026/part-....parquet).
+
+    Le CSV reste la source de vérité : chaque sauvegarde du CSV ajoute un petit fichier
+    par année concernée, et la taille du CSV exportée est mémorisée pour rattraper, au
+    démarrage, les lignes ajoutées au CSV par un autre run (ou tout reconstruire).
+    `compact()` regroupe les petits fichiers de chaque année.
+    """
+
+    def __init__(self, root: Path = PARQUET_DIR):
+        self.root = root
+
+    def append(self, rows: Iterable[Dict]):
+        """Ajoute des arrêtés au dataset (un nouveau fichier par année concernée)."""
+        rows = list(rows)
+        if not rows:
+            return
+        self._write(rows_to_table(rows), self.root)
+
+    def _write(self, table: pa.Table, root: Path):
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        pq.write_to_dataset(
+            table,
+            root_path=str(root),
+            partitioning=PARTITIONING,
+            basename_template=f"part-{stamp}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore',
+        )
+
+    def _sync_point(self) -> Tuple[Optional[int], Optional[str]]:
+        """
+        (taille, empreinte) du CSV exporté, ou (None, None) si le dataset est absent ou a été
+        écrit avec un autre schéma.
+        """
+        sync_path = self.root / SYNC_FILE
+        if not sync_path.exists():
+            return None, None
+        sync = json.loads(sync_path.read_text(encoding='utf-8'))
+        if sync.get('columns') != SCHEMA.names:
+            return None, None
+        return sync.get('csv_size'), sync.get('csv_hash')
+
+    def mark_csv_synced(self, csv_path: Path = CSV_FILE):
+        """Mémorise la taille et l'empreinte actuelles du CSV (et les colonnes du schéma) comme point de synchronisation."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        size, fingerprint = csv_sync_point(csv_path)
+        sync = {'csv_size': size, 'csv_hash': fingerprint, 'columns': SCHEMA.names}
+        (self.root / SYNC_FILE).write_text(json.dumps(sync) + '\n', encoding='utf-8')
+
+    def rebuild_from_csv(self, csv_path: Path = CSV_FILE) -> int:
+        """Reconstruit tout le dataset depuis le CSV (écrit à côté puis remplace l'ancien)."""
+        tmp_root = self.root.with_name(self.root.name + '.tmp')
+        if tmp_root.exists():
+            shutil.rmtree(tmp_root)
+        tmp_root.mkdir(parents=True)
+
+        count = 0
+        if csv_path.exists():
+            batch: List[Dict] = []
+            for row in iter_csv_rows(csv_path):
+                batch.append(row)
+                if len(batch) >= BATCH_SIZE:
+                    self._write(rows_to_table(batch), tmp_root)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                self._write(rows_to_table(batch), tmp_root)
+                count += len(batch)
+
+        if self.root.exists():
+            shutil.rmtree(self.root)
+        tmp_root.rename(self.root)
+        self.compact()
+        self.mark_csv_synced(csv_path)
+        logger.info(f"Dataset Parquet reconstruit depuis le CSV: {count} arrêtés dans {self.root}")
+        return count
+
+    def sync_with_csv(self, csv_path: Path = CSV_FILE):
+        """Rattrape les lignes ajoutées au CSV depuis le dernier export, ou reconstruit le dataset."""
+        if not csv_path.exists():
+            return
+        synced_size, synced_hash = self._sync_point()
+        offset = csv_appended_since(csv_path, synced_size, synced_hash)
+        if offset is None:
+            self.rebuild_from_csv(csv_path)
+        elif offset < csv_path.stat().st_size:
+            rows = list(iter_csv_rows(csv_path, offset=offset))
+            self.append(rows)
+            self.mark_csv_synced(csv_path)
+            logger.info(f"Dataset Parquet mis à jour: {len(rows)} nouvelles lignes du CSV")
+
+    def compact(self):
+        """Regroupe les fichiers de chaque année en un seul fichier."""
+        for partition in sorted(self.root.glob('year=*')):
+            files = sorted(partition.glob('*.parquet'))
+            if len(files) <= 1:
+                continue
+            table = pq.read_table([str(f) for f in files], schema=SCHEMA)
+            stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+            pq.write_table(table, str(partition / f"part-{stamp}-compact.parquet"))
+            for f in files:
+                f.unlink()
+        logger.info(f"Dataset Parquet compacté: {self.root}")
+
+
+def main():
+    """Commandes de maintenance du dataset Parquet."""
+    parser = argparse.ArgumentParser(description="Dataset Parquet des arrêtés")
+    parser.add_argument('--rebuild', action='store_true', help="Reconstruire le dataset depuis le CSV")
+    parser.add_argument('--compact', action='store_true', help="Regrouper les fichiers de chaque année")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    store = ParquetStore()
+    if args.rebuild:
+        store.rebuild_from_csv()
+    else:
+        store.sync_with_csv()
+    if args.compact:
+        store.compact()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""Parsing des pages de résultats BOVP (moteurs BeautifulSoup et lxml)."""
+import logging
+import re
+from typing import Dict, List, Optional
+
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+# Patterns d'extraction de l'explnum_id, testés dans cet ordre
+# Pattern principal: open_visionneuse(sendToVisionneuse,44443)
+EXPLNUM_PATTERNS = [
+    (r'sendToVisionneuse[,\s]+(\d+)', 'sendToVisionneuse'),
+    (r'open_visionneuse[^\d]*(\d+)', 'open_visionneuse'),
+    (r'openDocument[^\d]*(\d+)', 'openDocument'),
+    (r'viewDocument[^\d]*(\d+)', 'viewDocument'),
+    (r'showPDF[^\d]*(\d+)', 'showPDF'),
+    (r'explnum[_-]?id[^\d]*(\d+)', 'explnum_id'),
+]
+
+NAVBAR_TOTAL_RE = re.compile(r'(\d+)\s*/\s*(\d+)')
+
+
+def empty_fields() -> Dict[str, str]:
+    """Champs extraits du HTML pour un arrêté, vides par défaut."""
+    return {
+        'autorite_responsable': '',
+        'signataire': '',
+        'date_publication': '',
+        'date_signature': '',
+        'poids_pdf_ko': '',
+        'explnum_id': '',
+    }
+
+
+def _apply_label(fields: Dict[str, str], label_text: str, content_text: str):
+    """Range la valeur d'une ligne du tableau de métadonnées selon son libellé."""
+    if 'Date de publication' in label_text:
+        fields['date_publication'] = content_text
+    elif 'Date de la signature' in label_text or 'Date de signature' in label_text:
+        fields['date_signature'] = content_text
+    elif 'Poids' in label_text:
+        fields['poids_pdf_ko'] = content_text
+
+
+class Bs4ResultParser:
+    """Parser historique basé sur BeautifulSoup."""
+
+    name = 'bs4'
+
+    # BeautifulSoup est importé au premier parsing : le moteur lxml ne le charge jamais
+
+    def find_arrete_headings(self, content: str) -> List:
+        """
+        Retourne les éléments de titre (h2/h3/h4) contenant "Arrêté n°".
+
+        Le site BOVP n'utilise pas de divs conteneurs avec classes CSS : les résultats
+        sont identifiés par leurs éléments de titre.
+        """
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(content, 'lxml')
+        heading_elements = soup.find_all(['h2', 'h3', 'h4'])
+        return [h for h in heading_elements if h.get_text() and 'Arrêté n°' in h.get_text()]
+
+    def total_results(self, content: str) -> int:
+        """Extrait le nombre total de résultats depuis la barre de navigation."""
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(content, 'lxml')
+        pagination_info = soup.find('div', class_='navbar')
+        if pagination_info:
+            match = NAVBAR_TOTAL_RE.search(pagination_info.get_text())
+            if match:
+                return int(match.group(2))
+        return 0
+
+    def heading_title(self, heading) -> str:
+        """Titre de l'arrêté (texte du heading)."""
+        return heading.get_text(strip=True)
+
+    def find_explnum_id(self, heading) -> Optional[str]:
+        """Cherche l'explnum_id dans les liens du heading (onclick puis href, par pattern)."""
+        # Support multiple patterns for resilience
+        heading_links = heading.find_all('a')
+        for link in heading_links:
+            onclick = link.get('onclick', '')
+            href = link.get('href', '')
+
+            for pattern, pattern_name in EXPLNUM_PATTERNS:
+                # Try onclick attribute
+                if onclick:
+                    explnum_match = re.search(pattern, onclick, re.IGNORECASE)
+                    if explnum_match:
+                        logger.debug(f"✓ explnum_id trouvé dans onclick via {pattern_name}: {explnum_match.group(1)}")
+                        return explnum_match.group(1)
+                # Try href attribute
+                if href:
+                    explnum_match = re.search(pattern, href, re.IGNORECASE)
+                    if explnum_match:
+                        logger.debug(f"✓ explnum_id trouvé dans href via {pattern_name}: {explnum_match.group(1)}")
+                        return explnum_match.group(1)
+        return None
+
+    def extract_fields(self, heading) -> Dict[str, str]:
+        """
+        Extrait explnum_id, autorité, signataire, dates et poids autour d'un heading.
+        Le site BOVP n'utilise pas de divs conteneurs, on doit remonter au parent.
+        """
+        fields = empty_fields()
+
+        # D'abord chercher l'explnum_id dans l'élément de titre lui-même
+        fields['explnum_id'] = self.find_explnum_id(heading) or ''
+
+        # Les métadonnées ne sont pas siblings directs du heading, mais dans le conteneur parent
+        # Remonter au conteneur parent (div avec classes comme descr_notice_corps, notice_corps, etc.)
+        parent = heading.parent
+        while parent:
+            if parent.name == 'div':
+                classes = parent.get('class', [])
+                if classes:
+                    # Use regex pattern matching for more resilience
+                    classes_str = ' '.join(classes)
+                    if re.search(r'(descr_)?notice(_corps)?|result|item', classes_str, re.IGNORECASE):
+                        break
+            parent = parent.parent
+
+        # Si on a trouvé le bon parent, chercher dans ses descendants
+        if parent:
+            # 1. Chercher autorité responsable et signataire dans <span> avec classe contenant "auteur"
+            auteur_spans = parent.find_all('span', class_=re.compile(r'auteur.*|author.*|signataire.*', re.IGNORECASE))
+            if auteur_spans and len(auteur_spans) >= 1:
+                # Le premier span est l'autorité responsable
+                fields['autorite_responsable'] = auteur_spans[0].get_text(strip=True).replace('\xa0', ' ')
+                # Le second span (si présent) est le signataire
+                if len(auteur_spans) >= 2:
+                    fields['signataire'] = auteur_spans[1].get_text(strip=True).replace('\xa0', ' ')
+
+            # 2. Chercher les dates et poids dans <table> avec classe contenant "notice" ou "descr"
+            table = parent.find('table', class_=re.compile(r'descr.*|notice.*|metadata.*|info.*', re.IGNORECASE))
+            if table:
+                rows = table.find_all('tr', class_=re.compile(r'record.*|row.*|p_perso.*', re.IGNORECASE))
+                for row in rows:
+                    # Try to find label and content cells with flexible class matching
+                    label = row.find('td', class_=re.compile(r'label.*|key.*', re.IGNORECASE))
+                    content = row.find('td', class_=re.compile(r'.*content.*|value.*', re.IGNORECASE))
+                    if label and content:
+                        _apply_label(fields, label.get_text(strip=True), content.get_text(strip=True))
+
+        return fields
+
+
+class LxmlResultParser:
+    """
+    Parser rapide basé directement sur lxml.
+
+    Mêmes règles d'extraction que Bs4ResultParser, mais avec des itérateurs lxml natifs,
+    une expression XPath et des regex compilées une seule fois, sans construire d'arbre
+    BeautifulSoup.
+    """
+
+    name = 'lxml'
+
+    _html_parser = etree.HTMLParser()
+    _navbar = etree.XPath("(//div[contains(concat(' ', normalize-space(@class), ' '), ' navbar ')])[1]")
+
+    _explnum_patterns = [(re.compile(pattern, re.IGNORECASE), name) for pattern, name in EXPLNUM_PATTERNS]
+    _container_class = re.compile(r'(descr_)?notice(_corps)?|result|item', re.IGNORECASE)
+    _auteur_class = re.compile(r'auteur.*|author.*|signataire.*', re.IGNORECASE)
+    _table_class = re.compile(r'descr.*|notice.*|metadata.*|info.*', re.IGNORECASE)
+    _row_class = re.compile(r'record.*|row.*|p_perso.*', re.IGNORECASE)
+    _label_class = re.compile(r'label.*|key.*', re.IGNORECASE)
+    _content_class = re.compile(r'.*content.*|value.*', re.IGNORECASE)
+
+    def _document(self, content: str):
+        return etree.fromstring(content, self._html_parser)
+
+    def _text(self, element, strip: bool = False) -> str:
+        """Équivalent de get_text() / get_text(strip=True) de BeautifulSoup."""
+        texts = element.itertext()
+        if not strip:
+            return ''.join(texts)
+        return ''.join([t for t in map(str.strip, texts) if t])
+
+    @staticmethod
+    def _has_class(element, pattern) -> bool:
+        """Équivalent du filtre class_=re.compile(...) de BeautifulSoup (regex testée sur chaque classe)."""
+        classes = element.get('class')
+        return bool(classes) and any(pattern.search(css_class) for css_class in classes.split())
+
+    def _find_all(self, element, tag: str, pattern) -> List:
+        """Descendants <tag> dont une classe correspond au pattern (find_all(tag, class_=...))."""
+        return [e for e in element.iterdescendants(tag) if self._has_class(e, pattern)]
+
+    def _find(self, element, tag: str, pattern):
+        """Premier descendant <tag> dont une classe correspond au pattern (find(tag, class_=...))."""
+        for e in element.iterdescendants(tag):
+            if self._has_class(e, pattern):
+                return e
+        return None
+
+    def find_arrete_headings(self, content: str) -> List:
+        """Retourne les éléments de titre (h2/h3/h4) contenant "Arrêté n°"."""
+        document = self._document(content)
+        if document is None:
+            return []
+        return [h for h in document.iter('h2', 'h3', 'h4') if 'Arrêté n°' in self._text(h)]
+
+    def total_results(self, content: str) -> int:
+        """Extrait le nombre total de résultats depuis la barre de navigation."""
+        document = self._document(content)
+        navbar = self._navbar(document) if document is not None else None
+        if navbar:
+            match = NAVBAR_TOTAL_RE.search(self._text(navbar[0]))
+            if match:
+                return int(match.group(2))
+        return 0
+
+    def heading_title(self, heading) -> str:
+        """Titre de l'arrêté (texte du heading)."""
+        return self._text(heading, strip=True)
+
+    def find_explnum_id(self, heading) -> Optional[str]:
+        """Cherche l'explnum_id dans les liens du heading (onclick puis href, par pattern)."""
+        for link in heading.iterdescendants('a'):
+            onclick = link.get('onclick', '')
+            href = link.get('href', '')
+
+            for pattern, pattern_name in self._explnum_patterns:
+                if onclick:
+                    explnum_match = pattern.search(onclick)
+                    if explnum_match:
+                        logger.debug(f"✓ explnum_id trouvé dans onclick via {pattern_name}: {explnum_match.group(1)}")
+                        return explnum_match.group(1)
+                if href:
+                    explnum_match = pattern.search(href)
+                    if explnum_match:
+                        logger.debug(f"✓ explnum_id trouvé dans href via {pattern_name}: {explnum_match.group(1)}")
+                        return explnum_match.group(1)
+        return None
+
+    def _find_container(self, heading):
+        """Remonte au premier <div> ancêtre dont les classes ressemblent à un conteneur de notice."""
+        for ancestor in heading.iterancestors('div'):
+            classes = ancestor.get('class')
+            if classes and self._container_class.search(' '.join(classes.split())):
+                return ancestor
+        return None
+
+    def extract_fields(self, heading) -> Dict[str, str]:
+        """Extrait explnum_id, autorité, signataire, dates et poids autour d'un heading."""
+        fields = empty_fields()
+        fields['explnum_id'] = self.find_explnum_id(heading) or ''
+
+        parent = self._find_container(heading)
+        if parent is None:
+            return fields
+
+        auteur_spans = self._find_all(parent, 'span', self._auteur_class)
+        if auteur_spans:
+            fields['autorite_responsable'] = self._text(auteur_spans[0], strip=True).replace('\xa0', ' ')
+            if len(auteur_spans) >= 2:
+                fields['signataire'] = self._text(auteur_spans[1], strip=True).replace('\xa0', ' ')
+
+        table = self._find(parent, 'table', self._table_class)
+        if table is not None:
+            for row in self._find_all(table, 'tr', self._row_class):
+                label = self._find(row, 'td', self._label_class)
+                content = self._find(row, 'td', self._content_class)
+                if label is not None and content is not None:
+                    _apply_label(fields, self._text(label, strip=True), self._text(content, strip=True))
+
+        return fields
+
+
+PARSERS = {
+    Bs4ResultParser.name: Bs4ResultParser,
+    LxmlResultParser.name: LxmlResultParser,
+}
+
+
+def get_parser(engine: str):
+    """Instancie le parser de pages de résultats correspondant à PARSER_ENGINE."""
+    try:
+        return PARSERS[engine]()
+    except KeyError:
+        raise ValueError(f"Moteur de parsing inconnu: '{engine}' (options: {', '.join(PARSERS)})")
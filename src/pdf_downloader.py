@@ -0,0 +1,197 @@
+"""Téléchargement des PDFs via un client HTTP asynchrone mutualisé (sans navigateur)."""
+import hashlib
+import logging
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import IO, TYPE_CHECKING, Dict, List, Optional
+
+from rate_limiter import AdaptiveLimiter, CONGESTION_STATUSES
+from transfer_stats import TransferStats
+from config import (
+    BASE_URL,
+    PDF_DOWNLOAD_TIMEOUT,
+    HTTP_POOL_SIZE,
+    HTTP_POOL_SIZE_PER_HOST,
+    HTTP_KEEPALIVE_TIMEOUT,
+    PDF_CHUNK_SIZE,
+    PDF_SPOOL_THRESHOLD
+)
+
+if TYPE_CHECKING:
+    import aiohttp
+    from yarl import URL
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DownloadedPdf:
+    """
+    PDF téléchargé en streaming.
+
+    Le contenu est conservé en mémoire jusqu'à PDF_SPOOL_THRESHOLD octets, puis
+    sur disque au-delà ; les hashs sont calculés au fil de la lecture (MD5 pour la
+    clé S3, SHA-256 pour l'index des contenus).
+    """
+    fileobj: IO[bytes]
+    size: int
+    md5: str
+    sha256: str = ''
+
+    def close(self):
+        """Libère le fichier temporaire."""
+        self.fileobj.close()
+
+
+class PdfDownloader:
+    """
+    Client HTTP mutualisé pour télécharger les PDFs depuis doc_num_data.php.
+
+    Les connexions sont conservées (keep-alive) et partagées entre tous les
+    téléchargements. Les cookies de session sont repris du contexte Playwright
+    une fois la session établie sur la page d'accueil.
+
+    La session (et aiohttp) n'est ouverte qu'au premier téléchargement : un run sans
+    nouvel arrêté ne la construit jamais.
+    """
+
+    def __init__(self, limiter: AdaptiveLimiter, user_agent: Optional[str] = None,
+                 extra_headers: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            limiter: Limiteur adaptatif partagé des requêtes vers BOVP
+            user_agent: User-Agent à utiliser (le même que le navigateur)
+            extra_headers: En-têtes HTTP additionnels envoyés avec chaque requête
+        """
+        self.limiter = limiter
+        self.user_agent = user_agent
+        self.extra_headers = extra_headers or {}
+        self.session: Optional['aiohttp.ClientSession'] = None
+        self.cookies: List[Dict] = []
+        self.stats = TransferStats('Téléchargements')
+
+    async def start(self, cookies: Optional[List[Dict]] = None):
+        """
+        Prépare la session HTTP, ouverte au premier téléchargement.
+
+        Args:
+            cookies: Cookies au format Playwright (résultat de context.cookies())
+        """
+        self.cookies = cookies or []
+
+    def _open_session(self):
+        """Ouvre la session HTTP (dans la boucle asyncio) et y importe les cookies du navigateur."""
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_SIZE,
+            limit_per_host=HTTP_POOL_SIZE_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            ssl=False,  # Équivalent de ignore_https_errors côté Playwright
+        )
+        headers = dict(self.extra_headers)
+        if self.user_agent:
+            headers['User-Agent'] = self.user_agent
+
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers=headers,
+            cookie_jar=aiohttp.CookieJar(),
+            timeout=aiohttp.ClientTimeout(total=PDF_DOWNLOAD_TIMEOUT / 1000),
+        )
+
+        if self.cookies:
+            self.load_cookies(self.cookies)
+
+        logger.info(f"Client HTTP PDF prêt (pool: {HTTP_POOL_SIZE} connexions, "
+                    f"{HTTP_POOL_SIZE_PER_HOST} par hôte)")
+
+    def load_cookies(self, cookies: List[Dict]):
+        """Importe les cookies du contexte Playwright dans la session HTTP."""
+        for cookie in cookies:
+            self.session.cookie_jar.update_cookies(
+                {cookie['name']: cookie['value']},
+                response_url=self._cookie_url(cookie)
+            )
+        logger.debug(f"{len(cookies)} cookies importés depuis le navigateur")
+
+    @staticmethod
+    def _cookie_url(cookie: Dict) -> 'URL':
+        """Construit l'URL d'origine d'un cookie pour le cookie jar aiohttp."""
+        from yarl import URL
+
+        domain = cookie.get('domain', '').lstrip('.')
+        if not domain:
+            return URL(BASE_URL)
+        scheme = 'https' if cookie.get('secure') else 'http'
+        return URL(f"{scheme}://{domain}{cookie.get('path', '/')}")
+
+    async def close(self):
+        """Ferme la session HTTP et libère les connexions."""
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    async def download(self, explnum_id: str) -> Optional[DownloadedPdf]:
+        """
+        Télécharge un PDF depuis doc_num_data.php en streaming.
+
+        Les blocs reçus sont hachés au fil de l'eau et écrits dans un fichier temporaire
+        « spoolé » : la mémoire utilisée est bornée quelle que soit la taille du PDF.
+
+        Args:
+            explnum_id: ID du document numérique
+
+        Returns:
+            PDF téléchargé (à fermer par l'appelant) ou None si échec
+        """
+        pdf_url = f"{BASE_URL}/doc_num_data.php?explnum_id={explnum_id}"
+        logger.debug(f"Téléchargement PDF depuis: {pdf_url}")
+
+        if self.session is None:
+            self._open_session()
+
+        spool = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_THRESHOLD)
+        # Latence mesurée à partir de l'obtention d'un emplacement du limiteur (attente exclue)
+        started_at = None
+        try:
+            async with self.limiter.acquire() as slot:
+                started_at = time.monotonic()
+                async with self.session.get(pdf_url) as response:
+                    if response.status in CONGESTION_STATUSES:
+                        slot.congestion(f"HTTP {response.status}")
+                    if not 200 <= response.status < 300:
+                        logger.warning(f"Échec HTTP {response.status} pour explnum_id={explnum_id}")
+                        spool.close()
+                        self.stats.record(started_at, 0, success=False)
+                        return None
+
+                    content_type = response.headers.get('content-type', '')
+                    if 'application/pdf' not in content_type and 'application/octet-stream' not in content_type:
+                        logger.warning(f"Type de contenu inattendu pour {explnum_id}: {content_type}")
+                        spool.close()
+                        self.stats.record(started_at, 0, success=False)
+                        return None
+
+                    content_hash = hashlib.md5()
+                    content_sha256 = hashlib.sha256()
+                    size = 0
+                    async for chunk in response.content.iter_chunked(PDF_CHUNK_SIZE):
+                        content_hash.update(chunk)
+                        content_sha256.update(chunk)
+                        spool.write(chunk)
+                        size += len(chunk)
+
+            spool.seek(0)
+            self.stats.record(started_at, size)
+            logger.debug(f"✓ PDF téléchargé: {size} octets")
+            return DownloadedPdf(fileobj=spool, size=size, md5=content_hash.hexdigest(),
+                                 sha256=content_sha256.hexdigest())
+
+        except Exception as e:
+            spool.close()
+            if started_at is not None:
+                self.stats.record(started_at, 0, success=False)
+            logger.error(f"Erreur lors du téléchargement du PDF {explnum_id}: {e}")
+            return None
@@ -0,0 +1,287 @@
+"""Profilage du scraper (--profile) : CPU échantillonné (flamegraph) et mémoire par page de résultats."""
+import argparse
+import gc
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from config import PROFILE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Intervalle entre deux échantillons de la pile d'appels (secondes)
+SAMPLE_INTERVAL = 0.005
+
+# Profondeur des tracebacks mémorisés par tracemalloc : chaque niveau ralentit les allocations
+TRACEMALLOC_FRAMES = 5
+
+# Nombre de sites d'allocation et de fonctions rapportés par page
+TOP_N = 10
+
+# Allocations du profilage lui-même, exclues des rapports
+_IGNORED_TRACES = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{Path(code.co_filename).name}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _rss_bytes() -> Optional[int]:
+    """Mémoire résidente actuelle du processus (Linux), None si indisponible."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _max_rss_bytes() -> int:
+    """Pic de mémoire résidente du processus (ru_maxrss est en Ko sous Linux, en octets sous macOS)."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+class SamplingProfiler:
+    """
+    Profileur CPU par échantillonnage : un thread relève la pile d'appels du thread
+    profilé toutes les SAMPLE_INTERVAL secondes, sans instrumenter chaque appel.
+
+    Les piles sont agrégées au format « collapsed » (`a;b;c 12`), lu par flamegraph.pl,
+    speedscope ou inferno. Avec asyncio, la pile relevée est celle de la coroutine en
+    cours d'exécution (le temps passé à attendre le réseau n'apparaît pas).
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks: Counter = Counter()
+        # Piles relevées depuis la dernière page (fonctions les plus coûteuses de la page)
+        self.window: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Pas d'échantillon pendant les instantanés mémoire (le profilage ne se profile pas lui-même)
+        self._paused = False
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    @contextmanager
+    def pause(self) -> Iterator[None]:
+        self._paused = True
+        try:
+            yield
+        finally:
+            self._paused = False
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if self._paused:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            stack = ';'.join(reversed(names))
+            with self._lock:
+                self.stacks[stack] += 1
+                self.window[stack] += 1
+
+    def take_window(self) -> Counter:
+        """Piles relevées depuis l'appel précédent."""
+        with self._lock:
+            window, self.window = self.window, Counter()
+        return window
+
+    @staticmethod
+    def top_functions(stacks: Counter, limit: int = TOP_N) -> List[Dict]:
+        """Fonctions en cours d'exécution (feuille de la pile) dans le plus d'échantillons."""
+        leaves: Counter = Counter()
+        for stack, count in stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [{'function': name, 'samples': count, 'share': round(count / total, 3)}
+                for name, count in leaves.most_common(limit)]
+
+    def write_collapsed(self, path: Path):
+        """Écrit les piles au format collapsed (une ligne par pile : `a;b;c nombre`)."""
+        with self._lock:
+            stacks = sorted(self.stacks.items())
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in stacks:
+                f.write(f"{stack} {count}\n")
+
+
+class RunProfiler:
+    """
+    Profilage d'un run du scraper : CPU échantillonné sur tout le run, et à chaque page
+    de résultats un instantané tracemalloc comparé au précédent (sites d'allocation qui
+    ont le plus grossi), avec le temps CPU et la mémoire de la page.
+
+    Les rapports sont écrits dans un sous-répertoire horodaté de PROFILE_DIR :
+    - `cpu.folded` : piles au format collapsed pour un flamegraph
+    - `pages.jsonl` : une ligne JSON par page (CPU, mémoire, allocations, fonctions)
+    - `summary.txt` : croissance des sites d'allocation sur tout le run (fuites)
+    """
+
+    def __init__(self, output_dir: Optional[Path] = None, interval: float = SAMPLE_INTERVAL):
+        self.output_dir = output_dir or PROFILE_DIR / datetime.now().strftime('%Y%m%dT%H%M%S')
+        self.sampler = SamplingProfiler(interval)
+        self.pages = 0
+        self._pages_file = None
+        self._first_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._last_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._started_at = 0.0
+        self._last_wall = 0.0
+        self._last_cpu = 0.0
+
+    def start(self):
+        """Démarre l'échantillonnage CPU et le suivi des allocations."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._pages_file = open(self.output_dir / 'pages.jsonl', 'w', encoding='utf-8')
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._first_snapshot = self._last_snapshot = self._snapshot()
+        self._started_at = self._last_wall = time.perf_counter()
+        self._last_cpu = time.process_time()
+        self.sampler.start()
+        logger.info(f"Profilage activé: rapports dans {self.output_dir}")
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        # Libérer d'abord les cycles inaccessibles (arbres BeautifulSoup des pages précédentes) :
+        # l'instantané ne garde que la mémoire réellement retenue, et se filtre bien plus vite
+        gc.collect()
+        return tracemalloc.take_snapshot().filter_traces(_IGNORED_TRACES)
+
+    def page_done(self, page_num: int, **info):
+        """
+        Enregistre le rapport d'une page de résultats : écarts de temps et de mémoire
+        depuis la page précédente.
+
+        Args:
+            info: Informations ajoutées au rapport (ex: nombre d'arrêtés en attente)
+        """
+        if self._pages_file is None:
+            return
+        now, cpu = time.perf_counter(), time.process_time()
+        with self.sampler.pause():
+            snapshot = self._snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            growth = snapshot.compare_to(self._last_snapshot, 'lineno')[:TOP_N]
+        report = {
+            'page': page_num,
+            'wall_seconds': round(now - self._last_wall, 3),
+            'cpu_seconds': round(cpu - self._last_cpu, 3),
+            'traced_bytes': current,
+            'traced_peak_bytes': peak,
+            'rss_bytes': _rss_bytes(),
+            'max_rss_bytes': _max_rss_bytes(),
+            **info,
+            'top_allocations': [
+                {'site': str(stat.traceback[0]), 'size_diff': stat.size_diff, 'size': stat.size,
+                 'count_diff': stat.count_diff}
+                for stat in growth if stat.size_diff
+            ],
+            'top_functions': SamplingProfiler.top_functions(self.sampler.take_window()),
+        }
+        self._pages_file.write(json.dumps(report, ensure_ascii=False) + '\n')
+        self._pages_file.flush()
+        self._last_snapshot = snapshot
+        # Le temps de l'instantané lui-même n'est compté dans aucune page
+        self._last_wall, self._last_cpu = time.perf_counter(), time.process_time()
+        self.pages += 1
+        # Le pic est relevé par page
+        tracemalloc.reset_peak()
+
+    def stop(self):
+        """Arrête le profilage et écrit le flamegraph et le résumé du run."""
+        if self._pages_file is None:
+            return
+        self.sampler.stop()
+        final = self._snapshot()
+        current, _ = tracemalloc.get_traced_memory()
+        growth = final.compare_to(self._first_snapshot, 'traceback')[:TOP_N]
+        tracemalloc.stop()
+        self._pages_file.close()
+        self._pages_file = None
+
+        self.sampler.write_collapsed(self.output_dir / 'cpu.folded')
+        lines = [
+            f"Durée: {time.perf_counter() - self._started_at:.1f}s, {self.pages} pages de résultats, "
+            f"{sum(self.sampler.stacks.values())} échantillons CPU",
+            f"Mémoire suivie en fin de run: {current / 1024 / 1024:.1f} Mo, "
+            f"pic RSS: {_max_rss_bytes() / 1024 / 1024:.1f} Mo",
+            "",
+            "Fonctions les plus échantillonnées:",
+        ]
+        for entry in SamplingProfiler.top_functions(self.sampler.stacks):
+            lines.append(f"  {entry['share'] * 100:5.1f}%  {entry['function']}")
+        lines += ["", "Sites d'allocation ayant le plus grossi depuis le début du run:"]
+        for stat in growth:
+            if stat.size_diff <= 0:
+                continue
+            lines.append(f"  +{stat.size_diff / 1024:.1f} Ko ({stat.count_diff:+d} blocs)")
+            lines.extend(f"      {line.strip()}" for line in stat.traceback.format(limit=5, most_recent_first=True))
+        (self.output_dir / 'summary.txt').write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        logger.info(f"Profilage terminé: {self.output_dir}")
+
+
+def main():
+    """Résume les rapports par page d'un profilage."""
+    parser = argparse.ArgumentParser(description="Rapports du profilage du scraper (python scraper.py --profile)")
+    parser.add_argument('directory', nargs='?', type=Path,
+                        help="Répertoire d'un profilage (défaut: le plus récent de data/profile/)")
+    args = parser.parse_args()
+
+    directory = args.directory
+    if directory is None:
+        runs = sorted(path for path in PROFILE_DIR.glob('*') if path.is_dir()) if PROFILE_DIR.exists() else []
+        if not runs:
+            print(f"Aucun profilage dans {PROFILE_DIR} (lancer: python scraper.py --profile)")
+            return
+        directory = runs[-1]
+
+    with open(directory / 'pages.jsonl', encoding='utf-8') as f:
+        for line in f:
+            page = json.loads(line)
+            top = page['top_allocations'][0] if page['top_allocations'] else None
+            growth = f", +{top['size_diff'] / 1024:.0f} Ko {top['site']}" if top else ''
+            print(f"page {page['page']}: {page['wall_seconds']:.1f}s, CPU {page['cpu_seconds']:.2f}s, "
+                  f"mémoire suivie {page['traced_bytes'] / 1024 / 1024:.1f} Mo{growth}")
+    summary = directory / 'summary.txt'
+    if summary.exists():
+        print()
+        print(summary.read_text(encoding='utf-8'), end='')
+    print(f"\nFlamegraph: flamegraph.pl {directory / 'cpu.folded'} > cpu.svg (ou speedscope)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Limitation adaptative du débit de requêtes vers BOVP (AIMD + token bucket)."""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Codes HTTP signalant une surcharge du serveur
+CONGESTION_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Token bucket : au plus `rate` requêtes par seconde, avec des rafales jusqu'à `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Attend qu'un jeton soit disponible puis le consomme."""
+        if self.rate <= 0:
+            return
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class _Slot:
+    """Emplacement de concurrence réservé pour une requête (voir AdaptiveLimiter.acquire)."""
+
+    def __init__(self, limiter: 'AdaptiveLimiter'):
+        self.limiter = limiter
+        self.started_at = 0.0
+        self.congestion_reason: Optional[str] = None
+
+    def congestion(self, reason: str):
+        """Signale que la requête a révélé une surcharge (429, 5xx, timeout...)."""
+        self.congestion_reason = reason
+
+    async def __aenter__(self) -> '_Slot':
+        await self.limiter._acquire()
+        self.started_at = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        latency = time.monotonic() - self.started_at
+        if exc_type is not None and issubclass(exc_type, asyncio.TimeoutError):
+            self.congestion_reason = 'timeout'
+
+        if self.congestion_reason:
+            self.limiter._on_congestion(self.congestion_reason)
+        elif exc_type is None:
+            self.limiter._on_success(latency)
+        await self.limiter._release()
+        return False
+
+
+class AdaptiveLimiter:
+    """
+    Contrôle adaptatif de la concurrence (AIMD) couplé à un plafond de requêtes par seconde.
+
+    - Augmentation additive : environ +1 requête simultanée par « fenêtre » de requêtes
+      réussies, tant que la latence reste proche de la meilleure latence observée.
+    - Diminution multiplicative : la limite est multipliée par `decrease_factor` sur
+      429, 5xx ou timeout (au plus une fois par intervalle de latence, pour ne pas
+      sur-réagir à une rafale d'erreurs simultanées).
+    - Token bucket : jamais plus de `max_rps` requêtes par seconde, quelle que soit la limite.
+
+    Usage:
+        async with limiter.acquire() as slot:
+            response = await fetch()
+            if response.status in CONGESTION_STATUSES:
+                slot.congestion(f"HTTP {response.status}")
+    """
+
+    def __init__(self, initial: float, minimum: float, maximum: float, max_rps: float,
+                 decrease_factor: float = 0.5, latency_tolerance: float = 2.0):
+        self.minimum = max(1.0, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(self.maximum, max(self.minimum, initial))
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.bucket = TokenBucket(max_rps)
+
+        self.in_flight = 0
+        self.best_latency: Optional[float] = None
+        self.avg_latency: Optional[float] = None
+        self.successes = 0
+        self.congestions = 0
+        self._last_decrease_at = 0.0
+        self._condition = asyncio.Condition()
+
+    @property
+    def current_limit(self) -> int:
+        """Nombre de requêtes simultanées actuellement autorisées."""
+        return int(self.limit)
+
+    def acquire(self) -> _Slot:
+        """Réserve un emplacement de concurrence (à utiliser avec `async with`)."""
+        return _Slot(self)
+
+    async def _acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.current_limit)
+            self.in_flight += 1
+        try:
+            await self.bucket.acquire()
+        except BaseException:
+            await self._release()
+            raise
+
+    async def _release(self):
+        # Réveiller les requêtes en attente : un emplacement s'est libéré et la limite a pu augmenter
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def _on_success(self, latency: float):
+        self.successes += 1
+        self.best_latency = latency if self.best_latency is None else min(self.best_latency, latency)
+        self.avg_latency = latency if self.avg_latency is None else 0.8 * self.avg_latency + 0.2 * latency
+
+        # Ne pas accélérer si le serveur ralentit nettement
+        if self.avg_latency > self.best_latency * self.latency_tolerance:
+            return
+
+        previous = self.current_limit
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        if self.current_limit != previous:
+            logger.info(f"Concurrence adaptative: {previous} -> {self.current_limit} "
+                        f"(latence moyenne {self.avg_latency:.2f}s)")
+
+    def _on_congestion(self, reason: str):
+        self.congestions += 1
+        now = time.monotonic()
+        cooldown = self.avg_latency or 1.0
+        if now - self._last_decrease_at < cooldown:
+            return
+        self._last_decrease_at = now
+
+        previous = self.current_limit
+        self.limit = max(self.minimum, self.limit * self.decrease_factor)
+        logger.warning(f"Concurrence adaptative: {previous} -> {self.current_limit} ({reason})")
+
+    def summary(self) -> str:
+        """Résumé de l'état du limiteur pour les logs."""
+        latency = f"{self.avg_latency:.2f}s" if self.avg_latency is not None else "n/a"
+        return (f"concurrence {self.current_limit} (min {int(self.minimum)}, max {int(self.maximum)}), "
+                f"{self.successes} succès, {self.congestions} surcharges, latence moyenne {latency}")
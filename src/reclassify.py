@@ -0,0 +1,104 @@
+"""Recalcule les colonnes de classification de tout le CSV après une modification des mots-clés."""
+import argparse
+import logging
+from typing import Dict, List, Mapping, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from config import CSV_FILE, get_classifier
+from csv_io import read_csv_as_strings, rewrite_csv
+
+logger = logging.getLogger(__name__)
+
+FLAG_COLUMNS = ('concerne_circulation', 'concerne_stationnement', 'est_temporaire')
+
+# Métacaractères RE2 à échapper pour rechercher les mots-clés littéralement
+RE2_SPECIAL_CHARS = set('\\.^$|?*+()[]{}')
+
+
+def _all_false(length: int) -> pa.ChunkedArray:
+    return pa.chunked_array([pa.repeat(False, length)])
+
+
+def _literal_alternation(mots: List[str]) -> str:
+    return '|'.join(''.join('\\' + char if char in RE2_SPECIAL_CHARS else char for char in mot) for mot in mots)
+
+
+def _contains_any(titles_lower: pa.ChunkedArray, mots: List[str]) -> pa.ChunkedArray:
+    """Pour chaque titre, indique si l'un des mots-clés y apparaît (un seul passage RE2 sur la colonne)."""
+    if not mots:
+        return _all_false(len(titles_lower))
+    return pc.match_substring_regex(titles_lower, _literal_alternation(mots))
+
+
+def classify_titles(titles: pa.ChunkedArray, keywords: Mapping[str, List[str]]) -> Dict[str, pa.ChunkedArray]:
+    """
+    Équivalent vectorisé de classify_arrete sur toute une colonne de titres.
+
+    Chaque catégorie est évaluée par une seule expression régulière sur toute la colonne,
+    le cas "stationnement gênant" étant appliqué par masque booléen.
+    """
+    # Même minuscules que str.lower (KeywordClassifier) : utf8_lower ne diffère que sur 'İ',
+    # qui devient 'i' au lieu de 'i' suivi d'un point suscrit combinant
+    titles_lower = pc.utf8_lower(pc.replace_substring(titles, 'İ', 'i\u0307'))
+    genant = _contains_any(titles_lower, keywords['stationnement_genant'])
+    return {
+        'concerne_circulation': pc.and_(pc.invert(genant), _contains_any(titles_lower, keywords['circulation'])),
+        'concerne_stationnement': pc.or_(genant, _contains_any(titles_lower, keywords['stationnement'])),
+        'est_temporaire': _contains_any(titles_lower, keywords['temporaire']),
+    }
+
+
+def reclassify_table(table: pa.Table,
+                     keywords: Mapping[str, List[str]]) -> Tuple[pa.Table, pa.ChunkedArray, Dict[str, int]]:
+    """
+    Remplace les colonnes de classification par leur valeur recalculée ('True' / 'False').
+
+    Returns:
+        La table mise à jour, le masque des lignes modifiées et le nombre de changements
+        par colonne (et au total sous la clé 'rows')
+    """
+    flags = classify_titles(table.column('titre'), keywords)
+    changed_rows = _all_false(table.num_rows)
+    summary = {}
+    for name in FLAG_COLUMNS:
+        new_column = pc.if_else(flags[name], 'True', 'False')
+        changed = pc.not_equal(table.column(name), new_column)
+        summary[name] = pc.sum(changed).as_py() or 0
+        changed_rows = pc.or_(changed_rows, changed)
+        table = table.set_column(table.schema.get_field_index(name), name, new_column)
+    summary['rows'] = pc.sum(changed_rows).as_py() or 0
+    return table, changed_rows, summary
+
+
+def print_summary(table: pa.Table, changed_rows: pa.ChunkedArray, summary: Dict[str, int], show: int):
+    """Affiche le nombre de changements et les premiers arrêtés modifiés avec leur nouvelle classification."""
+    print(f"{summary['rows']} arrêtés reclassés sur {table.num_rows}")
+    for name in FLAG_COLUMNS:
+        print(f"  {name}: {summary[name]} changements")
+    if not summary['rows'] or not show:
+        return
+    examples = table.filter(changed_rows).slice(0, show)
+    for row in examples.select(['numero_arrete', *FLAG_COLUMNS, 'titre']).to_pylist():
+        flags_text = ', '.join(f"{name}={row[name]}" for name in FLAG_COLUMNS)
+        print(f"  {row['numero_arrete']}: {flags_text} - {row['titre'][:80]}")
+
+
+def main():
+    """Recalcule la classification de tous les arrêtés du CSV."""
+    parser = argparse.ArgumentParser(description="Reclassification des arrêtés du CSV")
+    parser.add_argument('--dry-run', action='store_true', help="Afficher les changements sans réécrire le CSV")
+    parser.add_argument('--show', type=int, default=10, help="Nombre d'arrêtés modifiés affichés")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    table = read_csv_as_strings(CSV_FILE)
+    table, changed_rows, summary = reclassify_table(table, get_classifier().keywords)
+    print_summary(table, changed_rows, summary, args.show)
+    if summary['rows'] and not args.dry_run:
+        rewrite_csv(table)
+
+
+if __name__ == "__main__":
+    main()
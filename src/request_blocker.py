@@ -0,0 +1,84 @@
+"""Interception des requêtes des pages Playwright : seul le HTML des pages est chargé."""
+import logging
+from collections import Counter
+from typing import Iterable, Set
+
+from config import BLOCKED_RESOURCE_TYPES, BLOCKED_URL_PATTERNS
+
+logger = logging.getLogger(__name__)
+
+# Types de ressources Playwright (request.resource_type)
+RESOURCE_TYPES = (
+    'document', 'stylesheet', 'image', 'media', 'font', 'script', 'texttrack',
+    'xhr', 'fetch', 'eventsource', 'websocket', 'manifest', 'other',
+)
+
+# Taille moyenne estimée (octets) d'une ressource bloquée, par type : ordres de grandeur des
+# ressources des pages de l'OPAC. Aucune requête n'est envoyée au site pour la mesurer
+ESTIMATED_SIZES = {
+    'stylesheet': 20 * 1024,
+    'script': 40 * 1024,
+    'image': 8 * 1024,
+    'font': 40 * 1024,
+    'media': 200 * 1024,
+    'xhr': 2 * 1024,
+    'fetch': 2 * 1024,
+}
+
+
+class RequestBlocker:
+    """
+    Route Playwright qui abandonne les requêtes inutiles au parsing : ressources autres
+    que le document (images, CSS, polices, scripts...) et appels AJAX connus de l'OPAC
+    (ajax.php, cart_info.php). Le document HTML n'est jamais bloqué.
+
+    Les requêtes bloquées sont comptées par type de ressource. Les octets évités sont
+    estimés d'après une taille moyenne par type (ESTIMATED_SIZES) : mesurer les ressources
+    bloquées demanderait autant de requêtes au site que l'interception en évite.
+    """
+
+    def __init__(self, resource_types: Iterable[str] = BLOCKED_RESOURCE_TYPES,
+                 url_patterns: Iterable[str] = BLOCKED_URL_PATTERNS):
+        self.resource_types = frozenset(resource_types) - {'document'}
+        self.url_patterns = tuple(url_patterns)
+        self.blocked: Counter = Counter()
+        # URLs distinctes bloquées
+        self.blocked_urls: Set[str] = set()
+
+    async def install(self, context):
+        """Intercepte toutes les requêtes des pages du contexte Playwright (pages déjà ouvertes comprises)."""
+        await context.route('**/*', self.handle)
+        logger.info(f"Interception des requêtes: types bloqués {', '.join(sorted(self.resource_types)) or 'aucun'}, "
+                    f"URLs bloquées {', '.join(self.url_patterns) or 'aucune'}")
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        if resource_type == 'document':
+            return False
+        return resource_type in self.resource_types or any(pattern in url for pattern in self.url_patterns)
+
+    async def handle(self, route):
+        """Handler de context.route : abandonne la requête ou la laisse passer."""
+        request = route.request
+        if not self.should_block(request.resource_type, request.url):
+            await route.continue_()
+            return
+
+        self.blocked[request.resource_type] += 1
+        self.blocked_urls.add(request.url)
+        await route.abort('blockedbyclient')
+
+    @property
+    def blocked_requests(self) -> int:
+        return sum(self.blocked.values())
+
+    def bytes_saved(self) -> int:
+        """Octets évités (estimation d'après ESTIMATED_SIZES, 0 pour les autres types)."""
+        return sum(count * ESTIMATED_SIZES.get(resource_type, 0) for resource_type, count in self.blocked.items())
+
+    def summary(self) -> str:
+        """Résumé pour les logs."""
+        if not self.blocked:
+            return "Interception des requêtes: aucune requête bloquée"
+        by_type = ', '.join(f"{resource_type}: {count}" for resource_type, count in self.blocked.most_common())
+        return (f"Interception des requêtes: {self.blocked_requests} requêtes bloquées ({by_type}), "
+                f"~{self.bytes_saved() / 1024:.0f} Ko évités (estimation, {len(self.blocked_urls)} URLs distinctes)")
@@ -1,11 +1,14 @@
 """Gestion de l'upload des PDFs vers S3."""
-import boto3
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Callable, Dict, Optional, Set, Tuple
 import hashlib
-from botocore.exceptions import ClientError
-from botocore.config import Config
+import io
+import tempfile
+import threading
+import time
 
 from config import (
     AWS_ACCESS_KEY_ID,
@@ -13,51 +16,274 @@ from config import (
     AWS_REGION,
     S3_BUCKET_NAME,
     S3_ENDPOINT_URL,
+    S3_MULTIPART_THRESHOLD,
+    S3_MULTIPART_CHUNKSIZE,
+    S3_UPLOAD_WORKERS,
+    S3_MAX_POOL_CONNECTIONS,
+    S3_INVENTORY_TTL,
     DRY_RUN
 )
+from content_index import ContentIndex
+from transfer_stats import TransferStats
 
 logger = logging.getLogger(__name__)
 
 
-class S3Uploader:
-    """Classe pour gérer l'upload des PDFs vers S3."""
+class _PrefixListing:
+    """Listing d'un préfixe en cours, attendu par les autres threads (voir S3KeyInventory._keys)."""
 
     def __init__(self):
-        """Initialise le client S3 ou MinIO."""
-        self.dry_run = DRY_RUN
+        self.done = threading.Event()
+        # Clés uploadées pendant le listing, ajoutées au résultat publié
+        self.added: Set[str] = set()
+        self.keys: Optional[Set[str]] = None
+
+
+class S3KeyInventory:
+    """
+    Inventaire en mémoire des clés existantes du bucket, par préfixe `arretes/{année}/`.
+
+    Chaque préfixe est listé une fois (list_objects_v2 paginé, 1000 clés par requête) au
+    premier besoin, puis relisté après `ttl` secondes. Les clés uploadées pendant le run
+    sont ajoutées directement. Un listing remplace ainsi un head_object par PDF.
+    Partagé par les threads d'upload : le verrou ne protège que les structures en mémoire,
+    le listing paginé tourne hors verrou (un seul thread par préfixe, les autres attendent
+    son résultat ou, pendant un rafraîchissement, utilisent l'inventaire expiré).
+    """
+
+    def __init__(self, get_client: Callable, bucket_name: str, ttl: float):
+        """
+        Args:
+            get_client: Retourne le client S3 (construit au premier appel), ou None sans accès au bucket
+        """
+        self._get_client = get_client
+        self.bucket_name = bucket_name
+        self.ttl = ttl
+        # préfixe -> (date du listing en time.monotonic(), clés)
+        self._prefixes: Dict[str, Tuple[float, Set[str]]] = {}
+        # préfixe -> listing en cours
+        self._listings: Dict[str, _PrefixListing] = {}
+        self._lock = threading.Lock()
+        self.list_requests = 0
+        self.lookups = 0
+
+    @property
+    def s3_client(self):
+        return self._get_client()
+
+    @staticmethod
+    def prefix_of(s3_key: str) -> str:
+        """Préfixe d'une clé : "arretes/2025/2025_T_1_ab.pdf" -> "arretes/2025/"."""
+        return s3_key.rsplit('/', 1)[0] + '/' if '/' in s3_key else ''
+
+    def contains(self, s3_key: str) -> Optional[bool]:
+        """Indique si la clé existe, ou None si l'inventaire de son préfixe n'a pas pu être listé."""
+        with self._lock:
+            self.lookups += 1
+        keys = self._keys(self.prefix_of(s3_key))
+        return None if keys is None else s3_key in keys
+
+    def add(self, s3_key: str):
+        """Enregistre une clé uploadée (ou simulée en DRY_RUN)."""
+        prefix = self.prefix_of(s3_key)
+        with self._lock:
+            entry = self._prefixes.get(prefix)
+            listing = self._listings.get(prefix)
+            if entry is not None:
+                entry[1].add(s3_key)
+            if listing is not None:
+                listing.added.add(s3_key)
+            if entry is None and listing is None and self.s3_client is None:
+                self._prefixes[prefix] = (time.monotonic(), {s3_key})
+
+    def _keys(self, prefix: str) -> Optional[Set[str]]:
+        s3_client = self.s3_client
+        with self._lock:
+            entry = self._prefixes.get(prefix)
+            if entry is not None and (s3_client is None or time.monotonic() - entry[0] < self.ttl):
+                return entry[1]
+            if s3_client is None:
+                # DRY_RUN sans accès au bucket : seules les clés simulées pendant le run existent
+                keys: Set[str] = set()
+                self._prefixes[prefix] = (time.monotonic(), keys)
+                return keys
+
+            listing = self._listings.get(prefix)
+            if listing is not None and entry is not None:
+                # Rafraîchissement déjà en cours : l'inventaire expiré reste utilisable
+                return entry[1]
+            owner = listing is None
+            if owner:
+                listing = self._listings[prefix] = _PrefixListing()
+
+        if not owner:
+            listing.done.wait()
+            return listing.keys
+
+        keys, requests = None, 0
+        try:
+            keys, requests = self._list(s3_client, prefix)
+        finally:
+            with self._lock:
+                del self._listings[prefix]
+                self.list_requests += requests
+                if keys is not None:
+                    keys |= listing.added
+                    self._prefixes[prefix] = (time.monotonic(), keys)
+                listing.keys = keys
+            listing.done.set()
+        return keys
+
+    def _list(self, s3_client, prefix: str) -> Tuple[Optional[Set[str]], int]:
+        """Liste les clés du préfixe (hors verrou). Retourne les clés (None en cas d'échec) et le nombre de requêtes."""
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        keys: Set[str] = set()
+        requests = 0
+        try:
+            paginator = s3_client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+                requests += 1
+                keys.update(obj['Key'] for obj in page.get('Contents', []))
+        except (ClientError, BotoCoreError) as e:
+            # Refus d'accès comme erreur réseau (EndpointConnectionError, timeout de lecture)
+            logger.warning(f"Impossible de lister {prefix} sur S3, vérification PDF par PDF: {e}")
+            return None, requests
+        logger.info(f"Inventaire S3 {prefix}: {len(keys)} PDFs existants")
+        return keys, requests
+
+    def summary(self) -> str:
+        """Résumé pour les logs."""
+        return (f"Inventaire S3: {len(self._prefixes)} préfixes, {self.list_requests} requêtes de listing "
+                f"pour {self.lookups} vérifications d'existence")
+
+
+class S3Uploader:
+    """
+    Classe pour gérer l'upload des PDFs vers S3.
+
+    Les appels boto3 sont bloquants : depuis asyncio, utiliser upload_pdf_stream_async,
+    qui les exécute dans un pool de S3_UPLOAD_WORKERS threads partageant un même client
+    (et donc un même pool de S3_MAX_POOL_CONNECTIONS connexions).
+
+    Le client (et boto3) n'est construit qu'au premier appel S3 : un run sans nouveau PDF
+    ne le charge jamais.
+    """
+
+    def __init__(self, s3_client=None, dry_run: Optional[bool] = None, content_index=None):
+        """
+        Initialise le client S3 ou MinIO.
+
+        Args:
+            s3_client: Client S3 à utiliser à la place de celui construit depuis la configuration
+                (tests contre un S3 local ou simulé)
+            dry_run: Remplace DRY_RUN si précisé
+            content_index: Index SHA-256 -> clé S3 canonique (ContentIndex) ; si fourni, un
+                contenu déjà uploadé n'est pas renvoyé, l'URL de sa clé canonique est réutilisée
+        """
+        self.dry_run = DRY_RUN if dry_run is None else dry_run
         self.bucket_name = S3_BUCKET_NAME or "dry-run-bucket"
         self.endpoint_url = S3_ENDPOINT_URL
+        self._transfer_config = None
+        self.executor = ThreadPoolExecutor(max_workers=S3_UPLOAD_WORKERS, thread_name_prefix='s3-upload')
+        self.stats = TransferStats('Uploads S3')
+        self.content_index = content_index
+        # Uploads évités grâce à l'index des contenus
+        self.deduplicated = 0
+        self.deduplicated_bytes = 0
+        # SHA-256 en cours d'upload -> URL du PDF (None si l'upload échoue), pour les doublons simultanés
+        self._uploads_in_flight: Dict[str, asyncio.Future] = {}
+        # Fusion de la copie de l'index des contenus gardée dans le bucket, une fois avant la première
+        # déduplication du run : None tant qu'elle n'a pas eu lieu, puis réussie ou non
+        self.content_index_merged: Optional[bool] = None
+        self._content_index_merge: Optional[asyncio.Future] = None
+        # Nouvelles tentatives faites par botocore (erreurs réseau, throttling), tous appels confondus
+        self.retries = 0
+        self._retries_lock = threading.Lock()
 
-        if not self.dry_run:
-            # Configuration du client S3/MinIO
-            client_config = {
-                'aws_access_key_id': AWS_ACCESS_KEY_ID,
-                'aws_secret_access_key': AWS_SECRET_ACCESS_KEY,
-                'region_name': AWS_REGION
-            }
-
-            # Ajouter l'endpoint_url si spécifié (pour MinIO ou S3 compatible)
-            if self.endpoint_url:
-                client_config['endpoint_url'] = self.endpoint_url
-                # Configuration spéciale pour MinIO :
-                # - signature V4 obligatoire
-                # - path-style addressing (pas de virtual-hosted style)
-                client_config['config'] = Config(
-                    signature_version='s3v4',
-                    s3={'addressing_style': 'path'}
-                )
-                logger.info(f"Utilisation de l'endpoint S3 personnalisé (MinIO): {self.endpoint_url}")
-            else:
-                logger.info("Utilisation d'AWS S3")
-
-            self.s3_client = boto3.client('s3', **client_config)
-        else:
-            self.s3_client = None
+        self._s3_client = s3_client
+        # En DRY_RUN, le client ne sert qu'à lister les clés existantes (lecture seule),
+        # pour que les PDFs « déjà existants » soient les mêmes qu'en run réel
+        self._client_pending = s3_client is None and (not self.dry_run or bool(AWS_ACCESS_KEY_ID and S3_BUCKET_NAME))
+        self._client_lock = threading.Lock()
+
+        if self.dry_run:
             logger.info("Mode DRY_RUN activé: aucun upload S3 ne sera effectué")
 
+        self.inventory = S3KeyInventory(lambda: self.s3_client, self.bucket_name, ttl=S3_INVENTORY_TTL) \
+            if S3_INVENTORY_TTL > 0 else None
+
+    @property
+    def s3_client(self):
+        """Client S3, construit au premier accès (None en DRY_RUN sans accès au bucket)."""
+        if self._client_pending:
+            # Les threads d'upload peuvent y accéder en même temps au premier PDF
+            with self._client_lock:
+                if self._client_pending:
+                    self._s3_client = self._create_client()
+                    self._client_pending = False
+        return self._s3_client
+
+    @property
+    def transfer_config(self):
+        """Réglages des uploads multipart (boto3.s3.transfer importé au premier upload)."""
+        if self._transfer_config is None:
+            from boto3.s3.transfer import TransferConfig
+
+            # Upload en plusieurs parts au-delà du seuil, pour ne jamais envoyer un gros PDF d'un bloc
+            # Les parts d'un upload multipart se partagent le pool de connexions avec les autres uploads
+            self._transfer_config = TransferConfig(
+                multipart_threshold=S3_MULTIPART_THRESHOLD,
+                multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+                max_concurrency=max(1, S3_MAX_POOL_CONNECTIONS // S3_UPLOAD_WORKERS)
+            )
+        return self._transfer_config
+
+    def _create_client(self):
+        """Construit le client S3/MinIO à partir de la configuration."""
+        import boto3
+        from botocore.config import Config
+
+        client_config = {
+            'aws_access_key_id': AWS_ACCESS_KEY_ID,
+            'aws_secret_access_key': AWS_SECRET_ACCESS_KEY,
+            'region_name': AWS_REGION,
+            # Pool dimensionné pour les threads d'upload (10 connexions par défaut dans botocore)
+            'config': Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS)
+        }
+
+        # Ajouter l'endpoint_url si spécifié (pour MinIO ou S3 compatible)
+        if self.endpoint_url:
+            client_config['endpoint_url'] = self.endpoint_url
+            # Configuration spéciale pour MinIO :
+            # - signature V4 obligatoire
+            # - path-style addressing (pas de virtual-hosted style)
+            client_config['config'] = client_config['config'].merge(Config(
+                signature_version='s3v4',
+                s3={'addressing_style': 'path'}
+            ))
+            logger.info(f"Utilisation de l'endpoint S3 personnalisé (MinIO): {self.endpoint_url}")
+        else:
+            logger.info("Utilisation d'AWS S3")
+
+        client = boto3.client('s3', **client_config)
+        client.meta.events.register('after-call.s3', self._count_retries)
+        return client
+
+    def _count_retries(self, parsed=None, **kwargs):
+        """Compte les nouvelles tentatives d'un appel S3 (RetryAttempts de la réponse, appelé dans les threads)."""
+        attempts = ((parsed or {}).get('ResponseMetadata') or {}).get('RetryAttempts') or 0
+        if attempts:
+            with self._retries_lock:
+                self.retries += attempts
+
+    def close(self):
+        """Attend la fin des uploads en cours et libère les threads."""
+        self.executor.shutdown(wait=True)
+
     def upload_pdf(self, pdf_content: bytes, numero_arrete: str) -> Optional[str]:
         """
-        Upload un PDF vers S3.
+        Upload un PDF déjà chargé en mémoire vers S3.
 
         Args:
             pdf_content: Contenu binaire du PDF
@@ -66,35 +292,52 @@ class S3Uploader:
         Returns:
             URL S3 du fichier uploadé, ou None si erreur
         """
-        try:
-            # Nettoyer le numéro d'arrêté pour créer un nom de fichier valide
-            safe_filename = numero_arrete.replace(" ", "_").replace("/", "-")
+        content_hash = hashlib.md5(pdf_content).hexdigest()
+        return self.upload_pdf_stream(io.BytesIO(pdf_content), numero_arrete, content_hash, len(pdf_content))
 
-            # Créer un hash du contenu pour éviter les duplicatas
-            content_hash = hashlib.md5(pdf_content).hexdigest()[:8]
+    def upload_pdf_stream(self, fileobj: BinaryIO, numero_arrete: str,
+                          content_md5: str, size: int) -> Optional[str]:
+        """
+        Upload un PDF vers S3 depuis un fichier, sans le charger entièrement en mémoire.
 
-            # Chemin S3: arretes/2025/2025_T_17858_a1b2c3d4.pdf
-            year = numero_arrete.split()[0] if " " in numero_arrete else "unknown"
-            s3_key = f"arretes/{year}/{safe_filename}_{content_hash}.pdf"
+        Args:
+            fileobj: Fichier (ou fichier temporaire) contenant le PDF
+            numero_arrete: Numéro de l'arrêté (ex: "2025 T 17858")
+            content_md5: Hash MD5 (hexadécimal) du contenu, calculé pendant le téléchargement
+            size: Taille du PDF en octets
 
-            # Mode DRY_RUN: simuler l'upload
-            if self.dry_run:
-                logger.info(f"[DRY_RUN] Simulation upload: {s3_key} ({len(pdf_content)} bytes)")
-                return self._get_s3_url(s3_key)
+        Returns:
+            URL S3 du fichier uploadé, ou None si erreur
+        """
+        from botocore.exceptions import ClientError
+
+        try:
+            s3_key = self.build_s3_key(numero_arrete, content_md5)
 
             # Vérifier si le fichier existe déjà
             if self._file_exists(s3_key):
-                logger.info(f"PDF déjà existant sur S3: {s3_key}")
+                logger.info(f"{'[DRY_RUN] ' if self.dry_run else ''}PDF déjà existant sur S3: {s3_key}")
                 return self._get_s3_url(s3_key)
 
-            # Upload vers S3
+            # Mode DRY_RUN: simuler l'upload
+            if self.dry_run:
+                logger.info(f"[DRY_RUN] Simulation upload: {s3_key} ({size} bytes)")
+                if self.inventory is not None:
+                    self.inventory.add(s3_key)
+                return self._get_s3_url(s3_key)
+
+            # Upload vers S3 (multipart automatique au-delà de S3_MULTIPART_THRESHOLD)
             # Note: Pas de Metadata personnalisée pour compatibilité MinIO
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=s3_key,
-                Body=pdf_content,
-                ContentType='application/pdf'
+            fileobj.seek(0)
+            self.s3_client.upload_fileobj(
+                fileobj,
+                self.bucket_name,
+                s3_key,
+                ExtraArgs={'ContentType': 'application/pdf'},
+                Config=self.transfer_config
             )
+            if self.inventory is not None:
+                self.inventory.add(s3_key)
 
             logger.info(f"PDF uploadé avec succès: {s3_key}")
             return self._get_s3_url(s3_key)
@@ -106,11 +349,141 @@ class S3Uploader:
             logger.error(f"Erreur inattendue lors de l'upload pour {numero_arrete}: {e}")
             return None
 
+    async def upload_pdf_stream_async(self, fileobj: BinaryIO, numero_arrete: str,
+                                      content_md5: str, size: int, content_sha256: str = '') -> Optional[str]:
+        """
+        Version asynchrone de upload_pdf_stream : l'upload tourne dans le pool de threads
+        dédié, sans bloquer la boucle asyncio (et donc les téléchargements en cours).
+
+        Si le SHA-256 du contenu est déjà dans l'index des contenus, rien n'est envoyé :
+        l'URL retournée pointe vers la clé canonique (PDF republié sous un autre numéro,
+        ou retéléchargé après une erreur). Un contenu identique en cours d'upload est
+        attendu puis réutilisé de la même façon.
+        """
+        loop = asyncio.get_running_loop()
+        reservation = None
+        if self.content_index is not None and content_sha256:
+            if self.content_index_merged is None:
+                if self._content_index_merge is None or self._content_index_merge.done():
+                    self._content_index_merge = asyncio.ensure_future(self._merge_bucket_content_index())
+                await asyncio.shield(self._content_index_merge)
+            while True:
+                canonical_key = self.content_index.get(content_sha256)
+                if canonical_key:
+                    return self._deduplicate(numero_arrete, size, self._get_s3_url(canonical_key))
+                in_flight = self._uploads_in_flight.get(content_sha256)
+                if in_flight is None:
+                    break
+                # Même contenu en cours d'upload pour un autre numéro : réutiliser son URL
+                s3_url = await asyncio.shield(in_flight)
+                if s3_url:
+                    return self._deduplicate(numero_arrete, size, s3_url)
+                # Upload échoué : la prochaine itération réserve le contenu pour cet arrêté
+            # Réservé avant l'upload : les doublons arrivant entre-temps attendent son URL
+            reservation = self._uploads_in_flight[content_sha256] = loop.create_future()
+
+        s3_url = None
+        try:
+            started_at, s3_url = await loop.run_in_executor(
+                self.executor, self._timed_upload, fileobj, numero_arrete, content_md5, size
+            )
+            self.stats.record(started_at, size, success=s3_url is not None)
+
+            # Les uploads simulés (DRY_RUN) ne doivent pas servir de clé canonique aux runs réels
+            if s3_url and reservation is not None and not self.dry_run:
+                self.content_index.add(content_sha256, self.build_s3_key(numero_arrete, content_md5),
+                                       size, numero_arrete)
+        finally:
+            if reservation is not None:
+                del self._uploads_in_flight[content_sha256]
+                reservation.set_result(s3_url)
+        return s3_url
+
+    async def _merge_bucket_content_index(self):
+        """Télécharge la copie de l'index des contenus du bucket (dans le pool de threads) et la fusionne."""
+        loop = asyncio.get_running_loop()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / 'pdf_contents.sqlite'
+            try:
+                found = await loop.run_in_executor(self.executor, self._download_content_index, path)
+                count = self.content_index.merge(path) if found else 0
+            except Exception as e:
+                logger.warning(f"Copie de l'index des contenus du bucket illisible, elle ne sera pas remplacée: {e}")
+                self.content_index_merged = False
+                return
+        self.content_index_merged = True
+        if found:
+            logger.info(f"Index des contenus fusionné avec la copie du bucket: {count} contenus ajoutés")
+
+    def _download_content_index(self, path: Path) -> bool:
+        if self.s3_client is None:
+            return False
+        return ContentIndex.download_from_bucket(self.s3_client, self.bucket_name, path)
+
+    def save_content_index(self):
+        """Remplace la copie de l'index des contenus du bucket si le run y a ajouté des contenus."""
+        if self.content_index is None or self.dry_run or not self.content_index.added:
+            return
+        if not self.content_index_merged:
+            # La copie du bucket peut contenir des contenus absents de la base locale
+            logger.warning("Index des contenus non sauvegardé dans le bucket: sa copie n'a pas pu être fusionnée")
+            return
+        try:
+            self.content_index.upload_to_bucket(self.s3_client, self.bucket_name)
+        except Exception as e:
+            logger.error(f"Impossible de sauvegarder l'index des contenus dans le bucket: {e}")
+
+    def _deduplicate(self, numero_arrete: str, size: int, s3_url: str) -> str:
+        """Compte un upload évité et retourne l'URL du contenu déjà sur S3."""
+        self.deduplicated += 1
+        self.deduplicated_bytes += size
+        logger.info(f"♻ Contenu déjà sur S3 pour {numero_arrete}: {s3_url}")
+        return s3_url
+
+    def dedup_summary(self) -> str:
+        """Résumé de la déduplication par contenu pour les logs."""
+        return (f"Déduplication par contenu: {self.deduplicated} uploads évités "
+                f"({self.deduplicated_bytes / 1024 / 1024:.1f} Mo)")
+
+    def _timed_upload(self, fileobj: BinaryIO, numero_arrete: str,
+                      content_md5: str, size: int) -> Tuple[float, Optional[str]]:
+        """Upload exécuté dans un thread ; l'attente d'un thread libre n'est pas comptée dans la latence."""
+        started_at = time.monotonic()
+        return started_at, self.upload_pdf_stream(fileobj, numero_arrete, content_md5, size)
+
+    @staticmethod
+    def build_s3_key(numero_arrete: str, content_md5: str) -> str:
+        """
+        Construit la clé S3 d'un PDF.
+
+        Ex: ("2025 T 17858", "a1b2c3d4...") -> "arretes/2025/2025_T_17858_a1b2c3d4.pdf"
+        """
+        # Nettoyer le numéro d'arrêté pour créer un nom de fichier valide
+        safe_filename = numero_arrete.replace(" ", "_").replace("/", "-")
+
+        # Les 8 premiers caractères du hash évitent les duplicatas
+        content_hash = content_md5[:8]
+
+        year = numero_arrete.split()[0] if " " in numero_arrete else "unknown"
+        return f"arretes/{year}/{safe_filename}_{content_hash}.pdf"
+
     def _file_exists(self, s3_key: str) -> bool:
-        """Vérifie si un fichier existe déjà sur S3."""
-        if self.dry_run:
+        """
+        Vérifie si un fichier existe déjà sur S3.
+
+        La réponse vient de l'inventaire des clés quand il est disponible ; sinon
+        (inventaire désactivé ou listing impossible), d'un head_object.
+        """
+        if self.inventory is not None:
+            exists = self.inventory.contains(s3_key)
+            if exists is not None:
+                return exists
+
+        if self.s3_client is None:
             return False
 
+        from botocore.exceptions import ClientError
+
         try:
             self.s3_client.head_object(Bucket=self.bucket_name, Key=s3_key)
             return True
@@ -132,6 +505,8 @@ class S3Uploader:
         Returns:
             URL présignée ou None si erreur
         """
+        from botocore.exceptions import ClientError
+
         try:
             url = self.s3_client.generate_presigned_url(
                 'get_object',
@@ -1,33 +1,66 @@
 """Scraper pour les arrêtés de la catégorie 'Voirie et déplacements' de Paris."""
+import argparse
 import asyncio
 import logging
 import re
 import sys
+import time
+from collections import deque
+from contextlib import aclosing
+from dataclasses import dataclass, field
 from datetime import datetime
-from pathlib import Path
-from typing import Dict, List, Optional, Set
-import pandas as pd
-from playwright.async_api import async_playwright, Page, Browser, TimeoutError as PlaywrightTimeout
-from bs4 import BeautifulSoup
+from typing import TYPE_CHECKING, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
 
 from config import (
     SEARCH_URL,
     BASE_URL,
-    CSV_FILE,
-    CSV_COLUMNS,
-    SCRAPE_DELAY_SECONDS,
     MAX_CONCURRENT_PAGES,
+    ADAPTIVE_MIN_CONCURRENCY,
+    ADAPTIVE_MAX_CONCURRENCY,
+    MAX_REQUESTS_PER_SECOND,
     MAX_PAGES_TO_SCRAPE,
+    PIPELINE_QUEUE_SIZE,
+    LISTING_POOL_SIZE,
+    BLOCK_RESOURCES,
+    S3_UPLOAD_WORKERS,
     RESULTS_PER_PAGE,
     DATA_DIR,
+    INDEX_DB_FILE,
+    CSV_COLUMNS,
     PAGE_LOAD_TIMEOUT,
-    PDF_DOWNLOAD_TIMEOUT,
     FILTER_TYPE,
+    PARSER_ENGINE,
+    PARQUET_EXPORT,
+    FULLTEXT_INDEX,
+    PDF_TEXT_EXTRACTION,
+    TEXT_EXTRACTION_WORKERS,
+    METRICS_EXPORT,
+    METRICS_TEXTFILE,
+    RUN_SUMMARY_FILE,
     validate_config,
     classify_arrete,
     should_keep_arrete
 )
 from s3_uploader import S3Uploader
+from pdf_downloader import PdfDownloader
+from parsers import get_parser
+from arrete_index import ArreteIndex
+from location import extract_location
+from dates import to_iso_date
+from csv_writer import CsvAppendWriter
+from metrics import Metrics
+from content_index import ContentIndex
+from search_index import SearchIndex
+from crawl_state import CrawlCheckpoint, CrawlState
+from rate_limiter import AdaptiveLimiter, CONGESTION_STATUSES
+from request_blocker import RequestBlocker
+
+# Playwright, pyarrow (et pandas) et pypdf sont importés au premier usage : un run sans nouvel
+# arrêté (sondage fréquent) ne paie pas leur chargement
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, Page
+    from parquet_store import ParquetStore
+    from text_extractor import TextExtractor, TextIndex
 
 # Configuration du logging
 logging.basicConfig(
@@ -40,35 +73,157 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+@dataclass
+class ListingPage:
+    """Résultat du parsing d'une page de résultats."""
+    page_num: int
+    arretes: List[Dict] = field(default_factory=list)
+    # (explnum_id, date_publication) des résultats parcourus, y compris ceux écartés par FILTER_TYPE
+    seen: List[Tuple[str, str]] = field(default_factory=list)
+    # Nombre d'arrêtés inconnus rencontrés, qu'ils soient retenus ou écartés par FILTER_TYPE
+    unseen: int = 0
+    # La page contient un résultat déjà couvert par la marque du crawl précédent
+    mark_reached: bool = False
+    error: bool = False
+
 
 class ArretesScraper:
     """Scraper pour les arrêtés de Paris."""
 
     def __init__(self):
         """Initialise le scraper."""
-        self.s3_uploader = S3Uploader()
+        # Latences et compteurs par étape, exportés à la fin du run (Prometheus + résumé JSON)
+        self.metrics = Metrics()
+        # Profilage CPU / mémoire par page de résultats (--profile), démarré par main()
+        self.profiler = None
+        # Arrêtés découverts pendant ce run (pas encore forcément dans le CSV)
         self.existing_arretes: Set[str] = set()
         self.new_arretes: List[Dict] = []
-        self.browser: Optional[Browser] = None
+        self.browser: Optional['Browser'] = None
+        self.parser = get_parser(PARSER_ENGINE)
+        # Limiteur partagé par toutes les requêtes vers BOVP (pages de résultats et PDFs)
+        self.limiter = AdaptiveLimiter(
+            initial=MAX_CONCURRENT_PAGES,
+            minimum=ADAPTIVE_MIN_CONCURRENCY,
+            maximum=ADAPTIVE_MAX_CONCURRENCY,
+            max_rps=MAX_REQUESTS_PER_SECOND
+        )
+        # Interception des requêtes des pages de résultats, installée sur le contexte Playwright
+        self.request_blocker = RequestBlocker() if BLOCK_RESOURCES else None
+        self.pdf_downloader = PdfDownloader(
+            self.limiter,
+            user_agent=USER_AGENT,
+            extra_headers={'Accept-Language': 'fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7'}
+        )
 
         # Créer le répertoire data si nécessaire
         DATA_DIR.mkdir(exist_ok=True)
 
-        # Charger les arrêtés existants
+        # CSV ouvert en ajout pour tout le run (répare d'abord une écriture interrompue)
+        self.csv_writer = CsvAppendWriter()
+        self.csv_writer.open()
+        missing_columns = [name for name in CSV_COLUMNS if name not in self.csv_writer.fieldnames]
+        if missing_columns:
+            logger.warning(f"Colonnes absentes du CSV, non remplies pour les nouveaux arrêtés: "
+                           f"{', '.join(missing_columns)} (ajouter avec: python location.py --backfill)")
+
+        # Index des arrêtés existants (SQLite), synchronisé avec le CSV
+        self.index = ArreteIndex()
         self._load_existing_arretes()
 
+        # Dataset Parquet typé (requêtes analytiques), alimenté à chaque sauvegarde du CSV.
+        # Ouvert et synchronisé à la première sauvegarde (pyarrow n'est chargé que s'il y a des arrêtés)
+        self.parquet_store: Optional['ParquetStore'] = None
+        self._parquet_pending = PARQUET_EXPORT
+
+        # Index plein texte (titre, autorité, signataire, texte des PDFs), alimenté à chaque sauvegarde du CSV
+        self.search_index = SearchIndex() if FULLTEXT_INDEX else None
+        self._sync_search_index()
+
+        # Index des contenus (SHA-256 -> clé S3 canonique) : un PDF identique n'est pas réuploadé.
+        # Base séparée, reprise de l'index des arrêtés qui la contenait auparavant
+        self.content_index = ContentIndex(legacy_db_path=INDEX_DB_FILE)
+        self.content_index.open()
+        self.s3_uploader = S3Uploader(content_index=self.content_index)
+        # Les latences des transferts sont mesurées hors attente (limiteur, pool de threads)
+        self.metrics.register('stage_seconds', self.pdf_downloader.stats.latency, stage='pdf_download')
+        self.metrics.register('stage_seconds', self.s3_uploader.stats.latency, stage='s3_upload')
+
+        # Extraction optionnelle du texte des PDFs téléchargés, dans un pool de processus
+        self.text_index: Optional['TextIndex'] = None
+        self.text_extractor: Optional['TextExtractor'] = None
+        if PDF_TEXT_EXTRACTION:
+            from text_extractor import TextExtractor, TextIndex
+            # Base séparée, reprise de l'index des arrêtés qui contenait les textes auparavant
+            self.text_index = TextIndex(legacy_db_path=INDEX_DB_FILE)
+            self.text_index.open()
+            self.text_extractor = TextExtractor()
+
+        # High-water mark du crawl incrémental
+        self.crawl_state = CrawlState()
+        self.crawl_state.load()
+        # Le crawl en cours a-t-il parcouru toutes les pages jusqu'à la marque ?
+        self.crawl_complete = False
+        self.site_total_pages = 0
+
+        # Checkpoint de reprise : arrêtés découverts mais pas encore sauvegardés dans le CSV
+        self.checkpoint = CrawlCheckpoint()
+        self.pending_arretes: Dict[str, Tuple[int, Dict]] = {}
+        self.last_listed_page = 0
+        # Mode --resume : reprise depuis le checkpoint, après la dernière page parcourue. Les pages
+        # parcourues avant l'interruption ne sont pas relues : la marque s'applique à toutes les autres
+        self.resume = False
+
     def _load_existing_arretes(self):
-        """Charge les numéros d'arrêtés déjà scrapés depuis le CSV."""
-        if CSV_FILE.exists():
-            try:
-                df = pd.read_csv(CSV_FILE)
-                self.existing_arretes = set(df['numero_arrete'].dropna().astype(str))
-                logger.info(f"{len(self.existing_arretes)} arrêtés déjà dans le CSV")
-            except Exception as e:
-                logger.warning(f"Impossible de charger le CSV existant: {e}")
-                self.existing_arretes = set()
-        else:
-            logger.info("Aucun CSV existant, création d'un nouveau fichier")
+        """Ouvre l'index des arrêtés déjà scrapés et le synchronise avec le CSV."""
+        try:
+            self.index.open()
+            self.index.sync_with_csv()
+            logger.info(f"{len(self.index)} arrêtés déjà dans le CSV")
+        except Exception as e:
+            # Seules les tables de l'index des arrêtés sont recréées : le fichier (et ses -wal/-shm)
+            # est conservé avec les autres tables qu'il contient
+            logger.warning(f"Impossible de charger l'index des arrêtés, reconstruction depuis le CSV: {e}")
+            self.index.close()
+            self.index.open(reset=True)
+            self.index.rebuild_from_csv()
+
+    def _open_parquet_store(self):
+        """
+        Ouvre le dataset Parquet et rattrape son retard sur le CSV, avant la première sauvegarde
+        du run. Un échec n'empêche pas le scraping.
+        """
+        if not self._parquet_pending:
+            return
+        self._parquet_pending = False
+        try:
+            from parquet_store import ParquetStore
+            self.parquet_store = ParquetStore()
+            self.parquet_store.sync_with_csv()
+        except Exception as e:
+            logger.error(f"Impossible de synchroniser le dataset Parquet: {e} "
+                         f"(reconstruire avec: python parquet_store.py --rebuild)")
+            self.parquet_store = None
+
+    def _sync_search_index(self):
+        """Rattrape le retard de l'index plein texte sur le CSV. Un échec n'empêche pas le scraping."""
+        if self.search_index is None:
+            return
+        try:
+            self.search_index.open()
+            self.search_index.sync_with_csv()
+        except Exception as e:
+            logger.error(f"Impossible de synchroniser l'index plein texte: {e} "
+                         f"(reconstruire avec: python search_index.py --rebuild)")
+            self.search_index.close()
+            self.search_index = None
+
+    def _is_known(self, numero_arrete: str) -> bool:
+        """Vérifie si un arrêté est déjà dans le CSV ou déjà découvert pendant ce run."""
+        return numero_arrete in self.existing_arretes or numero_arrete in self.index
 
     def _extract_numero_arrete(self, titre: str) -> Optional[str]:
         """
@@ -87,12 +242,12 @@ class ArretesScraper:
 
     async def _parse_arrete_from_h3(self, h3_element) -> Optional[Dict]:
         """
-        Parse les métadonnées d'un arrêté depuis un élément <h3>.
-        Le site BOVP n'utilise pas de divs conteneurs, on doit parcourir les siblings.
+        Parse les métadonnées d'un arrêté depuis son élément de titre (<h2>/<h3>/<h4>).
+        L'extraction dépend du moteur de parsing configuré (PARSER_ENGINE).
         """
         try:
-            # Extraire le titre depuis le <h3>
-            titre = h3_element.get_text(strip=True)
+            # Extraire le titre depuis le heading
+            titre = self.parser.heading_title(h3_element)
 
             # Extraire le numéro d'arrêté
             numero_arrete = self._extract_numero_arrete(titre)
@@ -101,7 +256,7 @@ class ArretesScraper:
                 return None
 
             # Vérifier si on a déjà cet arrêté
-            if numero_arrete in self.existing_arretes:
+            if self._is_known(numero_arrete):
                 logger.debug(f"Arrêté {numero_arrete} déjà présent, ignoré")
                 return None
 
@@ -115,105 +270,31 @@ class ArretesScraper:
                            f"stationnement={classification['concerne_stationnement']})")
                 return None
 
-            # Extraire les autres métadonnées
+            # Extraire les autres métadonnées (explnum_id, autorité, signataire, dates, poids)
+            fields = self.parser.extract_fields(h3_element)
+
+            # Localisation citée par le titre (arrondissements, voies)
+            location = extract_location(titre)
+
             metadata = {
                 'numero_arrete': numero_arrete,
                 'titre': titre,
-                'autorite_responsable': '',
-                'signataire': '',
-                'date_publication': '',
-                'date_signature': '',
-                'poids_pdf_ko': '',
+                'autorite_responsable': fields['autorite_responsable'],
+                'signataire': fields['signataire'],
+                # Dates au format ISO (AAAA-MM-JJ) : triables et comparables telles quelles
+                'date_publication': to_iso_date(fields['date_publication']),
+                'date_signature': to_iso_date(fields['date_signature']),
+                'poids_pdf_ko': fields['poids_pdf_ko'],
                 'concerne_circulation': classification['concerne_circulation'],
                 'concerne_stationnement': classification['concerne_stationnement'],
                 'est_temporaire': classification['est_temporaire'],
-                'explnum_id': '',
+                'arrondissement': location['arrondissement'],
+                'voies': location['voies'],
+                'explnum_id': fields['explnum_id'],
                 'pdf_s3_url': '',
                 'date_scrape': datetime.now().isoformat()
             }
 
-            # D'abord chercher l'explnum_id dans l'élément de titre lui-même
-            # Pattern: open_visionneuse(sendToVisionneuse,44443)
-            # Support multiple patterns for resilience
-            heading_links = h3_element.find_all('a')
-            for link in heading_links:
-                onclick = link.get('onclick', '')
-                href = link.get('href', '')
-
-                # Try multiple patterns for explnum_id extraction
-                patterns = [
-                    (r'sendToVisionneuse[,\s]+(\d+)', 'sendToVisionneuse'),
-                    (r'open_visionneuse[^\d]*(\d+)', 'open_visionneuse'),
-                    (r'openDocument[^\d]*(\d+)', 'openDocument'),
-                    (r'viewDocument[^\d]*(\d+)', 'viewDocument'),
-                    (r'showPDF[^\d]*(\d+)', 'showPDF'),
-                    (r'explnum[_-]?id[^\d]*(\d+)', 'explnum_id'),
-                ]
-
-                for pattern, pattern_name in patterns:
-                    # Try onclick attribute
-                    if onclick:
-                        explnum_match = re.search(pattern, onclick, re.IGNORECASE)
-                        if explnum_match:
-                            metadata['explnum_id'] = explnum_match.group(1)
-                            logger.debug(f"✓ explnum_id trouvé dans onclick via {pattern_name}: {metadata['explnum_id']}")
-                            break
-                    # Try href attribute
-                    if href and not metadata['explnum_id']:
-                        explnum_match = re.search(pattern, href, re.IGNORECASE)
-                        if explnum_match:
-                            metadata['explnum_id'] = explnum_match.group(1)
-                            logger.debug(f"✓ explnum_id trouvé dans href via {pattern_name}: {metadata['explnum_id']}")
-                            break
-
-                if metadata['explnum_id']:
-                    break
-
-            # Les métadonnées ne sont pas siblings directs du heading, mais dans le conteneur parent
-            # Remonter au conteneur parent (div avec classes comme descr_notice_corps, notice_corps, etc.)
-            parent = h3_element.parent
-            while parent:
-                if parent.name == 'div':
-                    classes = parent.get('class', [])
-                    if classes:
-                        # Use regex pattern matching for more resilience
-                        classes_str = ' '.join(classes)
-                        if re.search(r'(descr_)?notice(_corps)?|result|item', classes_str, re.IGNORECASE):
-                            break
-                parent = parent.parent
-
-            # Si on a trouvé le bon parent, chercher dans ses descendants
-            if parent:
-                # 1. Chercher autorité responsable et signataire dans <span> avec classe contenant "auteur"
-                # Use regex pattern for more resilience
-                auteur_spans = parent.find_all('span', class_=re.compile(r'auteur.*|author.*|signataire.*', re.IGNORECASE))
-                if auteur_spans and len(auteur_spans) >= 1:
-                    # Le premier span est l'autorité responsable
-                    metadata['autorite_responsable'] = auteur_spans[0].get_text(strip=True).replace('\xa0', ' ')
-                    # Le second span (si présent) est le signataire
-                    if len(auteur_spans) >= 2:
-                        metadata['signataire'] = auteur_spans[1].get_text(strip=True).replace('\xa0', ' ')
-
-                # 2. Chercher les dates et poids dans <table> avec classe contenant "notice" ou "descr"
-                # Use regex pattern for more resilience
-                table = parent.find('table', class_=re.compile(r'descr.*|notice.*|metadata.*|info.*', re.IGNORECASE))
-                if table:
-                    rows = table.find_all('tr', class_=re.compile(r'record.*|row.*|p_perso.*', re.IGNORECASE))
-                    for row in rows:
-                        # Try to find label and content cells with flexible class matching
-                        label = row.find('td', class_=re.compile(r'label.*|key.*', re.IGNORECASE))
-                        content = row.find('td', class_=re.compile(r'.*content.*|value.*', re.IGNORECASE))
-                        if label and content:
-                            label_text = label.get_text(strip=True)
-                            content_text = content.get_text(strip=True)
-
-                            if 'Date de publication' in label_text:
-                                metadata['date_publication'] = content_text
-                            elif 'Date de la signature' in label_text or 'Date de signature' in label_text:
-                                metadata['date_signature'] = content_text
-                            elif 'Poids' in label_text:
-                                metadata['poids_pdf_ko'] = content_text
-
             if not metadata['explnum_id']:
                 logger.warning(f"Pas d'explnum_id trouvé pour {numero_arrete}")
                 return None
@@ -224,100 +305,409 @@ class ArretesScraper:
             logger.error(f"Erreur lors du parsing d'un arrêté: {e}")
             return None
 
-    async def _download_pdf(self, page: Page, explnum_id: str) -> Optional[bytes]:
+    async def _download_stage(self, download_queue: asyncio.Queue, upload_queue: asyncio.Queue,
+                              write_queue: asyncio.Queue, extract_queue: Optional[asyncio.Queue] = None):
         """
-        Télécharge le PDF directement depuis doc_num_data.php.
+        Étape de téléchargement du pipeline : consomme les arrêtés découverts
+        et transmet les PDFs à l'étape d'upload.
 
-        Args:
-            page: Page Playwright (utilisée pour faire la requête HTTP)
-            explnum_id: ID du document numérique
-
-        Returns:
-            Contenu binaire du PDF ou None si échec
+        Les PDFs sont téléchargés via le client HTTP mutualisé, sans passer par le navigateur.
+        Si l'extraction du texte est activée, une copie du contenu est aussi envoyée à
+        l'étape d'extraction, pour ne pas retélécharger le PDF depuis S3.
         """
-        try:
-            # URL directe du PDF
-            pdf_url = f"{BASE_URL}/doc_num_data.php?explnum_id={explnum_id}"
-            logger.debug(f"Téléchargement PDF depuis: {pdf_url}")
-
-            # Télécharger directement via une requête HTTP
-            response = await page.request.get(pdf_url, timeout=PDF_DOWNLOAD_TIMEOUT)
-
-            if response.ok:
-                content_type = response.headers.get('content-type', '')
-                if 'application/pdf' in content_type or 'application/octet-stream' in content_type:
-                    pdf_content = await response.body()
-                    logger.debug(f"✓ PDF téléchargé: {len(pdf_content)} octets")
-                    return pdf_content
-                else:
-                    logger.warning(f"Type de contenu inattendu pour {explnum_id}: {content_type}")
-                    return None
-            else:
-                logger.warning(f"Échec HTTP {response.status} pour explnum_id={explnum_id}")
-                return None
-
-        except Exception as e:
-            logger.error(f"Erreur lors du téléchargement du PDF {explnum_id}: {e}")
-            return None
-
-    async def _process_arrete(self, page: Page, metadata: Dict) -> bool:
-        """
-        Traite un arrêté : télécharge le PDF et l'upload sur S3.
+        while True:
+            item = await download_queue.get()
+            if item is None:
+                break
 
-        Returns:
-            True si succès, False sinon
-        """
-        try:
+            page_num, metadata = item
             numero = metadata['numero_arrete']
             explnum_id = metadata['explnum_id']
-
             logger.info(f"Traitement de l'arrêté {numero} (explnum_id={explnum_id})")
 
-            # Télécharger le PDF
-            pdf_content = await self._download_pdf(page, explnum_id)
-            if not pdf_content:
+            try:
+                pdf = await self.pdf_downloader.download(explnum_id)
+            except Exception as e:
+                logger.error(f"Erreur lors du traitement de l'arrêté {numero}: {e}")
+                pdf = None
+
+            if pdf:
+                if extract_queue is not None:
+                    pdf_content = pdf.fileobj.read()
+                    pdf.fileobj.seek(0)
+                    await extract_queue.put((numero, pdf.sha256, pdf_content))
+                await upload_queue.put((page_num, metadata, pdf))
+            else:
                 logger.warning(f"Impossible de télécharger le PDF pour {numero}")
                 # On garde quand même les métadonnées sans le PDF
                 metadata['pdf_s3_url'] = 'ERROR: PDF non téléchargé'
-                self.new_arretes.append(metadata)
-                return False
+                await write_queue.put((page_num, metadata))
 
-            # Uploader vers S3
-            s3_url = self.s3_uploader.upload_pdf(pdf_content, numero)
-            if not s3_url:
+    async def _upload_stage(self, upload_queue: asyncio.Queue, write_queue: asyncio.Queue):
+        """Étape d'upload du pipeline : envoie les PDFs sur S3 puis transmet au writer CSV."""
+        while True:
+            item = await upload_queue.get()
+            if item is None:
+                break
+
+            page_num, metadata, pdf = item
+            numero = metadata['numero_arrete']
+
+            try:
+                s3_url = await self.s3_uploader.upload_pdf_stream_async(
+                    pdf.fileobj, numero, pdf.md5, pdf.size, content_sha256=pdf.sha256
+                )
+            except Exception as e:
+                logger.error(f"Erreur lors de l'upload de l'arrêté {numero}: {e}")
+                s3_url = None
+            finally:
+                pdf.close()
+
+            if s3_url:
+                metadata['pdf_s3_url'] = s3_url
+                logger.info(f"✓ Arrêté {numero} traité avec succès")
+            else:
                 logger.warning(f"Impossible d'uploader le PDF pour {numero}")
                 metadata['pdf_s3_url'] = 'ERROR: Upload S3 échoué'
-                self.new_arretes.append(metadata)
-                return False
 
-            metadata['pdf_s3_url'] = s3_url
-            self.new_arretes.append(metadata)
-            self.existing_arretes.add(numero)
+            await write_queue.put((page_num, metadata))
 
-            logger.info(f"✓ Arrêté {numero} traité avec succès")
-            return True
+    async def _extract_stage(self, extract_queue: asyncio.Queue):
+        """
+        Étape optionnelle d'extraction du texte : le travail (CPU) tourne dans le pool de
+        processus, cette étape ne fait qu'attendre le résultat et l'enregistrer.
+        """
+        while True:
+            item = await extract_queue.get()
+            if item is None:
+                break
+
+            numero, sha256, pdf_content = item
+            with self.metrics.time('text_extraction'):
+                result = await self.text_extractor.extract_async(pdf_content, numero)
+            if result:
+                text, pages = result
+                self.text_index.add(numero, text, pages, sha256)
+                if self.search_index is not None:
+                    self.search_index.set_text(numero, text)
+
+    async def _writer_stage(self, write_queue: asyncio.Queue) -> int:
+        """
+        Étape finale du pipeline : regroupe les arrêtés par page de résultats et
+        sauvegarde le CSV dès qu'une page et toutes celles qui la précèdent sont
+        entièrement traitées.
 
-        except Exception as e:
-            logger.error(f"Erreur lors du traitement de l'arrêté {metadata.get('numero_arrete', 'UNKNOWN')}: {e}")
-            return False
+        Le producteur annonce chaque page avec ('page', page_num, numéros) avant
+        d'envoyer ses arrêtés, ce qui permet de savoir quand une page est complète.
+        Les téléchargements se terminent dans le désordre : les arrêtés sont remis
+        dans l'ordre du listing, et les pages sauvegardées dans leur ordre d'annonce.
+
+        Returns:
+            Nombre total d'arrêtés sauvegardés
+        """
+        pending: Dict[int, Dict] = {}
+        announced: Deque[int] = deque()
+        total_saved = 0
+
+        while True:
+            item = await write_queue.get()
+            if item is None:
+                break
+
+            if item[0] == 'page':
+                _, page_num, numeros = item
+                order = {numero: i for i, numero in enumerate(numeros)}
+                pending[page_num] = {'expected': len(numeros), 'order': order, 'rows': []}
+                announced.append(page_num)
+                continue
+
+            page_num, metadata = item
+            pending[page_num]['rows'].append(metadata)
+
+            while announced and len(pending[announced[0]]['rows']) == pending[announced[0]]['expected']:
+                page_num = announced.popleft()
+                state = pending.pop(page_num)
+                self.new_arretes = sorted(state['rows'], key=lambda m: state['order'][m['numero_arrete']])
+                await self._save_to_csv()
+                self.metrics.count('arretes_saved_total', len(self.new_arretes), help_text="Arrêtés ajoutés au CSV")
+                for metadata in self.new_arretes:
+                    self.pending_arretes.pop(metadata['numero_arrete'], None)
+                self._save_checkpoint()
+                total_saved += len(self.new_arretes)
+                logger.info(f"💾 Page {page_num} terminée - Progression: {total_saved} arrêtés traités, "
+                            f"CSV sauvegardé (concurrence: {self.limiter.current_limit})")
+                # Réinitialiser la liste pour la prochaine page
+                self.new_arretes = []
+
+        return total_saved
+
+    def _save_checkpoint(self):
+        """
+        Enregistre le checkpoint de reprise. Appelé juste après chaque sauvegarde du CSV :
+        la dernière page sauvegardée est celle qui précède la plus ancienne page ayant
+        encore des arrêtés en attente.
+        """
+        pending_pages = [page_num for page_num, _ in self.pending_arretes.values()]
+        self.checkpoint.last_listed_page = self.last_listed_page
+        self.checkpoint.last_committed_page = min(pending_pages) - 1 if pending_pages else self.last_listed_page
+        self.checkpoint.total_pages = self.site_total_pages
+        self.checkpoint.pending = list(self.pending_arretes.values())
+        self.checkpoint.seen_max_explnum_id = self.crawl_state.seen_max_explnum_id
+        self.checkpoint.seen_latest_date_publication = self.crawl_state.seen_latest_date_publication
+        self.checkpoint.save()
+
+    def _resume_from_checkpoint(self) -> int:
+        """
+        Recharge le checkpoint d'un crawl interrompu.
+
+        Returns:
+            La première page de résultats à parcourir (1 s'il n'y a pas de checkpoint)
+        """
+        if not self.checkpoint.load():
+            logger.info("Aucun checkpoint à reprendre, crawl normal depuis la page 1")
+            self.resume = False
+            return 1
+
+        logger.info(f"Reprise depuis le checkpoint: {self.checkpoint.describe()}")
+        self.last_listed_page = self.checkpoint.last_listed_page
+        # La marque avancera à la fin du crawl repris jusqu'aux résultats vus avant l'interruption
+        self.crawl_state.seen_max_explnum_id = self.checkpoint.seen_max_explnum_id
+        self.crawl_state.seen_latest_date_publication = self.checkpoint.seen_latest_date_publication
+        for page_num, metadata in self.checkpoint.pending:
+            # Les arrêtés de la dernière sauvegarde du CSV peuvent précéder le checkpoint
+            if not self._is_known(metadata['numero_arrete']):
+                self.pending_arretes[metadata['numero_arrete']] = (page_num, metadata)
+        return self.last_listed_page + 1
+
+    async def _iter_listing_pages(self, page: 'Page', total_pages: int,
+                                  start_page: int = 1) -> AsyncIterator[ListingPage]:
+        """
+        Parcourt les pages de résultats de start_page à total_pages et les renvoie dans l'ordre.
+
+        Avec LISTING_POOL_SIZE > 1, plusieurs pages de résultats sont chargées en parallèle
+        sur un pool de pages Playwright (fenêtre glissante), mais restent renvoyées dans l'ordre.
+        Si l'appelant s'arrête, les chargements anticipés en cours sont annulés.
+        """
+        nb_pages = total_pages - start_page + 1
+        if LISTING_POOL_SIZE <= 1 or nb_pages <= 1:
+            for page_num in range(start_page, total_pages + 1):
+                yield await self._scrape_page(page, page_num)
+            return
+
+        pool_size = min(LISTING_POOL_SIZE, nb_pages)
+        extra_pages = []
+        for _ in range(pool_size - 1):
+            extra_page = await page.context.new_page()
+            extra_page.on('requestfailed', self._log_request_failure)
+            extra_pages.append(extra_page)
+        logger.info(f"Chargement des pages de résultats avec un pool de {pool_size} pages")
+
+        available: asyncio.Queue = asyncio.Queue()
+        for pool_page in [page] + extra_pages:
+            available.put_nowait(pool_page)
+
+        async def fetch(page_num: int) -> ListingPage:
+            pool_page = await available.get()
+            try:
+                return await self._scrape_page(pool_page, page_num)
+            finally:
+                available.put_nowait(pool_page)
+
+        in_flight: Dict[int, asyncio.Task] = {}
+        next_to_schedule = start_page
+        try:
+            for page_num in range(start_page, total_pages + 1):
+                # Garder la fenêtre de chargements anticipés pleine
+                while next_to_schedule <= total_pages and len(in_flight) < pool_size:
+                    in_flight[next_to_schedule] = asyncio.create_task(fetch(next_to_schedule))
+                    next_to_schedule += 1
+
+                yield await in_flight.pop(page_num)
+        finally:
+            for task in in_flight.values():
+                task.cancel()
+            await asyncio.gather(*in_flight.values(), return_exceptions=True)
+            for extra_page in extra_pages:
+                await extra_page.close()
+
+    async def _queue_page(self, page_num: int, page_metadata: List[Dict],
+                          download_queue: asyncio.Queue, write_queue: asyncio.Queue):
+        """Annonce une page à l'étape d'écriture et met ses arrêtés en file de téléchargement."""
+        await write_queue.put(('page', page_num, [metadata['numero_arrete'] for metadata in page_metadata]))
+        for metadata in page_metadata:
+            # Marquer l'arrêté comme connu dès sa découverte pour ne pas le
+            # remettre en file s'il réapparaît sur une page suivante
+            self.existing_arretes.add(metadata['numero_arrete'])
+            await download_queue.put((page_num, metadata))
+
+    async def _produce_pages(self, page: 'Page', total_pages: int, start_page: int,
+                             download_queue: asyncio.Queue, write_queue: asyncio.Queue):
+        """
+        Producteur du pipeline : parcourt les pages de résultats et alimente l'étape
+        de téléchargement. La file bornée assure la contre-pression : si les
+        téléchargements prennent du retard, le parcours des pages attend.
 
-    async def _scrape_page(self, page: Page, page_num: int) -> List[Dict]:
+        En reprise, les arrêtés en attente du checkpoint sont remis en file avant de
+        poursuivre le parcours à start_page.
+        """
+        self.crawl_complete = False
+
+        resumed_pages: Dict[int, List[Dict]] = {}
+        for page_num, metadata in self.pending_arretes.values():
+            resumed_pages.setdefault(page_num, []).append(metadata)
+        for page_num in sorted(resumed_pages):
+            await self._queue_page(page_num, resumed_pages[page_num], download_queue, write_queue)
+
+        async with aclosing(self._iter_listing_pages(page, total_pages, start_page)) as listing_pages:
+            async for listing in listing_pages:
+                page_num = listing.page_num
+                if listing.error:
+                    logger.warning(f"Page {page_num} en erreur, arrêt du scraping (marque du crawl inchangée)")
+                    return
+
+                # Une page chargée par anticipation a pu être parsée avant que les arrêtés
+                # des pages précédentes soient connus : filtrer à nouveau les doublons
+                page_metadata = [m for m in listing.arretes if not self._is_known(m['numero_arrete'])]
+                for explnum_id, date_publication in listing.seen:
+                    self.crawl_state.observe(explnum_id, date_publication)
+
+                # Enregistrer les arrêtés en attente avant de déclarer la page parcourue,
+                # pour qu'un checkpoint écrit entre-temps ne les oublie pas
+                for metadata in page_metadata:
+                    self.pending_arretes[metadata['numero_arrete']] = (page_num, metadata)
+                if page_metadata:
+                    await self._queue_page(page_num, page_metadata, download_queue, write_queue)
+                self.last_listed_page = page_num
+                if not page_metadata:
+                    # Rien à sauvegarder dans le CSV pour cette page : avancer le checkpoint directement
+                    self._save_checkpoint()
+                if self.profiler is not None:
+                    self.profiler.page_done(page_num, new_arretes=len(page_metadata),
+                                            pending_arretes=len(self.pending_arretes))
+
+                # Les résultats sont triés par date décroissante : tout ce qui suit la marque
+                # a déjà été vu. Sans marque (premier crawl), on s'arrête à la première page
+                # sans arrêté inconnu ; les arrêtés écartés par FILTER_TYPE comptent comme
+                # inconnus pour ne pas interrompre le parcours à tort. En reprise, les pages
+                # ont pu se décaler depuis l'interruption : seules la marque et la fin des résultats
+                # arrêtent le parcours.
+                if listing.mark_reached:
+                    logger.info(f"Marque du crawl précédent atteinte page {page_num}, arrêt du scraping")
+                    self.crawl_complete = True
+                    return
+                if not listing.seen or (not self.resume and not self.crawl_state.has_mark
+                                        and not listing.unseen):
+                    logger.info(f"Aucun nouvel arrêté sur la page {page_num}, arrêt du scraping")
+                    self.crawl_complete = True
+                    return
+
+        # Toutes les pages demandées ont été parcourues : le crawl n'est complet que si
+        # elles couvrent tout le site (pas de limite MAX_PAGES_TO_SCRAPE effective)
+        self.crawl_complete = total_pages >= self.site_total_pages
+
+    async def _run_pipeline(self, page: 'Page', total_pages: int, start_page: int = 1) -> int:
+        """
+        Exécute le pipeline producteur/consommateur :
+        pages de résultats -> téléchargement PDF -> upload S3 -> écriture CSV,
+        avec en option l'extraction du texte des PDFs téléchargés (pool de processus).
+
+        Toutes les étapes tournent en parallèle et communiquent par des files bornées.
+
+        Returns:
+            Nombre total d'arrêtés sauvegardés
+        """
+        download_queue: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        upload_queue: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        write_queue: asyncio.Queue = asyncio.Queue()
+
+        # Le limiteur adaptatif décide du nombre de téléchargements simultanés effectifs
+        nb_downloaders = ADAPTIVE_MAX_CONCURRENCY
+        # Un upload en cours par thread du pool S3 : les PDFs en attente restent dans la file bornée
+        nb_uploaders = S3_UPLOAD_WORKERS
+
+        # Un PDF en cours d'extraction par processus, autant en attente (contre-pression sur les téléchargements)
+        extract_queue: Optional[asyncio.Queue] = None
+        extractors = []
+        if self.text_extractor:
+            extract_queue = asyncio.Queue(maxsize=TEXT_EXTRACTION_WORKERS)
+            extractors = [
+                asyncio.create_task(self._extract_stage(extract_queue))
+                for _ in range(TEXT_EXTRACTION_WORKERS)
+            ]
+
+        downloaders = [
+            asyncio.create_task(self._download_stage(download_queue, upload_queue, write_queue, extract_queue))
+            for _ in range(nb_downloaders)
+        ]
+        uploaders = [
+            asyncio.create_task(self._upload_stage(upload_queue, write_queue))
+            for _ in range(nb_uploaders)
+        ]
+        writer = asyncio.create_task(self._writer_stage(write_queue))
+        tasks = downloaders + uploaders + extractors + [writer]
+
+        producer = asyncio.create_task(
+            self._produce_pages(page, total_pages, start_page, download_queue, write_queue)
+        )
+        tasks.append(producer)
+
+        try:
+            # Attendre la fin du producteur, en surveillant les étapes : si l'une
+            # d'elles s'arrête sur une erreur, le producteur resterait bloqué sur la file
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            if producer not in done:
+                for task in done:
+                    task.result()
+                raise RuntimeError("Une étape du pipeline s'est arrêtée prématurément")
+            producer.result()
+
+            # Vider le pipeline étape par étape
+            for _ in downloaders:
+                await download_queue.put(None)
+            await asyncio.gather(*downloaders)
+            for _ in uploaders:
+                await upload_queue.put(None)
+            await asyncio.gather(*uploaders)
+            for _ in extractors:
+                await extract_queue.put(None)
+            await asyncio.gather(*extractors)
+            await write_queue.put(None)
+            return await writer
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _scrape_page(self, page: 'Page', page_num: int) -> ListingPage:
         """
         Scrape une page de résultats.
 
+        Le parsing s'arrête au premier résultat déjà couvert par la marque du crawl
+        précédent (les résultats sont triés par date de publication décroissante).
+
         Returns:
-            Liste des métadonnées des arrêtés de cette page
+            Les métadonnées des nouveaux arrêtés de cette page et l'état du parcours
         """
+        from playwright.async_api import TimeoutError as PlaywrightTimeout
+
         try:
             url = await self._get_search_page_url(page_num)
             logger.info(f"Scraping de la page {page_num}: {url}")
 
-            await page.goto(url, wait_until='domcontentloaded', timeout=PAGE_LOAD_TIMEOUT)
-            await asyncio.sleep(SCRAPE_DELAY_SECONDS)
+            async with self.limiter.acquire() as slot:
+                try:
+                    with self.metrics.time('listing_load'):
+                        response = await page.goto(url, wait_until='domcontentloaded', timeout=PAGE_LOAD_TIMEOUT)
+                except PlaywrightTimeout:
+                    slot.congestion('timeout')
+                    raise
+                if response and response.status in CONGESTION_STATUSES:
+                    slot.congestion(f"HTTP {response.status}")
 
             # Parser le HTML
             content = await page.content()
-            soup = BeautifulSoup(content, 'lxml')
+            parse_started_at = time.perf_counter()
 
             # Debug: sauvegarder le HTML pour analyse
             if page_num == 1:
@@ -329,31 +719,67 @@ class ArretesScraper:
             # Le site BOVP n'utilise pas de divs conteneurs avec classes CSS
             # Les résultats sont identifiés par des éléments de titre (h2/h3/h4) contenant "Arrêté n°"
             # Support multiple heading levels for resilience
-            heading_elements = soup.find_all(['h2', 'h3', 'h4'])
-            arrete_headings = [h for h in heading_elements if h.get_text() and 'Arrêté n°' in h.get_text()]
+            arrete_headings = self.parser.find_arrete_headings(content)
 
             logger.info(f"Page {page_num}: {len(arrete_headings)} résultats trouvés (via <h2/h3/h4> 'Arrêté n°')")
 
-            arretes_metadata = []
+            listing = ListingPage(page_num)
             for heading in arrete_headings:
+                explnum_id = self.parser.find_explnum_id(heading)
+                if self.crawl_state.is_past_mark(
+                        explnum_id, lambda: self.parser.extract_fields(heading)['date_publication']):
+                    listing.mark_reached = True
+                    logger.info(f"Page {page_num}: marque du crawl précédent atteinte (explnum_id {explnum_id})")
+                    break
+
+                numero_arrete = self._extract_numero_arrete(self.parser.heading_title(heading))
+                if numero_arrete and not self._is_known(numero_arrete):
+                    listing.unseen += 1
+
                 metadata = await self._parse_arrete_from_h3(heading)
                 if metadata:
-                    arretes_metadata.append(metadata)
+                    listing.arretes.append(metadata)
+                # Les arrêtés écartés par FILTER_TYPE font aussi avancer la marque
+                fields = metadata or self.parser.extract_fields(heading)
+                listing.seen.append((fields['explnum_id'], fields['date_publication']))
 
-            logger.info(f"Page {page_num}: {len(arretes_metadata)} nouveaux arrêtés à traiter")
-            return arretes_metadata
+            self.metrics.stage('listing_parse').observe(time.perf_counter() - parse_started_at)
+            self.metrics.count('listing_pages_total', help_text="Pages de résultats parcourues")
+            self.metrics.count('listing_results_total', len(arrete_headings), help_text="Résultats lus sur les pages")
+            logger.info(f"Page {page_num}: {len(listing.arretes)} nouveaux arrêtés à traiter")
+            return listing
 
         except Exception as e:
             logger.error(f"Erreur lors du scraping de la page {page_num}: {e}")
-            return []
+            self.metrics.count('listing_page_errors_total', help_text="Pages de résultats en erreur")
+            return ListingPage(page_num, error=True)
+
+    def _log_request_failure(self, request):
+        """Journalise les requêtes échouées d'une page Playwright (hors AJAX non critiques)."""
+        url = request.url
+        # Requêtes abandonnées volontairement par l'interception
+        if self.request_blocker is not None and self.request_blocker.should_block(request.resource_type, url):
+            return
+        # Ignorer les erreurs AJAX normales (facettes, compteurs, etc.)
+        if 'ajax.php' in url or 'cart_info.php' in url:
+            return  # Ces requêtes AJAX sont souvent annulées, c'est normal
+        # Logger uniquement les vraies erreurs (pages, PDFs)
+        logger.warning(f"Requête échouée: {url} - {request.failure}")
+
+    async def run(self, resume: bool = False):
+        """
+        Lance le scraper.
 
-    async def run(self):
-        """Lance le scraper."""
+        Args:
+            resume: Reprendre le crawl interrompu enregistré dans le checkpoint
+        """
+        status = 'error'
         try:
             logger.info("=== Démarrage du scraper d'arrêtés ===")
             validate_config()
             logger.info(f"Filtre actif: FILTER_TYPE={FILTER_TYPE}")
 
+            from playwright.async_api import async_playwright
             async with async_playwright() as p:
                 # Lancer le navigateur
                 logger.info("Lancement du navigateur...")
@@ -388,7 +814,7 @@ class ArretesScraper:
 
                 # Configurer le contexte pour ressembler à un vrai navigateur
                 context = await self.browser.new_context(
-                    user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                    user_agent=USER_AGENT,
                     viewport={'width': 1920, 'height': 1080},
                     locale='fr-FR',
                     timezone_id='Europe/Paris',
@@ -401,19 +827,15 @@ class ArretesScraper:
                     }
                 )
 
+                # Ne charger que le HTML des pages (ni images, CSS, polices, scripts, ni appels AJAX)
+                if self.request_blocker is not None:
+                    await self.request_blocker.install(context)
+
                 # Créer une première page
                 page = await context.new_page()
 
                 # Écouter les erreurs réseau pour debug (ignorer AJAX non critiques)
-                def log_request_failure(request):
-                    url = request.url
-                    # Ignorer les erreurs AJAX normales (facettes, compteurs, etc.)
-                    if 'ajax.php' in url or 'cart_info.php' in url:
-                        return  # Ces requêtes AJAX sont souvent annulées, c'est normal
-                    # Logger uniquement les vraies erreurs (pages, PDFs)
-                    logger.warning(f"Requête échouée: {url} - {request.failure}")
-
-                page.on('requestfailed', log_request_failure)
+                page.on('requestfailed', self._log_request_failure)
 
                 # Navigation préalable vers la page d'accueil pour établir une session
                 logger.info("Établissement de la session sur la page d'accueil...")
@@ -424,70 +846,120 @@ class ArretesScraper:
                 except Exception as e:
                     logger.warning(f"Impossible d'accéder à la page d'accueil: {e}")
 
+                # Les PDFs sont téléchargés hors navigateur, avec les cookies de la session
+                await self.pdf_downloader.start(cookies=await context.cookies())
+
                 # Maintenant naviguer vers la page de résultats
                 logger.info(f"Navigation vers la page de résultats...")
                 await page.goto(await self._get_search_page_url(1), wait_until='domcontentloaded', timeout=PAGE_LOAD_TIMEOUT)
                 content = await page.content()
-                soup = BeautifulSoup(content, 'lxml')
 
                 # Trouver le nombre total de résultats
-                pagination_info = soup.find('div', class_='navbar')
-                total_results = 0
-                if pagination_info:
-                    match = re.search(r'(\d+)\s*/\s*(\d+)', pagination_info.get_text())
-                    if match:
-                        total_results = int(match.group(2))
+                total_results = self.parser.total_results(content)
 
                 total_pages = (total_results // RESULTS_PER_PAGE) + 1
                 logger.info(f"Total de résultats: {total_results}, Total de pages: {total_pages}")
 
+                self.site_total_pages = total_pages
+
+                start_page = 1
+                self.resume = resume
+                if resume:
+                    start_page = self._resume_from_checkpoint()
+                elif self.checkpoint.exists():
+                    logger.warning(f"Checkpoint d'un crawl interrompu ignoré et supprimé ({self.checkpoint.path}), "
+                                   f"utiliser --resume pour le reprendre")
+                    self.checkpoint.clear()
+
                 if MAX_PAGES_TO_SCRAPE > 0:
-                    total_pages = min(total_pages, MAX_PAGES_TO_SCRAPE)
-                    logger.info(f"Limitation à {total_pages} pages")
-
-                # Scraper et traiter page par page (sauvegarde incrémentale)
-                total_arretes_traites = 0
-                semaphore = asyncio.Semaphore(MAX_CONCURRENT_PAGES)
-
-                for page_num in range(1, total_pages + 1):
-                    # 1. Scraper les métadonnées de cette page
-                    page_metadata = await self._scrape_page(page, page_num)
-
-                    # Si aucun nouvel arrêté sur cette page, on peut arrêter
-                    # (car les résultats sont triés par date décroissante)
-                    if not page_metadata:
-                        logger.info(f"Aucun nouvel arrêté sur la page {page_num}, arrêt du scraping")
-                        break
-
-                    # 2. Traiter immédiatement les PDFs de cette page
-                    async def process_with_semaphore(metadata):
-                        async with semaphore:
-                            pdf_page = await context.new_page()
-                            try:
-                                await self._process_arrete(pdf_page, metadata)
-                            finally:
-                                await pdf_page.close()
-                            await asyncio.sleep(SCRAPE_DELAY_SECONDS)
-
-                    tasks = [process_with_semaphore(m) for m in page_metadata]
-                    await asyncio.gather(*tasks)
-
-                    # 3. Sauvegarder le CSV après chaque page (sauvegarde incrémentale)
-                    if self.new_arretes:
-                        await self._save_to_csv()
-                        total_arretes_traites += len(page_metadata)
-                        logger.info(f"💾 Progression: {total_arretes_traites} arrêtés traités, CSV sauvegardé")
-                        # Réinitialiser la liste pour la prochaine page
-                        self.new_arretes = []
+                    # En reprise, la limite s'applique aux pages parcourues par ce run
+                    total_pages = min(total_pages, start_page - 1 + MAX_PAGES_TO_SCRAPE)
+                    logger.info(f"Limitation à la page {total_pages}")
 
+                # Scraper et traiter en pipeline (sauvegarde incrémentale page par page)
+                total_arretes_traites = await self._run_pipeline(page, total_pages, start_page)
+
+                if self.crawl_complete:
+                    self.crawl_state.advance()
+                    self.checkpoint.clear()
+                else:
+                    self._save_checkpoint()
+                    logger.info(f"Crawl incomplet, marque inchangée: {self.crawl_state.describe()}. "
+                                f"Checkpoint: {self.checkpoint.describe()} (reprendre avec --resume)")
+
+                # Regrouper les petits fichiers Parquet écrits à chaque sauvegarde du CSV
+                if self.parquet_store and total_arretes_traites:
+                    try:
+                        self.parquet_store.compact()
+                    except Exception as e:
+                        logger.error(f"Erreur lors du compactage du dataset Parquet: {e}")
+
+                logger.info(f"Limiteur de débit: {self.limiter.summary()}")
+                if self.request_blocker is not None:
+                    logger.info(self.request_blocker.summary())
+                logger.info(self.pdf_downloader.stats.summary())
+                logger.info(self.s3_uploader.stats.summary())
+                if self.s3_uploader.inventory is not None:
+                    logger.info(self.s3_uploader.inventory.summary())
+                logger.info(self.s3_uploader.dedup_summary())
+                if self.text_extractor:
+                    logger.info(self.text_extractor.summary())
                 logger.info(f"=== Scraping terminé: {total_arretes_traites} nouveaux arrêtés ajoutés ===")
+                status = 'complete' if self.crawl_complete else 'incomplete'
 
         except Exception as e:
             logger.error(f"Erreur critique dans le scraper: {e}")
             raise
         finally:
+            await self.pdf_downloader.close()
+            self.s3_uploader.close()
+            self.s3_uploader.save_content_index()
+            if self.text_extractor:
+                self.text_extractor.close()
+                self.text_index.close()
+            self.content_index.close()
+            self.index.close()
+            if self.search_index is not None:
+                self.search_index.close()
+            self.csv_writer.close()
             if self.browser:
                 await self.browser.close()
+            self._write_metrics(status)
+
+    def _write_metrics(self, status: str):
+        """
+        Complète les métriques avec les compteurs des composants (transferts, limiteur, S3)
+        et écrit le fichier Prometheus et le résumé JSON du run, même après une erreur.
+        """
+        if not METRICS_EXPORT:
+            return
+        metrics = self.metrics
+        for transfer, stats in (('pdf_download', self.pdf_downloader.stats), ('s3_upload', self.s3_uploader.stats)):
+            metrics.count('transfer_bytes_total', stats.bytes, "Octets transférés", transfer=transfer)
+            metrics.count('transfer_failures_total', stats.failures, "Transferts échoués", transfer=transfer)
+            metrics.gauge('transfer_throughput_bytes_per_second', "Débit des transferts (octets/s)",
+                          transfer=transfer).set(stats.bytes_per_second())
+        if self.request_blocker is not None:
+            for resource_type, count in self.request_blocker.blocked.items():
+                metrics.count('blocked_requests_total', count, "Requêtes des pages abandonnées par l'interception",
+                              resource_type=resource_type)
+            metrics.count('blocked_bytes_total', self.request_blocker.bytes_saved(),
+                          "Octets évités par l'interception des requêtes (estimation)")
+        metrics.count('s3_retries_total', self.s3_uploader.retries, "Nouvelles tentatives des appels S3 (botocore)")
+        metrics.count('s3_deduplicated_total', self.s3_uploader.deduplicated,
+                      "Uploads évités par l'index des contenus")
+        metrics.count('congestions_total', self.limiter.congestions,
+                      "Surcharges du site (HTTP 429/503, timeouts) ayant réduit la concurrence")
+        metrics.gauge('concurrency_limit', "Requêtes simultanées autorisées vers le site en fin de run").set(
+            self.limiter.current_limit)
+        metrics.gauge('run_success', "Le dernier run s'est terminé sans erreur (1) ou non (0)").set(
+            0 if status == 'error' else 1)
+        try:
+            metrics.write(status=status, crawl_complete=self.crawl_complete,
+                          arretes_saved=int(metrics.counter('arretes_saved_total', "Arrêtés ajoutés au CSV").value))
+            logger.info(f"Métriques du run écrites dans {METRICS_TEXTFILE} et {RUN_SUMMARY_FILE}")
+        except OSError as e:
+            logger.error(f"Erreur lors de l'écriture des métriques: {e}")
 
     async def _save_to_csv(self):
         """Sauvegarde les nouveaux arrêtés dans le CSV."""
@@ -495,27 +967,73 @@ class ArretesScraper:
             logger.info("Aucun nouvel arrêté à sauvegarder")
             return
 
+        # Avant l'écriture du CSV : le rattrapage ne doit pas déjà contenir ce lot
+        self._open_parquet_store()
+
         try:
-            # Créer un DataFrame avec les nouveaux arrêtés
-            new_df = pd.DataFrame(self.new_arretes, columns=CSV_COLUMNS)
+            # Un seul write + fsync par page : le lot est sur disque avant l'index et le checkpoint
+            with self.metrics.time('save_csv'):
+                self.csv_writer.write_rows(self.new_arretes)
 
-            # Ajouter au CSV existant ou créer un nouveau
-            if CSV_FILE.exists():
-                new_df.to_csv(CSV_FILE, mode='a', header=False, index=False)
-            else:
-                new_df.to_csv(CSV_FILE, mode='w', header=True, index=False)
+            # Garder l'index synchronisé avec le CSV (un seul lot par sauvegarde)
+            with self.metrics.time('save_index'):
+                self.index.upsert_many(self.new_arretes, commit=False)
+                self.index.mark_csv_synced()
 
-            logger.info(f"{len(self.new_arretes)} arrêtés sauvegardés dans {CSV_FILE}")
+            logger.info(f"{len(self.new_arretes)} arrêtés sauvegardés dans {self.csv_writer.path}")
 
         except Exception as e:
             logger.error(f"Erreur lors de la sauvegarde du CSV: {e}")
             raise
 
+        # Le CSV reste la source de vérité : un échec de l'index plein texte ou de l'export Parquet
+        # est seulement signalé
+        if self.search_index is not None:
+            try:
+                with self.metrics.time('save_search_index'):
+                    self.search_index.add_rows(self.new_arretes, commit=False)
+                    self.search_index.mark_csv_synced()
+            except Exception as e:
+                # La base est partagée avec l'index des arrêtés et des contenus : une transaction
+                # laissée ouverte y bloquerait toutes les écritures. L'index plein texte est désactivé
+                # pour la fin du run et rattrapera le CSV au prochain démarrage
+                logger.error(f"Erreur lors de l'indexation plein texte, désactivée pour ce run: {e} "
+                             f"(reconstruire avec: python search_index.py --rebuild)")
+                self.search_index.conn.rollback()
+                self.search_index.close()
+                self.search_index = None
+
+        if self.parquet_store:
+            try:
+                with self.metrics.time('save_parquet'):
+                    self.parquet_store.append(self.new_arretes)
+                    self.parquet_store.mark_csv_synced()
+            except Exception as e:
+                logger.error(f"Erreur lors de l'export Parquet: {e} "
+                             f"(reconstruire avec: python parquet_store.py --rebuild)")
+
 
 async def main():
     """Point d'entrée principal."""
-    scraper = ArretesScraper()
-    await scraper.run()
+    arg_parser = argparse.ArgumentParser(description="Scraper des arrêtés de Paris (BOVP)")
+    arg_parser.add_argument('--resume', action='store_true',
+                            help="Reprendre un crawl interrompu depuis data/checkpoint.json")
+    arg_parser.add_argument('--profile', action='store_true',
+                            help="Profiler le run (CPU échantillonné, mémoire par page de résultats) dans data/profile/")
+    args = arg_parser.parse_args()
+
+    profiler = None
+    if args.profile:
+        from profiler import RunProfiler
+        profiler = RunProfiler()
+        profiler.start()
+    try:
+        scraper = ArretesScraper()
+        scraper.profiler = profiler
+        await scraper.run(resume=args.resume)
+    finally:
+        if profiler is not None:
+            profiler.stop()
 
 
 if __name__ == "__main__":
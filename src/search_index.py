@@ -0,0 +1,262 @@
+"""Index plein texte (SQLite FTS5) des arrêtés : titre, autorité, signataire et texte des PDFs."""
+import argparse
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from arrete_index import csv_appended_since, csv_sync_point, iter_csv_rows
+from config import CSV_FILE, INDEX_DB_FILE, TEXT_DB_FILE
+
+logger = logging.getLogger(__name__)
+
+# Nombre de lignes indexées par lot lors d'une reconstruction
+BATCH_SIZE = 1000
+
+# unicode61 + remove_diacritics : "gênant", "génant" et "genant" donnent le même terme
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_docs (
+    id INTEGER PRIMARY KEY,
+    numero_arrete TEXT NOT NULL UNIQUE
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS arretes_fts USING fts5(
+    numero_arrete UNINDEXED,
+    date_publication UNINDEXED,
+    titre,
+    autorite_responsable,
+    signataire,
+    texte,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Colonnes recherchables, dans l'ordre de la table FTS
+SEARCH_COLUMNS = ('titre', 'autorite_responsable', 'signataire', 'texte')
+
+
+def to_fts_query(text: str, phrase: bool = False) -> str:
+    """
+    Convertit une saisie libre en requête FTS5 : chaque mot devient un terme entre guillemets
+    (la ponctuation comme "n°" ou "-" ne casse pas la syntaxe), tous les termes sont requis.
+    Avec `phrase`, les mots doivent se suivre.
+    """
+    words = [word.replace('"', '""') for word in text.split()]
+    if phrase:
+        return f'"{" ".join(words)}"'
+    return ' '.join(f'"{word}"' for word in words)
+
+
+class SearchIndex:
+    """
+    Index FTS5 des arrêtés, dans la même base SQLite que l'index des arrêtés.
+
+    Comme l'index des arrêtés, il est mis à jour à chaque sauvegarde du CSV, mémorise la
+    taille du CSV déjà indexée et se reconstruit depuis le CSV (le texte des PDFs est repris
+    de la base des textes, attachée à la connexion, quand elle existe). Chaque arrêté a un
+    identifiant stable (table search_docs) qui sert de rowid FTS : les mises à jour par
+    numéro restent indexées.
+    """
+
+    def __init__(self, db_path: Union[Path, str] = INDEX_DB_FILE, csv_path: Optional[Path] = CSV_FILE,
+                 text_db_path: Optional[Path] = TEXT_DB_FILE):
+        self.db_path = db_path
+        self.csv_path = csv_path
+        self.text_db_path = text_db_path
+        self.conn: Optional[sqlite3.Connection] = None
+        self._texts_attached = False
+
+    def open(self):
+        """Ouvre la base (mode WAL) et crée le schéma si nécessaire."""
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        """Ferme la base."""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+            self._texts_attached = False
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM search_docs").fetchone()[0]
+
+    def _has_texts(self) -> bool:
+        """Attache la base des textes dès qu'elle existe ; indique si sa table arrete_texts est lisible."""
+        if not self._texts_attached:
+            # ATTACH est impossible pendant une transaction : nouvel essai au lot suivant
+            if self.text_db_path is None or not Path(self.text_db_path).exists() or self.conn.in_transaction:
+                return False
+            self.conn.execute("ATTACH DATABASE ? AS texts", (str(self.text_db_path),))
+            self._texts_attached = True
+        row = self.conn.execute(
+            "SELECT 1 FROM texts.sqlite_master WHERE type = 'table' AND name = 'arrete_texts'"
+        ).fetchone()
+        return row is not None
+
+    def _doc_id(self, numero_arrete: str) -> int:
+        self.conn.execute("INSERT OR IGNORE INTO search_docs (numero_arrete) VALUES (?)", (numero_arrete,))
+        return self.conn.execute(
+            "SELECT id FROM search_docs WHERE numero_arrete = ?", (numero_arrete,)
+        ).fetchone()[0]
+
+    def add_rows(self, rows: Iterable[Dict], commit: bool = True):
+        """Indexe (ou réindexe) des arrêtés, avec le texte de leur PDF s'il a déjà été extrait."""
+        has_texts = self._has_texts()
+        for row in rows:
+            numero = row.get('numero_arrete')
+            if not numero:
+                continue
+            doc_id = self._doc_id(str(numero))
+            texte = ''
+            if has_texts:
+                found = self.conn.execute(
+                    "SELECT text FROM texts.arrete_texts WHERE numero_arrete = ?", (numero,)
+                ).fetchone()
+                texte = found[0] if found else ''
+            self.conn.execute("DELETE FROM arretes_fts WHERE rowid = ?", (doc_id,))
+            self.conn.execute(
+                "INSERT INTO arretes_fts (rowid, numero_arrete, date_publication, titre, "
+                "autorite_responsable, signataire, texte) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (doc_id, numero, row.get('date_publication') or '', row.get('titre') or '',
+                 row.get('autorite_responsable') or '', row.get('signataire') or '', texte)
+            )
+        if commit:
+            self.conn.commit()
+
+    def set_text(self, numero_arrete: str, text: str):
+        """
+        Ajoute le texte extrait du PDF d'un arrêté déjà indexé. S'il ne l'est pas encore
+        (texte extrait avant la sauvegarde du CSV), le texte sera repris de la base des textes.
+        """
+        row = self.conn.execute(
+            "SELECT id FROM search_docs WHERE numero_arrete = ?", (numero_arrete,)
+        ).fetchone()
+        if row:
+            self.conn.execute("UPDATE arretes_fts SET texte = ? WHERE rowid = ?", (text, row[0]))
+            self.conn.commit()
+
+    def search(self, query: str, limit: int = 20, raw: bool = False, phrase: bool = False) -> List[Dict]:
+        """
+        Recherche les arrêtés correspondant à la requête, les plus pertinents d'abord (BM25).
+
+        Args:
+            query: Mots recherchés (sans accents ni majuscules requis), ou requête FTS5 si `raw`
+            limit: Nombre maximum de résultats
+            raw: Passer la requête telle quelle à FTS5 (OR, NEAR, préfixes "rivol*", colonne "titre:...")
+            phrase: Les mots doivent se suivre
+        """
+        fts_query = query if raw else to_fts_query(query, phrase)
+        rows = self.conn.execute(
+            """
+            SELECT numero_arrete, date_publication, titre,
+                   snippet(arretes_fts, -1, '[', ']', '…', 12)
+            FROM arretes_fts
+            WHERE arretes_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+            """,
+            (fts_query, limit)
+        ).fetchall()
+        return [
+            {'numero_arrete': numero, 'date_publication': date_publication, 'titre': titre, 'extrait': extrait}
+            for numero, date_publication, titre, extrait in rows
+        ]
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def mark_csv_synced(self):
+        """Mémorise la taille et l'empreinte actuelles du CSV comme point de synchronisation de l'index plein texte."""
+        size, fingerprint = csv_sync_point(self.csv_path)
+        self.conn.executemany(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (('search_csv_size', str(size)), ('search_csv_hash', fingerprint))
+        )
+        self.conn.commit()
+
+    def _load_rows(self, rows: Iterator[Dict]) -> int:
+        count = 0
+        batch: List[Dict] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                self.add_rows(batch, commit=False)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.add_rows(batch, commit=False)
+            count += len(batch)
+        return count
+
+    def rebuild_from_csv(self) -> int:
+        """Reconstruit entièrement l'index plein texte à partir du CSV. Retourne le nombre de lignes lues."""
+        self.conn.execute("DELETE FROM arretes_fts")
+        self.conn.execute("DELETE FROM search_docs")
+        count = 0
+        if self.csv_path and self.csv_path.exists():
+            count = self._load_rows(iter_csv_rows(self.csv_path))
+        self.conn.execute("INSERT INTO arretes_fts (arretes_fts) VALUES ('optimize')")
+        self.mark_csv_synced()
+        logger.info(f"Index plein texte reconstruit depuis le CSV: {count} lignes")
+        return count
+
+    def sync_with_csv(self):
+        """Indexe les lignes ajoutées au CSV depuis la dernière synchronisation, ou reconstruit l'index."""
+        if not self.csv_path or not self.csv_path.exists():
+            return
+
+        offset = csv_appended_since(self.csv_path, self._get_meta('search_csv_size'),
+                                    self._get_meta('search_csv_hash'))
+        if offset is None:
+            self.rebuild_from_csv()
+        elif offset < self.csv_path.stat().st_size:
+            count = self._load_rows(iter_csv_rows(self.csv_path, offset=offset))
+            self.mark_csv_synced()
+            logger.info(f"Index plein texte mis à jour: {count} nouvelles lignes du CSV")
+
+
+def main():
+    """Recherche plein texte dans les arrêtés."""
+    parser = argparse.ArgumentParser(description="Recherche plein texte dans les arrêtés")
+    parser.add_argument('query', nargs='?', help="Mots recherchés (ex: \"rue de rivoli\")")
+    parser.add_argument('--phrase', action='store_true', help="Les mots doivent se suivre")
+    parser.add_argument('--raw', action='store_true',
+                        help="Requête FTS5 brute (ex: 'titre:rivoli AND stationn*')")
+    parser.add_argument('--limit', type=int, default=20, help="Nombre maximum de résultats")
+    parser.add_argument('--rebuild', action='store_true', help="Reconstruire l'index depuis le CSV")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    index = SearchIndex()
+    index.open()
+    try:
+        if args.rebuild:
+            index.rebuild_from_csv()
+        else:
+            index.sync_with_csv()
+        if not args.query:
+            print(f"{len(index)} arrêtés dans l'index plein texte {index.db_path}")
+            return
+
+        start = time.perf_counter()
+        results = index.search(args.query, limit=args.limit, raw=args.raw, phrase=args.phrase)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        for result in results:
+            print(f"{result['numero_arrete']} ({result['date_publication']}) - {result['extrait']}")
+        print(f"{len(results)} résultats ({elapsed_ms:.1f} ms)")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
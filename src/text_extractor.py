@@ -0,0 +1,312 @@
+"""Extraction du texte des PDFs dans un pool de processus, stocké dans sa propre base SQLite."""
+import argparse
+import asyncio
+import csv
+import io
+import logging
+import multiprocessing
+import sqlite3
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Deque, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from pypdf import PdfReader
+
+from config import (CSV_FILE, FULLTEXT_INDEX, INDEX_DB_FILE, S3_UPLOAD_WORKERS, TEXT_DB_FILE,
+                    TEXT_EXTRACTION_WORKERS)
+from content_index import key_from_url
+
+if TYPE_CHECKING:
+    from search_index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS arrete_texts (
+    numero_arrete TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    pages INTEGER,
+    sha256 TEXT,
+    extracted_at TEXT
+);
+"""
+
+
+def extract_text(pdf_content: bytes) -> Tuple[str, int]:
+    """
+    Extrait le texte d'un PDF (exécuté dans un processus du pool : coûteux en CPU).
+
+    Returns:
+        Le texte des pages séparées par un saut de ligne, et le nombre de pages
+    """
+    reader = PdfReader(io.BytesIO(pdf_content))
+    pages = [page.extract_text() or '' for page in reader.pages]
+    return '\n'.join(pages), len(pages)
+
+
+class TextIndex:
+    """
+    Texte extrait de chaque arrêté, clé `numero_arrete`.
+
+    Reconstructible seulement depuis les PDFs (voir `python text_extractor.py --backfill`) :
+    stocké dans sa propre base, que la reconstruction de l'index des arrêtés depuis le CSV
+    ne touche pas. L'index plein texte la lit en l'attachant à sa connexion.
+    """
+
+    def __init__(self, db_path: Union[Path, str] = TEXT_DB_FILE, legacy_db_path: Optional[Path] = None):
+        """
+        Args:
+            legacy_db_path: Base d'où reprendre la table arrete_texts à la création de la base
+                (index des arrêtés, qui contenait les textes auparavant)
+        """
+        self.db_path = db_path
+        self.legacy_db_path = legacy_db_path
+        self.conn: Optional[sqlite3.Connection] = None
+
+    def open(self):
+        """Ouvre la base (mode WAL) et crée le schéma si nécessaire."""
+        created = str(self.db_path) == ':memory:' or not Path(self.db_path).exists()
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        if created and self.legacy_db_path is not None and Path(self.legacy_db_path).exists():
+            self._migrate(self.legacy_db_path)
+
+    def _migrate(self, legacy_db_path: Path):
+        """Reprend les textes de l'ancienne base (table arrete_texts de l'index des arrêtés)."""
+        self.conn.execute("ATTACH DATABASE ? AS legacy", (str(legacy_db_path),))
+        try:
+            has_table = self.conn.execute(
+                "SELECT 1 FROM legacy.sqlite_master WHERE type = 'table' AND name = 'arrete_texts'"
+            ).fetchone()
+            if has_table:
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO arrete_texts (numero_arrete, text, pages, sha256, extracted_at) "
+                    "SELECT numero_arrete, text, pages, sha256, extracted_at FROM legacy.arrete_texts"
+                )
+                self.conn.commit()
+                logger.info(f"Textes repris de {legacy_db_path}: {cursor.rowcount} arrêtés")
+        finally:
+            self.conn.execute("DETACH DATABASE legacy")
+
+    def close(self):
+        """Ferme la base."""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM arrete_texts").fetchone()[0]
+
+    def __contains__(self, numero_arrete: str) -> bool:
+        row = self.conn.execute(
+            "SELECT 1 FROM arrete_texts WHERE numero_arrete = ?", (numero_arrete,)
+        ).fetchone()
+        return row is not None
+
+    def get(self, numero_arrete: str) -> Optional[str]:
+        """Texte d'un arrêté, ou None s'il n'a pas été extrait."""
+        row = self.conn.execute(
+            "SELECT text FROM arrete_texts WHERE numero_arrete = ?", (numero_arrete,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def add(self, numero_arrete: str, text: str, pages: int, sha256: str = ''):
+        """Enregistre (ou remplace) le texte d'un arrêté."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO arrete_texts (numero_arrete, text, pages, sha256, extracted_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (numero_arrete, text, pages, sha256 or None, datetime.now().isoformat())
+        )
+        self.conn.commit()
+
+    def missing(self, numeros: Iterable[str]) -> Set[str]:
+        """Numéros dont le texte n'a pas encore été extrait."""
+        known = {row[0] for row in self.conn.execute("SELECT numero_arrete FROM arrete_texts")}
+        return set(numeros) - known
+
+
+class TextExtractor:
+    """
+    Pool de processus d'extraction du texte des PDFs.
+
+    L'extraction est coûteuse en CPU : dans des threads, elle serait sérialisée par le GIL
+    et ralentirait la boucle asyncio du crawler. Les processus sont lancés en mode
+    « spawn » (et non fork) car le scraper a déjà des threads actifs (uploads S3).
+    """
+
+    def __init__(self, workers: int = TEXT_EXTRACTION_WORKERS):
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        self.extracted = 0
+        self.failed = 0
+        self.pages = 0
+
+    def close(self):
+        """Attend la fin des extractions en cours et arrête les processus."""
+        self.executor.shutdown(wait=True)
+
+    def submit(self, pdf_content: bytes):
+        """Soumet un PDF au pool (Future du résultat de extract_text)."""
+        return self.executor.submit(extract_text, pdf_content)
+
+    async def extract_async(self, pdf_content: bytes, numero_arrete: str) -> Optional[Tuple[str, int]]:
+        """Extrait le texte dans le pool sans bloquer la boucle asyncio. None si le PDF est illisible."""
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self.executor, extract_text, pdf_content)
+        except Exception as e:
+            self.record_failure(numero_arrete, e)
+            return None
+        self.record(result)
+        return result
+
+    def record(self, result: Tuple[str, int]):
+        self.extracted += 1
+        self.pages += result[1]
+
+    def record_failure(self, numero_arrete: str, error: Exception):
+        self.failed += 1
+        logger.warning(f"Extraction du texte impossible pour {numero_arrete}: {error}")
+
+    def summary(self) -> str:
+        return (f"Extraction du texte: {self.extracted} PDFs ({self.pages} pages), "
+                f"{self.failed} échecs, {self.workers} processus")
+
+
+def _pdf_keys_from_csv(csv_path: Path) -> Dict[str, List[str]]:
+    """Clé S3 -> numéros d'arrêtés du CSV pointant vers ce PDF (un PDF republié n'est lu qu'une fois)."""
+    numeros_by_key: Dict[str, List[str]] = {}
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            s3_key = key_from_url(row.get('pdf_s3_url', ''))
+            if s3_key:
+                numeros_by_key.setdefault(s3_key, []).append(row['numero_arrete'])
+    return numeros_by_key
+
+
+def backfill_from_s3(index: TextIndex, extractor: TextExtractor, s3_client, bucket_name: str,
+                     csv_path: Path = CSV_FILE, download_workers: int = S3_UPLOAD_WORKERS,
+                     limit: int = 0, search_index: Optional['SearchIndex'] = None) -> int:
+    """
+    Extrait le texte des arrêtés du CSV qui n'en ont pas encore, à partir de leurs PDFs sur S3.
+
+    Les téléchargements tournent dans un pool de threads et les extractions dans le pool de
+    processus (tous les cœurs) ; au plus deux PDFs par processus sont en cours de
+    téléchargement, et autant en attente d'extraction. Le texte extrait est aussi ajouté à
+    l'index plein texte `search_index` s'il est fourni (déjà synchronisé avec le CSV).
+
+    Returns:
+        Nombre de PDFs traités
+    """
+    numeros_by_key = _pdf_keys_from_csv(csv_path)
+    missing = index.missing(numero for numeros in numeros_by_key.values() for numero in numeros)
+    todo = [(key, [numero for numero in numeros if numero in missing])
+            for key, numeros in numeros_by_key.items()
+            if any(numero in missing for numero in numeros)]
+    if limit:
+        todo = todo[:limit]
+    logger.info(f"Backfill du texte: {len(todo)} PDFs à extraire depuis {bucket_name}")
+
+    def download(key: str) -> bytes:
+        return s3_client.get_object(Bucket=bucket_name, Key=key)['Body'].read()
+
+    max_in_flight = 2 * extractor.workers
+    remaining = iter(todo)
+    downloading: Deque = deque()
+    extracting: Dict = {}
+    done_count = 0
+
+    def collect(futures):
+        nonlocal done_count
+        for future in futures:
+            numeros = extracting.pop(future)
+            try:
+                text, pages = future.result()
+            except Exception as e:
+                extractor.record_failure(', '.join(numeros), e)
+            else:
+                extractor.record((text, pages))
+                for numero in numeros:
+                    index.add(numero, text, pages)
+                    if search_index is not None:
+                        search_index.set_text(numero, text)
+            done_count += 1
+            if done_count % 500 == 0:
+                logger.info(f"{done_count}/{len(todo)} PDFs extraits")
+
+    with ThreadPoolExecutor(max_workers=download_workers, thread_name_prefix='s3-download') as downloads:
+        while True:
+            # Télécharger en avance sur les extractions, dans une fenêtre bornée
+            while len(downloading) < max_in_flight:
+                item = next(remaining, None)
+                if item is None:
+                    break
+                downloading.append((item[1], downloads.submit(download, item[0])))
+            if not downloading:
+                break
+
+            numeros, download_future = downloading.popleft()
+            try:
+                content = download_future.result()
+            except Exception as e:
+                extractor.record_failure(', '.join(numeros), e)
+                continue
+            if len(extracting) >= max_in_flight:
+                collect(wait(extracting, return_when=FIRST_COMPLETED).done)
+            extracting[extractor.submit(content)] = numeros
+        collect(wait(extracting).done)
+
+    logger.info(extractor.summary())
+    return len(todo)
+
+
+def main():
+    """Commandes de l'index du texte des arrêtés."""
+    parser = argparse.ArgumentParser(description="Texte extrait des PDFs des arrêtés")
+    parser.add_argument('--backfill', action='store_true',
+                        help="Extraire le texte des arrêtés du CSV qui n'en ont pas, depuis leurs PDFs sur S3")
+    parser.add_argument('--limit', type=int, default=0, help="Nombre maximum de PDFs à traiter (0 = tous)")
+    parser.add_argument('--workers', type=int, default=TEXT_EXTRACTION_WORKERS,
+                        help="Processus d'extraction (défaut: tous les cœurs)")
+    parser.add_argument('--show', metavar='NUMERO', help="Afficher le texte d'un arrêté")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    index = TextIndex(legacy_db_path=INDEX_DB_FILE)
+    index.open()
+    try:
+        if args.show:
+            print(index.get(args.show) or f"Aucun texte pour {args.show}")
+            return
+        if args.backfill:
+            from s3_uploader import S3Uploader
+            uploader = S3Uploader(dry_run=False)
+            extractor = TextExtractor(workers=args.workers)
+            # Le texte extrait est aussi recherchable : l'index plein texte est d'abord mis à jour avec le CSV
+            search_index = None
+            if FULLTEXT_INDEX:
+                from search_index import SearchIndex
+                search_index = SearchIndex()
+                search_index.open()
+                search_index.sync_with_csv()
+            try:
+                backfill_from_s3(index, extractor, uploader.s3_client, uploader.bucket_name, limit=args.limit,
+                                 search_index=search_index)
+            finally:
+                extractor.close()
+                uploader.close()
+                if search_index is not None:
+                    search_index.close()
+        print(f"{len(index)} textes d'arrêtés dans {index.db_path}")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
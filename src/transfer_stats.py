@@ -0,0 +1,58 @@
+"""Statistiques de latence et de débit des transferts de PDFs (téléchargements, uploads)."""
+import time
+from typing import Optional
+
+from metrics import Histogram
+
+
+class TransferStats:
+    """
+    Compteurs d'un type de transfert : nombre, échecs, latence et débit.
+
+    Le débit est calculé sur la durée écoulée entre le début du premier transfert et
+    la fin du dernier, transferts simultanés compris.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.failures = 0
+        self.bytes = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        # Distribution des latences des transferts réussis, exportée dans les métriques du run
+        self.latency = Histogram()
+        self.first_started_at: Optional[float] = None
+        self.last_finished_at: Optional[float] = None
+
+    def record(self, started_at: float, size: int, success: bool = True):
+        """Enregistre un transfert démarré à started_at (time.monotonic())."""
+        finished_at = time.monotonic()
+        latency = finished_at - started_at
+        if self.first_started_at is None or started_at < self.first_started_at:
+            self.first_started_at = started_at
+        self.last_finished_at = finished_at
+
+        if not success:
+            self.failures += 1
+            return
+        self.count += 1
+        self.bytes += size
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.latency.observe(latency)
+
+    def bytes_per_second(self) -> float:
+        """Débit global des transferts réussis (octets par seconde), 0 sans transfert."""
+        if not self.count:
+            return 0.0
+        return self.bytes / max(self.last_finished_at - self.first_started_at, 1e-9)
+
+    def summary(self) -> str:
+        """Résumé pour les logs."""
+        if not self.count:
+            return f"{self.name}: aucun transfert ({self.failures} échecs)"
+        elapsed = max(self.last_finished_at - self.first_started_at, 1e-9)
+        return (f"{self.name}: {self.count} PDFs ({self.failures} échecs), "
+                f"latence moyenne {self.total_latency / self.count:.2f}s (max {self.max_latency:.2f}s), "
+                f"débit {self.bytes_per_second() / 1024 / 1024:.2f} Mo/s, {self.count / elapsed:.1f} PDFs/s")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Test d'équivalence du moteur de classification avec l'implémentation historique par `any(...)`."""
+import csv
+import os
+import random
+import sys
+from pathlib import Path
+
+os.environ.setdefault('DRY_RUN', 'true')
+
+# Ajouter src au path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+import classifier as classifier_module
+from classifier import KeywordClassifier
+from config import CLASSIFICATION_KEYWORDS_FILE, CSV_FILE, classify_arrete
+
+
+def legacy_classify_arrete(titre: str) -> dict:
+    """classify_arrete avant le moteur compilé : une recherche par mot-clé."""
+    titre_lower = titre.lower()
+
+    if 'stationnement gênant' in titre_lower or 'stationnement génant' in titre_lower:
+        return {
+            'concerne_circulation': False,
+            'concerne_stationnement': True,
+            'est_temporaire': 'à titre provisoire' in titre_lower or 'provisoire' in titre_lower or 'temporaire' in titre_lower
+        }
+
+    mots_circulation = ['circulation', 'sens unique', 'sens interdit', 'voie', 'interdiction de circuler',
+                        'accès', 'fermeture', 'déviation', 'circulation générale']
+    mots_stationnement = ['stationnement', 'parking', 'zone bleue', 'livraison', 'règles de stationnement']
+    mots_temporaire = ['à titre provisoire', 'provisoire', 'temporaire', 'provisoirement']
+
+    return {
+        'concerne_circulation': any(mot in titre_lower for mot in mots_circulation),
+        'concerne_stationnement': any(mot in titre_lower for mot in mots_stationnement),
+        'est_temporaire': any(mot in titre_lower for mot in mots_temporaire)
+    }
+
+
+def _csv_titles():
+    with open(CSV_FILE, newline='', encoding='utf-8') as f:
+        return [row['titre'] for row in csv.DictReader(f)]
+
+
+def test_matches_legacy_on_all_csv_titles():
+    titles = _csv_titles()
+    assert titles, f"Aucun titre dans {CSV_FILE}"
+    for titre in titles:
+        assert classify_arrete(titre) == legacy_classify_arrete(titre), titre
+
+
+def _check_random_titles(classifier: KeywordClassifier):
+    """Titres générés en combinant mots-clés (majuscules, chevauchements) et texte quelconque."""
+    fragments = [mot for mots in classifier.keywords.values() for mot in mots]
+    fragments += ['Arrêté n° 2025 T 17858', ' ', 'rue de Rivoli', 'Paris 1er', 'ment', 'gé', 'nant', 'VOIE']
+    rng = random.Random(20251024)
+    for _ in range(5000):
+        parts = rng.choices(fragments, k=rng.randint(0, 6))
+        titre = ''.join(part.upper() if rng.random() < 0.2 else part for part in parts)
+        assert classifier.classify(titre) == legacy_classify_arrete(titre), titre
+
+
+def test_matches_legacy_on_random_titles():
+    _check_random_titles(KeywordClassifier.from_file(CLASSIFICATION_KEYWORDS_FILE))
+
+
+def test_lookahead_fallback_matches_legacy():
+    original_limit = classifier_module.MAX_MERGED_PATTERNS
+    classifier_module.MAX_MERGED_PATTERNS = 0
+    try:
+        classifier = KeywordClassifier.from_file(CLASSIFICATION_KEYWORDS_FILE)
+    finally:
+        classifier_module.MAX_MERGED_PATTERNS = original_limit
+    assert classifier.pattern.pattern.startswith('(?=(')
+    _check_random_titles(classifier)
+
+
+def test_overlapping_keywords():
+    classifier = KeywordClassifier.from_file(CLASSIFICATION_KEYWORDS_FILE)
+    assert classifier.categories("stationnement gênant") >= {'stationnement_genant', 'stationnement'}
+    assert classifier.classify("ACCÈSTATIONNEMENT")['concerne_circulation']
+    assert classifier.classify("Stationnement gênant la circulation, à titre provisoirement") == {
+        'concerne_circulation': False,
+        'concerne_stationnement': True,
+        'est_temporaire': True,
+    }
+    assert classifier.classify("") == {
+        'concerne_circulation': False,
+        'concerne_stationnement': False,
+        'est_temporaire': False,
+    }
+
+
+if __name__ == '__main__':
+    for test in (test_matches_legacy_on_all_csv_titles, test_matches_legacy_on_random_titles,
+                 test_lookahead_fallback_matches_legacy, test_overlapping_keywords):
+        test()
+        print(f"✅ {test.__name__}")
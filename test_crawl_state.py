@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""Test du high-water mark du crawl, du checkpoint de reprise et de la reprise d'un crawl interrompu."""
+import asyncio
+import csv
+import json
+import os
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+
+os.environ.setdefault('DRY_RUN', 'true')
+
+# Ajouter src au path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from arrete_index import ArreteIndex
+from crawl_state import CrawlCheckpoint, CrawlState
+from metrics import Metrics
+from parsers import LxmlResultParser
+from rate_limiter import AdaptiveLimiter
+from scraper import ArretesScraper
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'debug_page_3.html'
+
+
+def _no_date():
+    raise AssertionError("date de publication lue pour un résultat au-dessus de la marque")
+
+
+def test_is_past_mark():
+    state = CrawlState(path=Path('inexistant.json'), csv_path=None)
+    assert not state.is_past_mark('44311', _no_date)
+
+    state.max_explnum_id = 44311
+    state.latest_date_publication = date(2025, 10, 22)
+    # Au-dessus de la marque : nouveau résultat, sans lire sa date
+    assert not state.is_past_mark('44320', _no_date)
+    assert not state.is_past_mark('', _no_date)
+    # Sous la marque et publié avant sa date : déjà vu
+    assert state.is_past_mark('44311', lambda: '21/10/2025')
+    assert state.is_past_mark('44000', lambda: '2025-09-01')
+    # Publié le même jour que la marque : encore parsé (ordre non garanti dans la journée)
+    assert not state.is_past_mark('44300', lambda: '22/10/2025')
+    # Date illisible sous la marque : considéré comme vu
+    assert state.is_past_mark('44300', lambda: '')
+
+
+def test_observe_and_advance():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / 'crawl_state.json'
+        csv_path = Path(tmp_dir) / 'arretes.csv'
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['numero_arrete', 'explnum_id', 'date_publication'])
+            writer.writeheader()
+            writer.writerow({'numero_arrete': '2025 T 1', 'explnum_id': '44100', 'date_publication': '2025-10-20'})
+            writer.writerow({'numero_arrete': '2025 T 2', 'explnum_id': '44050', 'date_publication': '21/10/2025'})
+
+        # Sans fichier d'état, la marque est initialisée depuis le CSV (formats de date mélangés)
+        state = CrawlState(path=path, csv_path=csv_path)
+        state.load()
+        assert state.max_explnum_id == 44100
+        assert state.latest_date_publication == date(2025, 10, 21)
+
+        # Les résultats vus ne déplacent la marque qu'à la fin d'un crawl complet
+        state.observe('44442', '24/10/2025')
+        state.observe('44443', '2025-10-23')
+        state.observe('', '')
+        assert state.max_explnum_id == 44100
+        assert (state.seen_max_explnum_id, state.seen_latest_date_publication) == (44443, date(2025, 10, 24))
+
+        state.advance()
+        assert (state.max_explnum_id, state.latest_date_publication) == (44443, date(2025, 10, 24))
+        reloaded = CrawlState(path=path, csv_path=None)
+        reloaded.load()
+        assert (reloaded.max_explnum_id, reloaded.latest_date_publication) == (44443, date(2025, 10, 24))
+
+        # Une marque plus basse vue pendant le crawl ne la fait jamais reculer
+        reloaded.observe('100', '01/01/2020')
+        reloaded.advance()
+        assert reloaded.max_explnum_id == 44443
+
+
+def test_checkpoint_save_and_load():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / 'checkpoint.json'
+        checkpoint = CrawlCheckpoint(path)
+        assert not checkpoint.exists() and not checkpoint.load()
+
+        checkpoint.last_committed_page = 3
+        checkpoint.last_listed_page = 5
+        checkpoint.total_pages = 190
+        checkpoint.pending = [(4, {'numero_arrete': '2025 T 1', 'explnum_id': '44100'}),
+                              (5, {'numero_arrete': '2025 T 2', 'explnum_id': '44050'})]
+        checkpoint.seen_max_explnum_id = 44443
+        checkpoint.seen_latest_date_publication = date(2025, 10, 24)
+        checkpoint.save()
+
+        # Écriture atomique : pas de fichier temporaire restant, JSON complet
+        assert [p.name for p in Path(tmp_dir).iterdir()] == ['checkpoint.json']
+        assert json.loads(path.read_text(encoding='utf-8'))['last_listed_page'] == 5
+
+        loaded = CrawlCheckpoint(path)
+        assert loaded.load()
+        assert (loaded.last_committed_page, loaded.last_listed_page, loaded.total_pages) == (3, 5, 190)
+        assert loaded.pending == checkpoint.pending
+        assert (loaded.seen_max_explnum_id, loaded.seen_latest_date_publication) == (44443, date(2025, 10, 24))
+
+        loaded.clear()
+        assert not path.exists()
+
+
+def test_dates_stored_as_iso():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        state_path = Path(tmp_dir) / 'crawl_state.json'
+        checkpoint_path = Path(tmp_dir) / 'checkpoint.json'
+        # Fichiers écrits avant la migration des dates (format BOVP)
+        state_path.write_text(json.dumps({'max_explnum_id': 44443, 'latest_date_publication': '24/10/2025'}),
+                              encoding='utf-8')
+        checkpoint_path.write_text(json.dumps({
+            'last_committed_page': 3, 'last_listed_page': 5, 'total_pages': 190,
+            'pending': [{'page': 4, 'metadata': {'numero_arrete': '2025 T 1', 'date_publication': '23/10/2025',
+                                                 'date_signature': '20/10/2025'}}],
+            'seen_max_explnum_id': 44443, 'seen_latest_date_publication': '24/10/2025',
+        }), encoding='utf-8')
+
+        state = CrawlState(state_path, csv_path=None)
+        state.load()
+        assert state.latest_date_publication == date(2025, 10, 24)
+        checkpoint = CrawlCheckpoint(checkpoint_path)
+        assert checkpoint.load()
+        assert checkpoint.seen_latest_date_publication == date(2025, 10, 24)
+        assert checkpoint.pending[0][1]['date_publication'] == '2025-10-23'
+        assert checkpoint.pending[0][1]['date_signature'] == '2025-10-20'
+
+        state.save()
+        checkpoint.save()
+        assert json.loads(state_path.read_text(encoding='utf-8'))['latest_date_publication'] == '2025-10-24'
+        data = json.loads(checkpoint_path.read_text(encoding='utf-8'))
+        assert data['seen_latest_date_publication'] == '2025-10-24'
+        assert data['pending'][0]['metadata']['date_publication'] == '2025-10-23'
+
+
+def _make_scraper(tmp_dir: str) -> ArretesScraper:
+    """Scraper sans navigateur ni S3, avec un checkpoint et un état du crawl temporaires."""
+    scraper = ArretesScraper.__new__(ArretesScraper)
+    scraper.parser = LxmlResultParser()
+    scraper.metrics = Metrics()
+    scraper.limiter = AdaptiveLimiter(initial=1, minimum=1, maximum=1, max_rps=0)
+    scraper.existing_arretes = set()
+    scraper.index = ArreteIndex(':memory:', csv_path=None)
+    scraper.index.open()
+    scraper.crawl_state = CrawlState(path=Path(tmp_dir) / 'crawl_state.json', csv_path=None)
+    scraper.checkpoint = CrawlCheckpoint(Path(tmp_dir) / 'checkpoint.json')
+    scraper.pending_arretes = {}
+    scraper.last_listed_page = 0
+    scraper.resume = False
+    return scraper
+
+
+def test_resume_from_checkpoint():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        scraper = _make_scraper(tmp_dir)
+        scraper.resume = True
+        assert scraper._resume_from_checkpoint() == 1
+        assert not scraper.resume
+
+        checkpoint = CrawlCheckpoint(scraper.checkpoint.path)
+        checkpoint.last_committed_page = 3
+        checkpoint.last_listed_page = 5
+        checkpoint.pending = [(4, {'numero_arrete': '2025 T 1'}), (5, {'numero_arrete': '2025 T 2'})]
+        checkpoint.seen_max_explnum_id = 44443
+        checkpoint.seen_latest_date_publication = date(2025, 10, 24)
+        checkpoint.save()
+        # Sauvegardé dans le CSV juste avant l'interruption, sans que le checkpoint ait été réécrit
+        scraper.index.upsert_many([{'numero_arrete': '2025 T 1'}])
+
+        scraper.resume = True
+        assert scraper._resume_from_checkpoint() == 6
+        assert scraper.pending_arretes == {'2025 T 2': (5, {'numero_arrete': '2025 T 2'})}
+        assert scraper.crawl_state.seen_max_explnum_id == 44443
+        assert scraper.crawl_state.seen_latest_date_publication == date(2025, 10, 24)
+
+
+class FakeResponse:
+    status = 200
+
+
+class FakePage:
+    """Page Playwright minimale : renvoie toujours la même page de résultats enregistrée."""
+
+    def __init__(self, content: str):
+        self._content = content
+
+    async def goto(self, url, **kwargs):
+        return FakeResponse()
+
+    async def content(self):
+        return self._content
+
+
+def test_page_stops_at_mark():
+    page = FakePage(FIXTURE.read_text(encoding='utf-8'))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        scraper = _make_scraper(tmp_dir)
+        listing = asyncio.run(scraper._scrape_page(page, 3))
+        assert not listing.mark_reached and not listing.error
+        assert len(listing.seen) == 50
+
+        # La page 3 enregistrée commence par 44320 (22/10/2025) puis 44311 (21/10/2025)
+        scraper.crawl_state.max_explnum_id = 44311
+        scraper.crawl_state.latest_date_publication = date(2025, 10, 22)
+        scraper.existing_arretes.clear()
+        listing = asyncio.run(scraper._scrape_page(page, 3))
+        assert listing.mark_reached and len(listing.arretes) == 1
+
+
+if __name__ == '__main__':
+    for test in (test_is_past_mark, test_observe_and_advance, test_checkpoint_save_and_load,
+                 test_dates_stored_as_iso, test_resume_from_checkpoint, test_page_stops_at_mark):
+        test()
+        print(f"✅ {test.__name__}")
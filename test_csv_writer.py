@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Test de l'écriture en ajout seul du CSV et de la reprise après une écriture interrompue."""
+import csv
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault('DRY_RUN', 'true')
+
+# Ajouter src au path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from config import CSV_COLUMNS
+from csv_writer import CsvAppendWriter, READ_CHUNK_SIZE
+
+ROW = {
+    'numero_arrete': '2025 T 17858',
+    'titre': 'Arrêté n° 2025 T 17858 modifiant, à titre provisoire, la règle du stationnement',
+    'concerne_stationnement': True,
+    'est_temporaire': True,
+    'explnum_id': '44443',
+}
+
+
+def _read(path: Path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def test_writes_header_then_appends():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / 'arretes.csv'
+        writer = CsvAppendWriter(path)
+        writer.open()
+        writer.write_rows([ROW])
+        writer.close()
+
+        writer = CsvAppendWriter(path)
+        writer.open()
+        writer.write_rows([{**ROW, 'numero_arrete': '2025 T 17859', 'inconnue': 'ignorée'}])
+        writer.close()
+
+        rows = _read(path)
+        assert list(rows[0].keys()) == CSV_COLUMNS
+        assert [row['numero_arrete'] for row in rows] == ['2025 T 17858', '2025 T 17859']
+        assert rows[0]['titre'] == ROW['titre']
+        assert rows[0]['concerne_stationnement'] == 'True'
+        assert rows[0]['signataire'] == ''
+
+
+def test_truncated_last_row_is_dropped():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / 'arretes.csv'
+        writer = CsvAppendWriter(path)
+        writer.open()
+        writer.write_rows([ROW])
+        writer.close()
+        complete_size = path.stat().st_size
+
+        with open(path, 'ab') as f:
+            f.write('2025 T 17859,"Arrêté n° 2025 T 1'.encode('utf-8'))
+
+        writer = CsvAppendWriter(path)
+        writer.open()
+        assert path.stat().st_size == complete_size
+        writer.write_rows([{**ROW, 'numero_arrete': '2025 T 17860'}])
+        writer.close()
+
+        assert [row['numero_arrete'] for row in _read(path)] == ['2025 T 17858', '2025 T 17860']
+
+
+def test_truncated_multiline_row_is_dropped():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / 'arretes.csv'
+        writer = CsvAppendWriter(path)
+        writer.open()
+        # Champ entre guillemets sur deux lignes : le saut de ligne ne termine pas l'enregistrement
+        writer.write_rows([{**ROW, 'titre': 'Arrêté n° 2025 T 17858\nrue de Rivoli, Paris 1er'}])
+        writer.close()
+        complete_size = path.stat().st_size
+
+        # Interrompu juste après un saut de ligne à l'intérieur d'un champ
+        with open(path, 'ab') as f:
+            f.write('2025 T 17859,"Arrêté n° 2025 T 17859\n'.encode('utf-8'))
+        writer = CsvAppendWriter(path)
+        writer.open()
+        writer.close()
+        assert path.stat().st_size == complete_size
+
+        # Enregistrement terminé par un saut de ligne mais sans toutes les colonnes
+        with open(path, 'ab') as f:
+            f.write('2025 T 17860,Arrêté n° 2025 T 17860\n'.encode('utf-8'))
+        writer = CsvAppendWriter(path)
+        writer.open()
+        writer.write_rows([{**ROW, 'numero_arrete': '2025 T 17861'}])
+        writer.close()
+
+        rows = _read(path)
+        assert [row['numero_arrete'] for row in rows] == ['2025 T 17858', '2025 T 17861']
+        assert rows[0]['titre'] == 'Arrêté n° 2025 T 17858\nrue de Rivoli, Paris 1er'
+
+
+def test_intact_file_is_checked_from_its_end():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / 'arretes.csv'
+        writer = CsvAppendWriter(path)
+        writer.open()
+        # Plusieurs blocs de lecture, avec des champs sur plusieurs lignes
+        writer.write_rows([{**ROW, 'numero_arrete': f'2025 T {number}',
+                            'titre': f'Arrêté n° 2025 T {number}\nrue de Rivoli, "Paris 1er"'}
+                           for number in range(2000)])
+        writer.close()
+        complete_size = path.stat().st_size
+        assert complete_size > 2 * READ_CHUNK_SIZE
+
+        full_scans = []
+        last_record_ends = CsvAppendWriter._last_record_ends
+        CsvAppendWriter._last_record_ends = staticmethod(
+            lambda f, size: full_scans.append(size) or last_record_ends(f, size))
+        try:
+            writer = CsvAppendWriter(path)
+            writer.open()
+            writer.close()
+            assert full_scans == []
+            assert path.stat().st_size == complete_size
+
+            # Interrompu après un saut de ligne à l'intérieur d'un champ : relecture complète
+            with open(path, 'ab') as f:
+                f.write('2025 T 17859,"Arrêté n° 2025 T 17859\n'.encode('utf-8'))
+            writer = CsvAppendWriter(path)
+            writer.open()
+            writer.close()
+            assert len(full_scans) == 1
+            assert path.stat().st_size == complete_size
+        finally:
+            CsvAppendWriter._last_record_ends = staticmethod(last_record_ends)
+
+        assert len(_read(path)) == 2000
+
+
+def test_truncated_header_is_rewritten():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / 'arretes.csv'
+        path.write_bytes(b'numero_arrete,tit')
+
+        writer = CsvAppendWriter(path)
+        writer.open()
+        writer.write_rows([ROW])
+        writer.close()
+
+        rows = _read(path)
+        assert list(rows[0].keys()) == CSV_COLUMNS
+        assert rows[0]['numero_arrete'] == ROW['numero_arrete']
+
+
+if __name__ == '__main__':
+    for test in (test_writes_header_then_appends, test_truncated_last_row_is_dropped,
+                 test_truncated_multiline_row_is_dropped, test_intact_file_is_checked_from_its_end,
+                 test_truncated_header_is_rewritten):
+        test()
+        print(f"✅ {test.__name__}")
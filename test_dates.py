@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Test des dates ISO : conversion, migration du CSV et index par date."""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+
+import pyarrow as pa
+
+os.environ.setdefault('DRY_RUN', 'true')
+
+# Ajouter src au path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from arrete_index import ArreteIndex
+from config import CSV_FILE
+from dates import BOVP_DATE_FORMAT, DATE_COLUMNS, migrate_table, parse_date, to_iso_date
+from csv_io import read_csv_as_strings, write_csv_atomic
+
+
+def test_parse_date():
+    assert parse_date('24/10/2025') == date(2025, 10, 24)
+    assert parse_date('2025-10-24') == date(2025, 10, 24)
+    assert parse_date(' 24/10/2025 ') == date(2025, 10, 24)
+    assert parse_date(date(2025, 10, 24)) == date(2025, 10, 24)
+    # Seul le format JJ/MM/AAAA complet est accepté (comme strptime('%d/%m/%Y') avec des zéros)
+    for value in ('', None, '31/02/2025', 'n/a', '1/2/2025', '24/10/25', '24/ 10/2025', '+4/10/2025', '24/10/2025/1'):
+        assert parse_date(value) is None
+    assert to_iso_date('02/09/2025') == '2025-09-02'
+    assert to_iso_date('2025-09-02') == '2025-09-02'
+    assert to_iso_date('') == ''
+
+
+def test_migrate_csv():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = Path(tmp_dir) / 'arretes.csv'
+        # CSV antérieur à la migration, avec les dates au format BOVP
+        legacy = read_csv_as_strings(CSV_FILE)
+        for name in DATE_COLUMNS:
+            values = [parsed.strftime(BOVP_DATE_FORMAT) if (parsed := parse_date(value)) else value
+                      for value in legacy.column(name).to_pylist()]
+            legacy = legacy.set_column(legacy.schema.get_field_index(name), name, pa.array(values, pa.string()))
+        write_csv_atomic(legacy, csv_path)
+
+        original = read_csv_as_strings(csv_path)
+        table, converted = migrate_table(original)
+        assert converted > 0
+        assert table.column_names == original.column_names
+        assert table.column('date_publication').to_pylist() == [
+            to_iso_date(value) or value for value in original.column('date_publication').to_pylist()
+        ]
+        write_csv_atomic(table, csv_path)
+
+        # Migration idempotente
+        assert migrate_table(read_csv_as_strings(csv_path))[1] == 0
+
+
+def test_find_by_date():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = ArreteIndex(Path(tmp_dir) / 'index.sqlite', csv_path=None)
+        index.open()
+        # Formats mélangés (CSV pas encore migré) : l'index stocke toujours l'ISO
+        index.upsert_many([
+            {'numero_arrete': '2025 T 1', 'date_publication': '20/10/2025', 'date_signature': '2025-10-14'},
+            {'numero_arrete': '2025 T 2', 'date_publication': '2025-10-24', 'date_signature': '17/10/2025'},
+            {'numero_arrete': '2025 T 3', 'date_publication': '02/09/2025', 'date_signature': ''},
+            {'numero_arrete': '2025 T 4', 'date_publication': '', 'date_signature': ''},
+        ])
+
+        assert index.find_by_date('date_publication') == [
+            ('2025 T 3', '2025-09-02'), ('2025 T 1', '2025-10-20'), ('2025 T 2', '2025-10-24'),
+        ]
+        assert index.find_by_date('date_publication', start=date(2025, 10, 20)) == [
+            ('2025 T 1', '2025-10-20'), ('2025 T 2', '2025-10-24'),
+        ]
+        assert index.find_by_date('date_publication', end=date(2025, 10, 20)) == [
+            ('2025 T 3', '2025-09-02'), ('2025 T 1', '2025-10-20'),
+        ]
+        assert index.find_by_date('date_signature', date(2025, 10, 15), date(2025, 10, 31)) == [
+            ('2025 T 2', '2025-10-17'),
+        ]
+        try:
+            index.find_by_date('date_scrape')
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("colonne non indexée acceptée")
+
+        plan = ' '.join(row[-1] for row in index.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT numero_arrete FROM arretes WHERE date_publication >= '2025-10-01'"
+        ))
+        assert 'idx_arretes_date_publication' in plan
+        index.close()
+
+
+def test_index_migration():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = Path(tmp_dir) / 'arretes.csv'
+        shutil.copy(CSV_FILE, csv_path)
+        db_path = Path(tmp_dir) / 'index.sqlite'
+
+        index = ArreteIndex(db_path, csv_path)
+        index.open()
+        index.sync_with_csv()
+        count = len(index)
+        expected = index.find_by_date('date_publication', start=date(2025, 10, 1))
+        assert expected
+        index.close()
+
+        # Index créé avant les colonnes de date : elles sont ajoutées et remplies au prochain sync
+        conn = sqlite3.connect(str(db_path))
+        conn.execute("DROP INDEX idx_arretes_date_publication")
+        conn.execute("DROP INDEX idx_arretes_date_signature")
+        conn.execute("ALTER TABLE arretes DROP COLUMN date_publication")
+        conn.execute("ALTER TABLE arretes DROP COLUMN date_signature")
+        conn.commit()
+        conn.close()
+
+        index = ArreteIndex(db_path, csv_path)
+        index.open()
+        index.sync_with_csv()
+        assert len(index) == count
+        assert index.find_by_date('date_publication', start=date(2025, 10, 1)) == expected
+        index.close()
+
+
+if __name__ == '__main__':
+    for test in (test_parse_date, test_migrate_csv, test_find_by_date, test_index_migration):
+        test()
+        print(f"✅ {test.__name__}")
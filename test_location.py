@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Test de l'extraction de la localisation (arrondissements, voies) et de son index."""
+import csv
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault('DRY_RUN', 'true')
+
+# Ajouter src au path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from arrete_index import ArreteIndex
+from config import CSV_COLUMNS, CSV_FILE
+from location import add_location_columns, extract_location, normalize_voie
+import pyarrow as pa
+
+from csv_io import read_csv_as_strings, rewrite_csv, write_csv_atomic
+
+
+def test_extract_location():
+    cases = {
+        "Arrêté n° 2025 T 17785 modifiant, à titre provisoire, les règles de stationnement, rue Lourmel, à Paris 15e.":
+            {'arrondissement': '15', 'voies': 'rue Lourmel'},
+        "Arrêté n° 2025 T 15129 modifiant, à titre provisoire, les règles de circulation rues de la Gaité "
+        "et Vandamme, à Paris 14e.":
+            {'arrondissement': '14', 'voies': 'rue de la Gaité;rue Vandamme'},
+        "Arrêté n° 2025 C 15557 modifiant, à titre provisoire, la règle du stationnement avenue Victoria "
+        "et rue de l’Hôtel de Ville, à Paris, 1er et 4e.":
+            {'arrondissement': '1;4', 'voies': 'avenue Victoria;rue de l’Hôtel de Ville'},
+        "Arrêté n° 2025 P 14810 instituant une zone de rencontre rue Caffarelli et rue Picardie, "
+        "quartier \"Carreau du Temple\", à Paris Centre.":
+            {'arrondissement': '1;2;3;4', 'voies': 'rue Caffarelli;rue Picardie'},
+        "Arrêté n° 2025 T 16239 modifiant, à titre provisoire les règles de la circulation et de "
+        "stationnement rue du Ranelagh, 16e.":
+            {'arrondissement': '16', 'voies': 'rue du Ranelagh'},
+        "Arrêté n° 2025 T 16002 modifiant, à titre provisoire, les règles de stationnement dans "
+        "plusieurs voies du 11e arrondissement.":
+            {'arrondissement': '11', 'voies': ''},
+        "Arrêté n° 2025 G 00010 instituant la gratuité du stationnement résidentiel à Paris le 14 août 2025":
+            {'arrondissement': '', 'voies': ''},
+    }
+    for titre, expected in cases.items():
+        assert extract_location(titre) == expected, (titre, extract_location(titre))
+
+
+def test_normalize_voie():
+    assert normalize_voie("Rue de Lourmel") == normalize_voie("rue Lourmel") == 'rue lourmel'
+    assert normalize_voie("rue d’Enghien") == normalize_voie("rue d'Enghien") == 'rue enghien'
+    assert normalize_voie("Bd St-Germain") == 'boulevard saint germain'
+    assert normalize_voie("place de la République") == 'place republique'
+    assert normalize_voie("rue Le Verrier") == 'rue le verrier'
+
+
+def test_csv_coverage():
+    with open(CSV_FILE, newline='', encoding='utf-8') as f:
+        titles = [row['titre'] for row in csv.DictReader(f)]
+    located = sum(1 for titre in titles if extract_location(titre)['arrondissement'])
+    assert located >= 0.98 * len(titles), f"{located}/{len(titles)} titres localisés"
+
+
+def test_index_and_backfill():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = Path(tmp_dir) / 'arretes.csv'
+        # CSV antérieur au backfill, sans colonnes de localisation : l'index les déduit du titre
+        legacy = read_csv_as_strings(CSV_FILE)
+        write_csv_atomic(legacy.drop_columns([name for name in ('arrondissement', 'voies')
+                                              if name in legacy.column_names]), csv_path)
+
+        index = ArreteIndex(Path(tmp_dir) / 'index.sqlite', csv_path)
+        index.open()
+        index.sync_with_csv()
+        before = index.find_by_location(15)
+        assert '2025 T 17785' in before
+        assert '2025 T 17785' in index.find_by_location(15, 'Rue de Lourmel')
+        assert '2025 T 17914' in index.find_by_location(voie='rue de Pommard')
+        assert index.find_by_location(15, 'rue de Pommard') == []
+        index.close()
+
+        table, changed = add_location_columns(read_csv_as_strings(csv_path), CSV_COLUMNS)
+        assert changed > 0
+        assert table.column_names == [name for name in CSV_COLUMNS if name in table.column_names]
+        write_csv_atomic(table, csv_path)
+        assert add_location_columns(read_csv_as_strings(csv_path), CSV_COLUMNS)[1] == 0
+
+        # Colonnes ajoutées en fin de ligne : les colonnes d'origine gardent leur position
+        assert table.column_names[-2:] == ['arrondissement', 'voies']
+        assert table.column_names[:-2] == legacy.drop_columns(['arrondissement', 'voies']).column_names
+        # Un CSV qui les avait au milieu de la ligne les retrouve à la fin
+        middle = table.select([name for name in table.column_names if name not in ('arrondissement', 'voies')][:10]
+                              + ['arrondissement', 'voies']
+                              + [name for name in table.column_names if name not in ('arrondissement', 'voies')][10:])
+        assert add_location_columns(middle, CSV_COLUMNS)[0].column_names == table.column_names
+
+        index = ArreteIndex(Path(tmp_dir) / 'index_backfill.sqlite', csv_path)
+        index.open()
+        index.sync_with_csv()
+        assert index.find_by_location(15) == before
+        index.close()
+
+
+def test_rewrite_refreshes_location_index():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = Path(tmp_dir) / 'arretes.csv'
+        db_path = Path(tmp_dir) / 'index.sqlite'
+        table = read_csv_as_strings(CSV_FILE).slice(0, 200)
+        write_csv_atomic(table, csv_path)
+        index = ArreteIndex(db_path, csv_path)
+        index.open()
+        index.sync_with_csv()
+        numero = table.column('numero_arrete')[0].as_py()
+        assert numero not in index.find_by_location(20, 'rue Nouvelle')
+        index.close()
+
+        # Backfill relancé avec un extracteur amélioré : colonnes déjà présentes, valeurs changées
+        position = table.column_names.index('arrondissement')
+        table = table.set_column(position, 'arrondissement',
+                                 pa.array(['20'] + table.column('arrondissement').to_pylist()[1:]))
+        position = table.column_names.index('voies')
+        table = table.set_column(position, 'voies', pa.array(['rue Nouvelle'] + table.column('voies').to_pylist()[1:]))
+        rewrite_csv(table, csv_path, db_path=db_path, parquet_dir=Path(tmp_dir) / 'parquet')
+
+        index = ArreteIndex(db_path, csv_path)
+        index.open()
+        index.sync_with_csv()
+        assert index.find_by_location(20, 'rue Nouvelle') == [numero]
+        assert len(index) == 200
+        index.close()
+
+
+if __name__ == '__main__':
+    for test in (test_extract_location, test_normalize_voie, test_csv_coverage, test_index_and_backfill,
+                 test_rewrite_refreshes_location_index):
+        test()
+        print(f"✅ {test.__name__}")
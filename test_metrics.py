@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Test des métriques par étape : histogrammes, export Prometheus et résumé JSON du run."""
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault('DRY_RUN', 'true')
+
+# Ajouter src au path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from metrics import Histogram, Metrics
+from s3_uploader import S3Uploader
+from transfer_stats import TransferStats
+
+
+def test_histogram():
+    histogram = Histogram(buckets=(0.1, 1.0, 10.0))
+    for value in (0.05, 0.5, 0.5, 0.5, 5.0, 50.0):
+        histogram.observe(value)
+    assert histogram.bucket_counts == [1, 3, 1, 1]
+    assert histogram.count == 6
+    assert abs(histogram.sum - 56.55) < 1e-9
+    assert histogram.max == 50.0
+    assert 0.1 < histogram.quantile(0.5) <= 1.0
+    # Au-delà de la dernière borne, le quantile est borné par le maximum observé
+    assert histogram.quantile(1.0) == 50.0
+    assert Histogram().quantile(0.5) is None
+
+    with histogram.time():
+        time.sleep(0.01)
+    assert histogram.count == 7
+
+
+def test_prometheus_format():
+    metrics = Metrics()
+    for value in (0.02, 0.3, 4.0):
+        metrics.stage('listing_load').observe(value)
+    metrics.stage('listing_parse').observe(0.004)
+    metrics.count('listing_pages_total', help_text="Pages de résultats parcourues")
+    metrics.count('listing_pages_total', 2)
+    metrics.count('transfer_bytes_total', 2048, "Octets transférés", transfer='pdf_download')
+    metrics.gauge('concurrency_limit', "Concurrence").set(4)
+    text = metrics.to_prometheus()
+
+    assert '# TYPE bovp_scraper_stage_seconds histogram' in text
+    assert '# TYPE bovp_scraper_listing_pages_total counter' in text
+    assert 'bovp_scraper_listing_pages_total 3\n' in text
+    assert 'bovp_scraper_transfer_bytes_total{transfer="pdf_download"} 2048\n' in text
+    assert 'bovp_scraper_concurrency_limit 4\n' in text
+    assert 'bovp_scraper_stage_seconds_count{stage="listing_load"} 3\n' in text
+    assert 'bovp_scraper_stage_seconds_bucket{stage="listing_load",le="+Inf"} 3\n' in text
+
+    # Intervalles cumulés et croissants
+    buckets = [int(line.rsplit(' ', 1)[1]) for line in text.splitlines()
+               if line.startswith('bovp_scraper_stage_seconds_bucket{stage="listing_load"')]
+    assert buckets == sorted(buckets) and buckets[-1] == 3
+
+    # Chaque famille n'a qu'un seul type
+    try:
+        metrics.gauge('listing_pages_total')
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("type de métrique incohérent accepté")
+
+
+def test_write_files():
+    metrics = Metrics()
+    metrics.stage('save_csv').observe(0.01)
+    metrics.count('arretes_saved_total', 50, "Arrêtés ajoutés au CSV")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        textfile = Path(tmp_dir) / 'metrics' / 'scraper.prom'
+        summary_file = Path(tmp_dir) / 'metrics' / 'run_summary.json'
+        metrics.write(textfile, summary_file, status='complete', arretes_saved=50)
+
+        assert 'bovp_scraper_run_duration_seconds' in textfile.read_text(encoding='utf-8')
+        summary = json.loads(summary_file.read_text(encoding='utf-8'))
+        assert summary['status'] == 'complete'
+        assert summary['arretes_saved'] == 50
+        assert summary['metrics']['arretes_saved_total'] == 50
+        assert summary['metrics']['stage_seconds{stage="save_csv"}']['count'] == 1
+        assert sorted(path.name for path in textfile.parent.iterdir()) == ['run_summary.json', 'scraper.prom']
+
+
+def test_component_metrics():
+    stats = TransferStats('Téléchargements')
+    stats.record(time.monotonic() - 0.2, 1024 * 1024)
+    stats.record(time.monotonic(), 0, success=False)
+    assert stats.latency.count == 1 and stats.latency.max >= 0.2
+    assert stats.bytes_per_second() > 0
+    assert TransferStats('vide').bytes_per_second() == 0.0
+
+    metrics = Metrics()
+    metrics.register('stage_seconds', stats.latency, stage='pdf_download')
+    assert 'bovp_scraper_stage_seconds_count{stage="pdf_download"} 1' in metrics.to_prometheus()
+
+    uploader = S3Uploader(dry_run=True)
+    try:
+        uploader._count_retries(parsed={'ResponseMetadata': {'RetryAttempts': 2}})
+        uploader._count_retries(parsed={'ResponseMetadata': {'RetryAttempts': 0}})
+        uploader._count_retries(parsed=None)
+        assert uploader.retries == 2
+    finally:
+        uploader.close()
+
+
+if __name__ == '__main__':
+    for test in (test_histogram, test_prometheus_format, test_write_files, test_component_metrics):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Test du dataset Parquet partitionné par année et des requêtes filtrées (dates, arrondissement)."""
+import csv
+import os
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+
+os.environ.setdefault('DRY_RUN', 'true')
+
+# Ajouter src au path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from arretes_query import query_arretes
+from config import CSV_COLUMNS
+from parquet_store import ParquetStore
+
+
+def make_row(numero: str, date_publication: str, titre: str, arrondissement: str) -> dict:
+    """Ligne du CSV (valeurs en chaînes, comme relues par csv.DictReader)."""
+    return {
+        'numero_arrete': numero, 'titre': titre, 'autorite_responsable': 'Préfecture de police',
+        'signataire': '', 'date_publication': date_publication, 'date_signature': '',
+        'poids_pdf_ko': '103', 'concerne_circulation': 'True', 'concerne_stationnement': 'False',
+        'est_temporaire': 'True', 'arrondissement': arrondissement, 'voies': '',
+        'explnum_id': numero.split(' ')[-1], 'pdf_s3_url': '', 'date_scrape': '2026-01-05T06:00:00',
+    }
+
+
+FIRST_BATCH = [
+    make_row('2025 T 101', '2025-12-30', "Arrêté n° 2025 T 101 rue Lourmel, à Paris 15e", '15'),
+    make_row('2025 T 102', '2025-12-31', "Arrêté n° 2025 T 102 rue de Rivoli, à Paris Centre", '1;2;3;4'),
+]
+SECOND_BATCH = [
+    make_row('2026 T 1', '2026-01-02', "Arrêté n° 2026 T 1 rue Lecourbe, à Paris 15e", '15'),
+    make_row('2026 T 2', '2026-01-03', "Arrêté n° 2026 T 2 avenue de Saint-Ouen, à Paris 17e et 18e", '17;18'),
+    make_row('2026 T 3', '2026-01-04', "Arrêté n° 2026 T 3 rue du Faubourg Saint-Antoine, à Paris 11e et 12e",
+             '11;12'),
+]
+
+
+def numeros(table) -> list:
+    return sorted(table.column('numero_arrete').to_pylist())
+
+
+def test_append_partitions_by_year():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = ParquetStore(Path(tmp_dir) / 'parquet')
+        store.append(FIRST_BATCH)
+        store.append(SECOND_BATCH)
+        # Un lot à cheval sur deux années : un fichier par année concernée
+        store.append([make_row('2025 T 103', '2025-12-31', "Arrêté n° 2025 T 103", '20'),
+                      make_row('2026 T 4', '2026-01-05', "Arrêté n° 2026 T 4", '20')])
+
+        partitions = sorted(p.name for p in store.root.iterdir() if p.is_dir())
+        assert partitions == ['year=2025', 'year=2026']
+        assert len(list((store.root / 'year=2025').glob('*.parquet'))) == 2
+        assert len(list((store.root / 'year=2026').glob('*.parquet'))) == 2
+
+        store.compact()
+        for partition in partitions:
+            assert len(list((store.root / partition).glob('*.parquet'))) == 1
+
+        table = query_arretes(root=store.root)
+        assert table.num_rows == 7
+        assert numeros(query_arretes(['numero_arrete'], root=store.root, year=2025)) == [
+            '2025 T 101', '2025 T 102', '2025 T 103']
+        # Colonnes typées
+        row = query_arretes(root=store.root, year=2026, published_to=date(2026, 1, 2)).to_pylist()[0]
+        assert row['date_publication'] == date(2026, 1, 2)
+        assert row['poids_pdf_ko'] == 103 and row['explnum_id'] == 1
+        assert row['concerne_circulation'] is True and row['concerne_stationnement'] is False
+
+
+def test_query_by_date_range_and_arrondissement():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = ParquetStore(Path(tmp_dir) / 'parquet')
+        store.append(FIRST_BATCH)
+        store.append(SECOND_BATCH)
+
+        # Plage de dates à cheval sur les deux partitions, bornes incluses
+        table = query_arretes(['numero_arrete'], root=store.root,
+                              published_from=date(2025, 12, 31), published_to=date(2026, 1, 3))
+        assert numeros(table) == ['2025 T 102', '2026 T 1', '2026 T 2']
+
+        assert numeros(query_arretes(['numero_arrete'], root=store.root, arrondissement=15)) == [
+            '2025 T 101', '2026 T 1']
+        # Valeurs multiples : "1" ne correspond ni à "11" ni à "15", mais à Paris Centre
+        assert numeros(query_arretes(['numero_arrete'], root=store.root, arrondissement=1)) == ['2025 T 102']
+        assert numeros(query_arretes(['numero_arrete'], root=store.root, arrondissement=12)) == ['2026 T 3']
+        assert numeros(query_arretes(['numero_arrete'], root=store.root, arrondissement=15,
+                                     published_from=date(2026, 1, 1))) == ['2026 T 1']
+        assert query_arretes(['numero_arrete'], root=store.root, arrondissement=5).num_rows == 0
+
+
+def test_sync_with_csv():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = Path(tmp_dir) / 'arretes.csv'
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+            writer.writeheader()
+            writer.writerows(FIRST_BATCH)
+
+        store = ParquetStore(Path(tmp_dir) / 'parquet')
+        store.sync_with_csv(csv_path)
+        assert query_arretes(root=store.root).num_rows == 2
+
+        # Lignes ajoutées au CSV par un autre run : seules les nouvelles sont exportées
+        with open(csv_path, 'a', newline='', encoding='utf-8') as f:
+            csv.DictWriter(f, fieldnames=CSV_COLUMNS).writerows(SECOND_BATCH)
+        store.sync_with_csv(csv_path)
+        assert numeros(query_arretes(['numero_arrete'], root=store.root)) == sorted(
+            row['numero_arrete'] for row in FIRST_BATCH + SECOND_BATCH)
+
+
+if __name__ == '__main__':
+    for test in (test_append_partitions_by_year, test_query_by_date_range_and_arrondissement, test_sync_with_csv):
+        test()
+        print(f"✅ {test.__name__}")
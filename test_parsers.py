@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Test d'équivalence des moteurs de parsing (BeautifulSoup vs lxml) sur les pages enregistrées."""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault('DRY_RUN', 'true')
+
+# Ajouter src au path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from arrete_index import ArreteIndex
+from parsers import Bs4ResultParser, LxmlResultParser
+from scraper import ArretesScraper
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+FIXTURES = sorted(FIXTURES_DIR.glob('debug_page_*.html'))
+
+
+def _parse_page(parser, content: str):
+    """Parse une page avec le moteur donné, comme le ferait _scrape_page."""
+    scraper = ArretesScraper.__new__(ArretesScraper)
+    scraper.parser = parser
+    scraper.existing_arretes = set()
+    scraper.index = ArreteIndex(':memory:', csv_path=None)
+    scraper.index.open()
+
+    results = []
+    for heading in parser.find_arrete_headings(content):
+        metadata = asyncio.run(scraper._parse_arrete_from_h3(heading))
+        if metadata:
+            # L'horodatage du scraping diffère forcément entre deux appels
+            metadata.pop('date_scrape')
+        results.append((parser.heading_title(heading), parser.extract_fields(heading), metadata))
+    return results
+
+
+def test_fixtures_exist():
+    assert FIXTURES, f"Aucune page enregistrée dans {FIXTURES_DIR}"
+
+
+def test_lxml_matches_bs4():
+    for fixture in FIXTURES:
+        content = fixture.read_text(encoding='utf-8')
+        bs4_results = _parse_page(Bs4ResultParser(), content)
+        lxml_results = _parse_page(LxmlResultParser(), content)
+
+        assert len(bs4_results) == len(lxml_results), fixture.name
+        assert any(metadata for _, _, metadata in bs4_results), fixture.name
+        for bs4_result, lxml_result in zip(bs4_results, lxml_results):
+            assert bs4_result == lxml_result, f"{fixture.name}: {bs4_result[0][:60]}"
+
+
+def test_total_results_matches_bs4():
+    for fixture in FIXTURES:
+        content = fixture.read_text(encoding='utf-8')
+        assert Bs4ResultParser().total_results(content) == LxmlResultParser().total_results(content) > 0
+
+
+if __name__ == '__main__':
+    for test in (test_fixtures_exist, test_lxml_matches_bs4, test_total_results_matches_bs4):
+        test()
+        print(f"✅ {test.__name__}")
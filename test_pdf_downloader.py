@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Test du téléchargement des PDFs en streaming contre un serveur aiohttp local (doc_num_data.php simulé)."""
+import asyncio
+import hashlib
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault('DRY_RUN', 'true')
+
+# Ajouter src au path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from aiohttp import web
+
+import pdf_downloader
+from config import PDF_CHUNK_SIZE, PDF_SPOOL_THRESHOLD
+from pdf_downloader import PdfDownloader
+from rate_limiter import AdaptiveLimiter
+
+# PDFs servis par le serveur local, par explnum_id : un petit (gardé en mémoire), un gros (sur disque)
+SMALL_PDF = b"%PDF-1.4\n" + b"petit arrete " * 100
+LARGE_PDF = b"%PDF-1.4\n" + bytes(range(256)) * (PDF_SPOOL_THRESHOLD // 256 + 100)
+PDFS = {'1': SMALL_PDF, '2': LARGE_PDF}
+# Cookie de session reçu par le serveur, une entrée par requête
+COOKIES = web.AppKey('cookies', list)
+
+
+async def doc_num_data(request: web.Request) -> web.StreamResponse:
+    """doc_num_data.php : envoie le PDF en plusieurs blocs (Transfer-Encoding: chunked)."""
+    request.app[COOKIES].append(request.cookies.get('PhpMyBibli-SESSID'))
+    explnum_id = request.query['explnum_id']
+    if explnum_id == '503':
+        return web.Response(status=503, text="Service Unavailable")
+    if explnum_id == 'html':
+        return web.Response(text="<html>Session expirée</html>", content_type='text/html')
+    if explnum_id not in PDFS:
+        return web.Response(status=404)
+
+    response = web.StreamResponse(headers={'Content-Type': 'application/pdf'})
+    await response.prepare(request)
+    content = PDFS[explnum_id]
+    for start in range(0, len(content), PDF_CHUNK_SIZE // 2):
+        await response.write(content[start:start + PDF_CHUNK_SIZE // 2])
+    await response.write_eof()
+    return response
+
+
+def run_with_server(test):
+    """Démarre le serveur local et dirige le téléchargeur vers lui (BASE_URL) le temps du test."""
+    async def main():
+        app = web.Application()
+        app[COOKIES] = []
+        app.router.add_get('/doc_num_data.php', doc_num_data)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = runner.addresses[0][1]
+
+        previous = pdf_downloader.BASE_URL
+        # Nom d'hôte plutôt qu'IP : le cookie jar aiohttp refuse les cookies des adresses IP
+        pdf_downloader.BASE_URL = f'http://localhost:{port}'
+        limiter = AdaptiveLimiter(initial=4, minimum=1, maximum=4, max_rps=0)
+        downloader = PdfDownloader(limiter, user_agent='test')
+        try:
+            await test(downloader, app)
+        finally:
+            await downloader.close()
+            pdf_downloader.BASE_URL = previous
+            await runner.cleanup()
+
+    asyncio.run(main())
+
+
+def test_stream_and_hash():
+    async def test(downloader, app):
+        await downloader.start(cookies=[{'name': 'PhpMyBibli-SESSID', 'value': 'abc123', 'domain': 'localhost',
+                                         'path': '/'}])
+        assert downloader.session is None
+
+        small, large = await asyncio.gather(downloader.download('1'), downloader.download('2'))
+        try:
+            for pdf, content in ((small, SMALL_PDF), (large, LARGE_PDF)):
+                assert pdf.size == len(content)
+                assert pdf.md5 == hashlib.md5(content).hexdigest()
+                assert pdf.sha256 == hashlib.sha256(content).hexdigest()
+                assert pdf.fileobj.read() == content
+            # Mémoire bornée : au-delà du seuil, le fichier temporaire est passé sur disque
+            assert not small.fileobj._rolled
+            assert large.fileobj._rolled
+        finally:
+            small.close()
+            large.close()
+
+        # Session ouverte au premier téléchargement, avec les cookies du navigateur
+        assert app[COOKIES] == ['abc123', 'abc123']
+        assert downloader.stats.count == 2
+        assert downloader.stats.bytes == len(SMALL_PDF) + len(LARGE_PDF)
+
+    run_with_server(test)
+
+
+def test_failures():
+    async def test(downloader, app):
+        assert await downloader.download('404') is None
+        assert downloader.limiter.congestions == 0
+        # Surcharge du site : la concurrence adaptative est réduite
+        assert await downloader.download('503') is None
+        assert downloader.limiter.congestions == 1
+        # Page HTML au lieu du PDF (session expirée)
+        assert await downloader.download('html') is None
+        assert downloader.stats.failures == 3 and downloader.stats.bytes == 0
+
+    run_with_server(test)
+
+
+if __name__ == '__main__':
+    for test in (test_stream_and_hash, test_failures):
+        test()
+        print(f"✅ {test.__name__}")
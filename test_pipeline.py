@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""Test hors ligne du pipeline du scraper (pages enregistrées, téléchargement et upload simulés)."""
+import asyncio
+import csv
+import hashlib
+import io
+import os
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+
+os.environ.setdefault('DRY_RUN', 'true')
+
+# Ajouter src au path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+import scraper as scraper_module
+from arrete_index import ArreteIndex
+from crawl_state import CrawlCheckpoint, CrawlState
+from csv_writer import CsvAppendWriter
+from metrics import Metrics
+from parsers import LxmlResultParser
+from pdf_downloader import DownloadedPdf
+from rate_limiter import AdaptiveLimiter
+from scraper import ArretesScraper
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+# Pages enregistrées parcourues par le test (la page 1 écrirait son HTML de debug dans data/)
+PAGES = (2, 3)
+
+
+class FakeResponse:
+    status = 200
+
+
+class FakeContext:
+    """Contexte Playwright minimal : ouvre les pages supplémentaires du pool."""
+
+    def __init__(self, contents):
+        self.contents = contents
+        self.pages = []
+
+    async def new_page(self):
+        page = FakePage(self.contents, self)
+        self.pages.append(page)
+        return page
+
+
+class FakePage:
+    """Page Playwright minimale : sert les pages de résultats enregistrées selon l'URL demandée."""
+
+    def __init__(self, contents, context=None):
+        self.contents = contents
+        self.context = context or FakeContext(contents)
+        self.url = None
+        self.closed = False
+
+    def on(self, event, handler):
+        pass
+
+    async def goto(self, url, **kwargs):
+        self.url = url
+        # Laisser les autres pages du pool charger en même temps
+        await asyncio.sleep(0.001)
+        return FakeResponse()
+
+    async def content(self):
+        return self.contents[self.url]
+
+    async def close(self):
+        self.closed = True
+
+
+class StubDownloader:
+    """Téléchargements simulés, terminés dans le désordre ; ceux de `blocked` ne se terminent jamais."""
+
+    def __init__(self, blocked=()):
+        self.blocked = set(blocked)
+        self.pdfs = []
+        self.cancelled = 0
+
+    async def download(self, explnum_id):
+        try:
+            if explnum_id in self.blocked:
+                await asyncio.Event().wait()
+            await asyncio.sleep(int(explnum_id) % 7 / 1000)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        content = f"%PDF-1.4 {explnum_id}".encode()
+        pdf = DownloadedPdf(io.BytesIO(content), len(content), hashlib.md5(content).hexdigest(),
+                            hashlib.sha256(content).hexdigest())
+        self.pdfs.append(pdf)
+        return pdf
+
+
+class StubUploader:
+    """Uploads simulés, eux aussi terminés dans le désordre."""
+
+    async def upload_pdf_stream_async(self, fileobj, numero_arrete, content_md5, size, content_sha256=''):
+        await asyncio.sleep(int(content_md5, 16) % 5 / 1000)
+        return f"https://bucket.s3.amazonaws.com/arretes/{numero_arrete.replace(' ', '_')}.pdf"
+
+
+class FailingCsvWriter(CsvAppendWriter):
+    """Le deuxième lot écrit échoue (disque plein...)."""
+
+    def write_rows(self, rows):
+        if self.rows_written:
+            raise OSError("No space left on device")
+        super().write_rows(rows)
+
+
+def listing_order(parser, contents):
+    """Numéros et explnum_id des arrêtés des pages, dans l'ordre du listing (doublons exclus)."""
+    numeros, explnum_ids = {}, {}
+    for page_num in PAGES:
+        ids = []
+        for heading in parser.find_arrete_headings(contents[page_num]):
+            numero = ArretesScraper._extract_numero_arrete(None, parser.heading_title(heading))
+            explnum_id = parser.find_explnum_id(heading)
+            if numero and explnum_id and numero not in numeros:
+                numeros[numero] = page_num
+                ids.append(explnum_id)
+        explnum_ids[page_num] = ids
+    return list(numeros), explnum_ids
+
+
+def make_scraper(tmp_dir: str, downloader, csv_writer_class=CsvAppendWriter) -> ArretesScraper:
+    """Scraper sans navigateur, S3 ni site BOVP, écrivant dans un CSV temporaire."""
+    scraper = ArretesScraper.__new__(ArretesScraper)
+    scraper.metrics = Metrics()
+    scraper.profiler = None
+    scraper.parser = LxmlResultParser()
+    scraper.limiter = AdaptiveLimiter(initial=4, minimum=1, maximum=4, max_rps=0)
+    scraper.existing_arretes = set()
+    scraper.new_arretes = []
+    scraper.index = ArreteIndex(':memory:', csv_path=None)
+    scraper.index.open()
+    scraper.search_index = None
+    scraper.parquet_store = None
+    scraper._parquet_pending = False
+    scraper.text_extractor = None
+    scraper.pdf_downloader = downloader
+    scraper.s3_uploader = StubUploader()
+    scraper.csv_writer = csv_writer_class(Path(tmp_dir) / 'arretes.csv')
+    scraper.csv_writer.open()
+    scraper.crawl_state = CrawlState(path=Path(tmp_dir) / 'crawl_state.json', csv_path=None)
+    scraper.crawl_complete = False
+    scraper.site_total_pages = max(PAGES)
+    scraper.checkpoint = CrawlCheckpoint(Path(tmp_dir) / 'checkpoint.json')
+    scraper.pending_arretes = {}
+    scraper.last_listed_page = 0
+    scraper.resume = False
+    return scraper
+
+
+def load_fixtures(scraper):
+    contents = {page_num: (FIXTURES / f'debug_page_{page_num}.html').read_text(encoding='utf-8')
+                for page_num in PAGES}
+    urls = {asyncio.run(scraper._get_search_page_url(page_num)): contents[page_num] for page_num in PAGES}
+    return contents, FakePage(urls)
+
+
+def run_with_short_queues(main, queue_size=2, listing_pool_size=1):
+    """Exécute main() avec des files bornées très courtes dans le pipeline (contre-pression permanente)."""
+    previous = scraper_module.PIPELINE_QUEUE_SIZE, scraper_module.LISTING_POOL_SIZE
+    scraper_module.PIPELINE_QUEUE_SIZE = queue_size
+    scraper_module.LISTING_POOL_SIZE = listing_pool_size
+    try:
+        return asyncio.run(main())
+    finally:
+        scraper_module.PIPELINE_QUEUE_SIZE, scraper_module.LISTING_POOL_SIZE = previous
+
+
+def other_tasks() -> list:
+    """Tâches encore présentes dans la boucle, hors tâche courante."""
+    return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+
+def csv_numeros(csv_path: Path) -> list:
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        return [row['numero_arrete'] for row in csv.DictReader(f)]
+
+
+def test_rows_written_in_listing_order():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        downloader = StubDownloader()
+        scraper = make_scraper(tmp_dir, downloader)
+        contents, page = load_fixtures(scraper)
+        expected, _ = listing_order(scraper.parser, contents)
+
+        saved = run_with_short_queues(lambda: scraper._run_pipeline(page, max(PAGES), min(PAGES)))
+        scraper.csv_writer.close()
+
+        # 12 résultats des pages enregistrées n'ont pas de lien vers leur PDF (ignorés)
+        assert saved == len(expected) == 88
+        assert csv_numeros(scraper.csv_writer.path) == expected
+        assert all(pdf.fileobj.closed for pdf in downloader.pdfs)
+        assert scraper.crawl_complete and not scraper.pending_arretes
+        assert scraper.checkpoint.last_committed_page == max(PAGES)
+        assert len(scraper.index) == len(expected)
+
+
+def test_listing_pool_keeps_listing_order():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        scraper = make_scraper(tmp_dir, StubDownloader())
+        contents, page = load_fixtures(scraper)
+        expected, _ = listing_order(scraper.parser, contents)
+
+        saved = run_with_short_queues(lambda: scraper._run_pipeline(page, max(PAGES), min(PAGES)),
+                                      listing_pool_size=4)
+        scraper.csv_writer.close()
+
+        assert saved == len(expected)
+        assert csv_numeros(scraper.csv_writer.path) == expected
+        # Une page supplémentaire par page restante, fermée en fin de parcours
+        assert len(page.context.pages) == len(PAGES) - 1
+        assert all(extra_page.closed for extra_page in page.context.pages)
+
+
+def test_pipeline_stops_on_writer_error():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        scraper = make_scraper(tmp_dir, StubDownloader(), csv_writer_class=FailingCsvWriter)
+        contents, page = load_fixtures(scraper)
+        expected, explnum_ids = listing_order(scraper.parser, contents)
+        first_page = expected[:len(explnum_ids[2])]
+
+        async def run():
+            try:
+                await asyncio.wait_for(scraper._run_pipeline(page, max(PAGES), min(PAGES)), timeout=30)
+            except OSError:
+                pass
+            else:
+                raise AssertionError("l'erreur du writer n'a pas arrêté le pipeline")
+            # Aucune étape ne reste bloquée sur une file après l'erreur
+            return other_tasks()
+
+        leftover = run_with_short_queues(run)
+        scraper.csv_writer.close()
+
+        assert leftover == []
+        # Seule la première page est dans le CSV ; les arrêtés de la seconde restent dans le checkpoint
+        assert csv_numeros(scraper.csv_writer.path) == first_page
+        assert sorted(scraper.pending_arretes) == sorted(expected[len(first_page):])
+
+
+def test_pipeline_cancellation_drains_stages():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        scraper = make_scraper(tmp_dir, None)
+        contents, page = load_fixtures(scraper)
+        expected, explnum_ids = listing_order(scraper.parser, contents)
+        first_page = expected[:len(explnum_ids[2])]
+        # Les PDFs de la dernière page ne se téléchargent jamais (site bloqué)
+        downloader = StubDownloader(blocked=explnum_ids[3])
+        scraper.pdf_downloader = downloader
+
+        async def run():
+            pipeline = asyncio.create_task(scraper._run_pipeline(page, max(PAGES), min(PAGES)))
+            for _ in range(3000):
+                if scraper.csv_writer.rows_written >= len(first_page):
+                    break
+                await asyncio.sleep(0.01)
+            pipeline.cancel()
+            try:
+                await asyncio.wait_for(pipeline, timeout=30)
+            except asyncio.CancelledError:
+                pass
+            else:
+                raise AssertionError("le pipeline n'a pas été annulé")
+            return other_tasks()
+
+        leftover = run_with_short_queues(run)
+        scraper.csv_writer.close()
+
+        assert leftover == []
+        # Téléchargements en cours annulés, pas de nouvel arrêté après l'annulation
+        assert downloader.cancelled > 0
+        assert csv_numeros(scraper.csv_writer.path) == first_page
+        assert sorted(scraper.pending_arretes) == sorted(expected[len(first_page):])
+
+
+def test_resumed_crawl_stops_at_mark():
+    """Reprise par --resume : arrêtés en attente retraités, parcours repris après la dernière page, arrêt à la marque."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        scraper = make_scraper(tmp_dir, StubDownloader())
+        contents, page = load_fixtures(scraper)
+        expected, explnum_ids = listing_order(scraper.parser, contents)
+        # La page 3 enregistrée commence par 44320 (22/10/2025) puis 44311 (21/10/2025)
+        scraper.crawl_state.max_explnum_id = 44311
+        scraper.crawl_state.latest_date_publication = date(2025, 10, 22)
+
+        # Interruption après la page 2 : son dernier arrêté n'était pas encore sauvegardé
+        first_page = expected[:len(explnum_ids[2])]
+        pending = {'numero_arrete': first_page[-1], 'explnum_id': explnum_ids[2][-1],
+                   'titre': f"Arrêté n° {first_page[-1]}", 'date_publication': '2025-10-23'}
+        checkpoint = CrawlCheckpoint(scraper.checkpoint.path)
+        checkpoint.last_committed_page = 1
+        checkpoint.last_listed_page = 2
+        checkpoint.pending = [(2, pending)]
+        checkpoint.save()
+
+        scraper.resume = True
+        start_page = scraper._resume_from_checkpoint()
+        assert start_page == 3
+        saved = run_with_short_queues(lambda: scraper._run_pipeline(page, max(PAGES), start_page))
+        scraper.csv_writer.close()
+
+        # Page 2 non relue ; page 3 parcourue jusqu'à la marque seulement
+        assert page.url.endswith('page=3&nb_per_page=50')
+        assert saved == 2
+        assert csv_numeros(scraper.csv_writer.path) == [first_page[-1], expected[len(first_page)]]
+        assert scraper.crawl_complete and not scraper.pending_arretes
+
+
+if __name__ == '__main__':
+    for test in (test_rows_written_in_listing_order, test_listing_pool_keeps_listing_order,
+                 test_pipeline_stops_on_writer_error,
+                 test_pipeline_cancellation_drains_stages, test_resumed_crawl_stops_at_mark):
+        test()
+        print(f"✅ {test.__name__}")
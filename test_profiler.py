@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Test du profilage du scraper (--profile) : flamegraph CPU et rapports mémoire par page."""
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault('DRY_RUN', 'true')
+
+# Ajouter src au path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from parsers import Bs4ResultParser
+from profiler import RunProfiler, SamplingProfiler
+
+FIXTURE = sorted((Path(__file__).parent / 'fixtures').glob('debug_page_*.html'))[0]
+
+
+def _busy_parse(parser, content: str, duration: float):
+    """Parse la page en boucle pendant `duration` secondes (travail CPU échantillonné)."""
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        for heading in parser.find_arrete_headings(content):
+            parser.extract_fields(heading)
+
+
+def test_sampling_profiler():
+    parser = Bs4ResultParser()
+    content = FIXTURE.read_text(encoding='utf-8')
+    sampler = SamplingProfiler(interval=0.002)
+    sampler.start()
+    _busy_parse(parser, content, 0.3)
+    sampler.stop()
+
+    assert sum(sampler.stacks.values()) > 10
+    assert any('test_profiler.py:_busy_parse' in stack for stack in sampler.stacks)
+    # Piles de la racine vers la feuille
+    assert all(not stack.startswith('test_profiler.py:_busy_parse') for stack in sampler.stacks)
+    top = SamplingProfiler.top_functions(sampler.take_window())
+    assert top and abs(sum(entry['share'] for entry in SamplingProfiler.top_functions(sampler.stacks, 1000)) - 1) < 0.01
+    assert not sampler.take_window()
+
+
+def test_run_profiler_reports():
+    parser = Bs4ResultParser()
+    content = FIXTURE.read_text(encoding='utf-8')
+    retained = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_dir = Path(tmp_dir) / 'profile'
+        profiler = RunProfiler(output_dir, interval=0.002)
+        profiler.start()
+        try:
+            for page_num in (1, 2, 3):
+                _busy_parse(parser, content, 0.1)
+                # Allocation qui grossit à chaque page, comme une liste d'arrêtés jamais vidée
+                retained.append(bytearray(512 * 1024))
+                profiler.page_done(page_num, new_arretes=50)
+        finally:
+            profiler.stop()
+
+        pages = [json.loads(line) for line in (output_dir / 'pages.jsonl').read_text(encoding='utf-8').splitlines()]
+        assert [page['page'] for page in pages] == [1, 2, 3]
+        for page in pages:
+            assert page['new_arretes'] == 50
+            assert page['cpu_seconds'] > 0
+            assert page['traced_bytes'] > 0
+            assert page['top_functions']
+            assert any('test_profiler.py' in allocation['site'] and allocation['size_diff'] >= 512 * 1024
+                       for allocation in page['top_allocations']), page['top_allocations']
+
+        folded = (output_dir / 'cpu.folded').read_text(encoding='utf-8').splitlines()
+        assert folded
+        for line in folded:
+            stack, count = line.rsplit(' ', 1)
+            assert stack and int(count) > 0
+        summary = (output_dir / 'summary.txt').read_text(encoding='utf-8')
+        assert '3 pages de résultats' in summary
+        assert 'test_profiler.py' in summary
+
+
+if __name__ == '__main__':
+    for test in (test_sampling_profiler, test_run_profiler_reports):
+        test()
+        print(f"✅ {test.__name__}")
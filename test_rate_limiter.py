@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Test du limiteur adaptatif (AIMD) et du token bucket, avec une horloge simulée."""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault('DRY_RUN', 'true')
+
+# Ajouter src au path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+import rate_limiter
+from rate_limiter import AdaptiveLimiter, TokenBucket
+
+
+class FakeClock:
+    """Remplace time.monotonic et asyncio.sleep : le temps n'avance que par les sleep et advance()."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+    async def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def with_fake_clock(test):
+    """Exécute le test avec l'horloge simulée dans rate_limiter."""
+    def run():
+        clock = FakeClock()
+        real_time, real_sleep = rate_limiter.time, rate_limiter.asyncio.sleep
+        rate_limiter.time = clock
+        rate_limiter.asyncio.sleep = clock.sleep
+        try:
+            test(clock)
+        finally:
+            rate_limiter.time = real_time
+            rate_limiter.asyncio.sleep = real_sleep
+    run.__name__ = test.__name__
+    return run
+
+
+def test_additive_increase_on_success():
+    limiter = AdaptiveLimiter(initial=1, minimum=1, maximum=4, max_rps=0)
+    limiter._on_success(0.1)
+    assert limiter.current_limit == 2
+    # +1 / limite par succès : environ une requête simultanée de plus par fenêtre de requêtes réussies
+    limiter._on_success(0.1)
+    limiter._on_success(0.1)
+    assert limiter.current_limit == 2
+    limiter._on_success(0.1)
+    assert limiter.current_limit == 3
+    for _ in range(50):
+        limiter._on_success(0.1)
+    assert limiter.current_limit == 4 and limiter.limit == 4
+    assert limiter.successes == 54
+
+
+def test_no_increase_when_latency_degrades():
+    limiter = AdaptiveLimiter(initial=2, minimum=1, maximum=8, max_rps=0)
+    limiter._on_success(0.1)
+    limit = limiter.limit
+    # La latence moyenne dépasse deux fois la meilleure latence : la limite ne bouge plus
+    for _ in range(10):
+        limiter._on_success(1.0)
+    assert limiter.avg_latency > limiter.best_latency * limiter.latency_tolerance
+    assert limiter.limit == limit
+
+
+@with_fake_clock
+def test_multiplicative_decrease_on_congestion(clock):
+    limiter = AdaptiveLimiter(initial=8, minimum=2, maximum=8, max_rps=0)
+
+    async def request(status=None, exception=None):
+        async with limiter.acquire() as slot:
+            if exception:
+                raise exception
+            if status in rate_limiter.CONGESTION_STATUSES:
+                slot.congestion(f"HTTP {status}")
+
+    asyncio.run(request(status=429))
+    assert limiter.current_limit == 4
+    # Rafale d'erreurs simultanées : une seule diminution par intervalle de latence
+    asyncio.run(request(status=503))
+    assert limiter.current_limit == 4 and limiter.congestions == 2
+
+    clock.advance(1.5)
+    try:
+        asyncio.run(request(exception=asyncio.TimeoutError()))
+    except asyncio.TimeoutError:
+        pass
+    assert limiter.current_limit == 2
+
+    # Jamais sous le minimum
+    clock.advance(1.5)
+    asyncio.run(request(status=502))
+    assert limiter.current_limit == 2 and limiter.congestions == 4
+    # Un statut normal n'est pas une surcharge
+    asyncio.run(request(status=200))
+    assert limiter.congestions == 4 and limiter.successes == 1
+    assert limiter.in_flight == 0
+
+
+def test_limits_are_bounded():
+    limiter = AdaptiveLimiter(initial=50, minimum=0, maximum=10, max_rps=0)
+    assert (limiter.minimum, limiter.maximum, limiter.current_limit) == (1, 10, 10)
+    limiter = AdaptiveLimiter(initial=1, minimum=3, maximum=2, max_rps=0)
+    assert (limiter.minimum, limiter.maximum, limiter.current_limit) == (3, 3, 3)
+
+
+@with_fake_clock
+def test_token_bucket_refill(clock):
+    bucket = TokenBucket(rate=2, capacity=2)
+
+    async def acquire(count):
+        for _ in range(count):
+            await bucket.acquire()
+
+    # Rafale jusqu'à la capacité, puis un jeton toutes les 1 / rate secondes
+    asyncio.run(acquire(2))
+    assert clock.sleeps == []
+    asyncio.run(acquire(3))
+    assert clock.sleeps == [0.5, 0.5, 0.5]
+
+    # Après une longue pause, le seau ne dépasse pas sa capacité
+    clock.advance(60)
+    clock.sleeps.clear()
+    asyncio.run(acquire(3))
+    assert clock.sleeps == [0.5]
+
+    # Sans plafond de débit, aucune attente
+    unlimited = TokenBucket(rate=0)
+    asyncio.run(unlimited.acquire())
+    assert clock.sleeps == [0.5]
+
+
+if __name__ == '__main__':
+    for test in (test_additive_increase_on_success, test_no_increase_when_latency_degrades,
+                 test_multiplicative_decrease_on_congestion, test_limits_are_bounded, test_token_bucket_refill):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Test de la reclassification vectorisée du CSV contre classify_arrete, ligne par ligne."""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pyarrow as pa
+
+os.environ.setdefault('DRY_RUN', 'true')
+
+# Ajouter src au path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from config import CSV_FILE, classify_arrete, get_classifier
+from csv_io import read_csv_as_strings, write_csv_atomic
+from reclassify import FLAG_COLUMNS, reclassify_table
+
+
+def test_vectorized_matches_classify_arrete():
+    table, _, summary = reclassify_table(read_csv_as_strings(CSV_FILE), get_classifier().keywords)
+    assert table.num_rows > 0
+    for row in table.select(['titre', *FLAG_COLUMNS]).to_pylist():
+        expected = classify_arrete(row['titre'])
+        for name in FLAG_COLUMNS:
+            assert row[name] == str(expected[name]), row['titre']
+    # Le CSV a été écrit avec les mêmes mots-clés
+    assert summary['rows'] == 0
+
+
+def test_case_folding_matches_classify_arrete():
+    # Majuscules dont la minuscule Unicode n'est pas un simple caractère ASCII
+    titles = ["ARRÊTÉ MODIFIANT LA CİRCULATION RUE DE RIVOLI",
+              "Arrêté modifiant le STATIONNEMENT GÊNANT rue d'İéna",
+              "Arrêté À TİTRE PROVİSOİRE réglementant la circulation",
+              "Arrêté instituant la GRATUITÉ du stationnement ẞ"]
+    table = pa.table({'titre': titles, **{name: ['False'] * len(titles) for name in FLAG_COLUMNS}})
+    table, _, _ = reclassify_table(table, get_classifier().keywords)
+    for row in table.to_pylist():
+        expected = classify_arrete(row['titre'])
+        for name in FLAG_COLUMNS:
+            assert row[name] == str(expected[name]), (name, row['titre'])
+
+
+def test_changed_keywords_are_reported():
+    keywords = {**get_classifier().keywords, 'temporaire': []}
+    table = read_csv_as_strings(CSV_FILE)
+    temporaires = table.column('est_temporaire').to_pylist().count('True')
+    updated, changed_rows, summary = reclassify_table(table, keywords)
+
+    assert summary['est_temporaire'] == summary['rows'] == temporaires > 0
+    assert summary['concerne_circulation'] == summary['concerne_stationnement'] == 0
+    assert set(updated.filter(changed_rows).column('est_temporaire').to_pylist()) == {'False'}
+
+
+def test_rewrite_is_byte_identical_when_unchanged():
+    table, _, _ = reclassify_table(read_csv_as_strings(CSV_FILE), get_classifier().keywords)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / 'arretes.csv'
+        write_csv_atomic(table, path)
+        assert path.read_bytes() == CSV_FILE.read_bytes()
+        assert not path.with_name('arretes.csv.tmp').exists()
+
+
+if __name__ == '__main__':
+    for test in (test_vectorized_matches_classify_arrete, test_case_folding_matches_classify_arrete,
+                 test_changed_keywords_are_reported,
+                 test_rewrite_is_byte_identical_when_unchanged):
+        test()
+        print(f"✅ {test.__name__}")
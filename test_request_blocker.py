@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Test de l'interception des requêtes des pages Playwright avec un contexte simulé (sans navigateur)."""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault('DRY_RUN', 'true')
+
+# Ajouter src au path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from request_blocker import ESTIMATED_SIZES, RequestBlocker
+
+BASE = 'https://bovp.apps.paris.fr'
+
+
+class FakeRequest:
+    def __init__(self, url, resource_type):
+        self.url = url
+        self.resource_type = resource_type
+
+
+class FakeRoute:
+    def __init__(self, url, resource_type):
+        self.request = FakeRequest(url, resource_type)
+        self.outcome = None
+
+    async def continue_(self):
+        self.outcome = 'continue'
+
+    async def abort(self, error_code=None):
+        self.outcome = error_code
+
+
+class FakeContext:
+    """BrowserContext minimal : pas d'APIRequestContext, aucune requête ne doit être envoyée au site."""
+
+    def __init__(self):
+        self.routes = []
+
+    async def route(self, pattern, handler):
+        self.routes.append((pattern, handler))
+
+
+def test_should_block():
+    blocker = RequestBlocker(resource_types=('image', 'stylesheet', 'document'), url_patterns=('ajax.php',))
+    assert blocker.should_block('image', f'{BASE}/images/logo.png')
+    assert blocker.should_block('stylesheet', f'{BASE}/styles/common.css')
+    assert blocker.should_block('xhr', f'{BASE}/ajax.php?module=ajax&categ=facettes')
+    assert not blocker.should_block('xhr', f'{BASE}/autre.php')
+    assert not blocker.should_block('script', f'{BASE}/js/pmb.js')
+    # Le document n'est jamais bloqué, même listé ou correspondant à un motif
+    assert not blocker.should_block('document', f'{BASE}/index.php?lvl=search_segment&id=121')
+    assert not blocker.should_block('document', f'{BASE}/ajax.php')
+
+
+def test_handle_and_bytes_saved():
+    context = FakeContext()
+    blocker = RequestBlocker(resource_types=('image', 'stylesheet', 'font'), url_patterns=('cart_info.php',))
+
+    async def load_pages(nb_pages):
+        await blocker.install(context)
+        _, handler = context.routes[0]
+        routes = []
+        for _ in range(nb_pages):
+            page_routes = [
+                FakeRoute(f'{BASE}/index.php?lvl=search_segment&id=121', 'document'),
+                FakeRoute(f'{BASE}/images/logo.png', 'image'),
+                FakeRoute(f'{BASE}/styles/common.css', 'stylesheet'),
+                FakeRoute(f'{BASE}/fonts/inconnue.woff', 'font'),
+                FakeRoute(f'{BASE}/cart_info.php', 'xhr'),
+            ]
+            for route in page_routes:
+                await handler(route)
+            routes.extend(page_routes)
+        return routes
+
+    routes = asyncio.run(load_pages(3))
+
+    assert context.routes[0][0] == '**/*'
+    assert [route.outcome for route in routes[:5]] == ['continue'] + ['blockedbyclient'] * 4
+    assert blocker.blocked_requests == 12
+    assert blocker.blocked == {'image': 3, 'stylesheet': 3, 'font': 3, 'xhr': 3}
+    assert blocker.blocked_urls == {f'{BASE}/images/logo.png', f'{BASE}/styles/common.css',
+                                    f'{BASE}/fonts/inconnue.woff', f'{BASE}/cart_info.php'}
+    # Estimation d'après la taille moyenne de chaque type
+    assert blocker.bytes_saved() == 3 * sum(ESTIMATED_SIZES[t] for t in ('image', 'stylesheet', 'font', 'xhr'))
+    summary = blocker.summary()
+    assert '12 requêtes bloquées' in summary and '210 Ko' in summary and '4 URLs distinctes' in summary
+
+
+if __name__ == '__main__':
+    for test in (test_should_block, test_handle_and_bytes_saved):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""Test de l'inventaire des clés S3 et de l'index des contenus contre un S3 simulé en mémoire (sans réseau)."""
+import asyncio
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+os.environ.setdefault('DRY_RUN', 'true')
+
+# Ajouter src au path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from botocore.exceptions import ClientError, EndpointConnectionError, ReadTimeoutError
+
+from content_index import BUCKET_KEY, ContentIndex
+from s3_uploader import S3Uploader
+
+PDF = b'%PDF-1.4 contenu de test'
+
+
+class FakeBody:
+    def __init__(self, content):
+        self.content = content
+
+    def iter_chunks(self, chunk_size):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+
+class FakeS3Client:
+    """S3 minimal en mémoire : list_objects_v2 paginé, head_object, get_object, upload_fileobj."""
+
+    PAGE_SIZE = 1000
+
+    def __init__(self, keys=(), fail_listing=None):
+        self.objects = {key: b'' for key in keys}
+        self.modified = {}
+        # Exception levée par le listing (None = listing possible)
+        self.fail_listing = fail_listing
+        self.calls = {'list_objects_v2': 0, 'head_object': 0, 'upload_fileobj': 0}
+
+    def get_paginator(self, operation):
+        assert operation == 'list_objects_v2'
+        return self
+
+    def paginate(self, Bucket, Prefix):
+        if self.fail_listing:
+            raise self.fail_listing
+        keys = sorted(k for k in self.objects if k.startswith(Prefix))
+        for start in range(0, max(len(keys), 1), self.PAGE_SIZE):
+            self.calls['list_objects_v2'] += 1
+            page = keys[start:start + self.PAGE_SIZE]
+            yield {'Contents': [{'Key': k, 'Size': len(self.objects[k]),
+                                 'LastModified': self.modified.get(k, datetime(2025, 1, 1))}
+                                for k in page]} if page else {}
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+        return {'Body': FakeBody(self.objects[Key])}
+
+    def head_object(self, Bucket, Key):
+        self.calls['head_object'] += 1
+        if Key not in self.objects:
+            raise ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+        return {}
+
+    def upload_fileobj(self, fileobj, Bucket, Key, ExtraArgs=None, Config=None):
+        self.calls['upload_fileobj'] += 1
+        self.objects[Key] = fileobj.read()
+        self.modified[Key] = datetime(2025, 1, 1) + timedelta(seconds=len(self.objects))
+
+
+class BlockingS3Client(FakeS3Client):
+    """Le listing du préfixe `blocked_prefix` reste bloqué jusqu'à `release`."""
+
+    def __init__(self, keys=(), blocked_prefix=''):
+        super().__init__(keys)
+        self.blocked_prefix = blocked_prefix
+        self.listing_started = threading.Event()
+        self.release = threading.Event()
+
+    def paginate(self, Bucket, Prefix):
+        if Prefix == self.blocked_prefix:
+            self.listing_started.set()
+            assert self.release.wait(timeout=10)
+        yield from super().paginate(Bucket, Prefix)
+
+
+def _upload(uploader, numero, content=PDF):
+    return uploader.upload_pdf(content, numero)
+
+
+def _existing_keys(count, year='2025'):
+    return [S3Uploader.build_s3_key(f"{year} T {i}", f"{i:08x}") for i in range(count)]
+
+
+def test_existence_answered_from_inventory():
+    client = FakeS3Client(_existing_keys(2500))
+    uploader = S3Uploader(s3_client=client, dry_run=False)
+
+    existing_key = _existing_keys(1)[0]
+    assert uploader._file_exists(existing_key)
+    assert not uploader._file_exists(S3Uploader.build_s3_key("2025 T 99999", "ffffffff"))
+    # 2500 clés -> 3 pages de listing pour l'année, aucune requête par PDF
+    assert client.calls == {'list_objects_v2': 3, 'head_object': 0, 'upload_fileobj': 0}
+
+
+def test_upload_updates_inventory():
+    client = FakeS3Client()
+    uploader = S3Uploader(s3_client=client, dry_run=False)
+
+    url = _upload(uploader, "2025 T 1")
+    assert url.startswith(f"s3://{uploader.bucket_name}/arretes/2025/2025_T_1_")
+    # Même contenu : déjà présent dans l'inventaire, ni listing ni upload supplémentaire
+    assert _upload(uploader, "2025 T 1") == url
+    assert client.calls == {'list_objects_v2': 1, 'head_object': 0, 'upload_fileobj': 1}
+
+
+def test_inventory_ttl_refresh():
+    client = FakeS3Client()
+    uploader = S3Uploader(s3_client=client, dry_run=False)
+    uploader.inventory.ttl = 0.05
+
+    key = S3Uploader.build_s3_key("2024 T 7", "0000abcd")
+    assert not uploader._file_exists(key)
+    # Ajout par un autre processus : visible seulement après expiration du TTL
+    client.objects[key] = b''
+    assert not uploader._file_exists(key)
+    time.sleep(0.06)
+    assert uploader._file_exists(key)
+    assert client.calls['list_objects_v2'] == 2
+
+
+def test_listing_runs_outside_lock():
+    existing_key, = _existing_keys(1)
+    client = BlockingS3Client([existing_key], blocked_prefix='arretes/2025/')
+    inventory = S3Uploader(s3_client=client, dry_run=False).inventory
+    results = {}
+
+    def lookup(name, key):
+        results[name] = inventory.contains(key)
+
+    first = threading.Thread(target=lookup, args=('first', existing_key))
+    first.start()
+    assert client.listing_started.wait(timeout=10)
+
+    # Pendant le listing de 2025 : les autres préfixes et les ajouts ne sont pas bloqués
+    other = threading.Thread(target=lookup, args=('other', S3Uploader.build_s3_key("2024 T 1", "0000abcd")))
+    other.start()
+    other.join(timeout=5)
+    assert not other.is_alive() and results['other'] is False
+    uploaded_key = S3Uploader.build_s3_key("2025 T 2", "0000abcd")
+    inventory.add(uploaded_key)
+
+    # Même préfixe : attend le listing en cours au lieu d'en lancer un second
+    second = threading.Thread(target=lookup, args=('second', existing_key))
+    second.start()
+    client.release.set()
+    first.join(timeout=5)
+    second.join(timeout=5)
+
+    assert results['first'] is True and results['second'] is True
+    # La clé ajoutée pendant le listing fait partie de l'inventaire publié
+    assert inventory.contains(uploaded_key)
+    assert client.calls['list_objects_v2'] == 2 and inventory.list_requests == 2
+
+
+def test_dry_run_matches_real_run():
+    keys = _existing_keys(10) + [S3Uploader.build_s3_key("2025 T 3", hashlib.md5(PDF).hexdigest())]
+    real_client, dry_client = FakeS3Client(keys), FakeS3Client(keys)
+    real = S3Uploader(s3_client=real_client, dry_run=False)
+    dry = S3Uploader(s3_client=dry_client, dry_run=True)
+
+    numeros = ["2025 T 3", "2025 T 42", "2025 T 42", "2026 T 1"]
+    assert [_upload(real, n) for n in numeros] == [_upload(dry, n) for n in numeros]
+    # 2 PDFs réellement nouveaux : existant et doublon sont reconnus dans les deux modes
+    assert real_client.calls['upload_fileobj'] == 2
+    assert dry_client.calls['upload_fileobj'] == 0
+    assert real_client.calls['list_objects_v2'] == dry_client.calls['list_objects_v2'] == 2
+
+
+def test_listing_failure_falls_back_to_head_object():
+    key = _existing_keys(1)[0]
+    # Refus d'accès, endpoint injoignable, timeout de lecture
+    for error in (ClientError({'Error': {'Code': 'AccessDenied'}}, 'ListObjectsV2'),
+                  EndpointConnectionError(endpoint_url='https://minio.example.com'),
+                  ReadTimeoutError(endpoint_url='https://minio.example.com')):
+        client = FakeS3Client([key], fail_listing=error)
+        uploader = S3Uploader(s3_client=client, dry_run=False)
+
+        assert uploader._file_exists(key)
+        assert client.calls['head_object'] == 1
+
+
+def _upload_async(uploader, numero, content=PDF):
+    return asyncio.run(uploader.upload_pdf_stream_async(
+        io.BytesIO(content), numero, hashlib.md5(content).hexdigest(), len(content),
+        content_sha256=hashlib.sha256(content).hexdigest()
+    ))
+
+
+def _content_index():
+    index = ContentIndex(':memory:')
+    index.open()
+    return index
+
+
+def test_known_content_becomes_pointer():
+    client = FakeS3Client()
+    uploader = S3Uploader(s3_client=client, dry_run=False, content_index=_content_index())
+
+    url = _upload_async(uploader, "2025 T 100")
+    # Même PDF republié sous un autre numéro : pointeur vers la clé canonique, aucun envoi
+    assert _upload_async(uploader, "2025 T 200") == url
+    assert client.calls['upload_fileobj'] == 1
+    assert uploader.deduplicated == 1
+    # Contenu différent : upload normal
+    assert _upload_async(uploader, "2025 T 200", PDF + b' v2') != url
+    assert client.calls['upload_fileobj'] == 2
+
+
+def _upload_concurrently(uploader, numeros, content=PDF):
+    async def run():
+        return await asyncio.gather(*(uploader.upload_pdf_stream_async(
+            io.BytesIO(content), numero, hashlib.md5(content).hexdigest(), len(content),
+            content_sha256=hashlib.sha256(content).hexdigest()) for numero in numeros))
+    return asyncio.run(run())
+
+
+class FailingUploadS3Client(FakeS3Client):
+    """Le premier upload échoue."""
+
+    def upload_fileobj(self, fileobj, Bucket, Key, ExtraArgs=None, Config=None):
+        if not self.calls['upload_fileobj']:
+            self.calls['upload_fileobj'] += 1
+            raise ClientError({'Error': {'Code': 'InternalError'}}, 'PutObject')
+        super().upload_fileobj(fileobj, Bucket, Key, ExtraArgs, Config)
+
+
+def test_concurrent_identical_content_uploaded_once():
+    client = FakeS3Client()
+    uploader = S3Uploader(s3_client=client, dry_run=False, content_index=_content_index())
+
+    # Même PDF sous trois numéros, uploadés en même temps : un seul envoi, une seule URL
+    urls = _upload_concurrently(uploader, ["2025 T 100", "2025 T 200", "2025 T 300"])
+    assert urls[0].endswith(S3Uploader.build_s3_key("2025 T 100", hashlib.md5(PDF).hexdigest()))
+    assert urls == [urls[0]] * 3
+    assert client.calls['upload_fileobj'] == 1
+    assert uploader.deduplicated == 2 and not uploader._uploads_in_flight
+
+    # Le premier upload échoue : le doublon en attente est envoyé à sa place
+    client = FailingUploadS3Client()
+    uploader = S3Uploader(s3_client=client, dry_run=False, content_index=_content_index())
+    first, second = _upload_concurrently(uploader, ["2025 T 100", "2025 T 200"])
+    assert first is None and second.endswith(S3Uploader.build_s3_key("2025 T 200", hashlib.md5(PDF).hexdigest()))
+    assert client.calls['upload_fileobj'] == 2
+    assert uploader.content_index.get(hashlib.sha256(PDF).hexdigest()) == S3Uploader.build_s3_key(
+        "2025 T 200", hashlib.md5(PDF).hexdigest())
+
+
+def test_dry_run_does_not_register_content():
+    index = _content_index()
+    uploader = S3Uploader(s3_client=FakeS3Client(), dry_run=True, content_index=index)
+
+    _upload_async(uploader, "2025 T 100")
+    assert len(index) == 0
+
+
+def test_content_index_kept_in_bucket():
+    client = FakeS3Client()
+    uploader = S3Uploader(s3_client=client, dry_run=False, content_index=_content_index())
+    url = _upload_async(uploader, "2025 T 100")
+    uploader.save_content_index()
+    assert BUCKET_KEY in client.objects
+
+    # Base locale perdue (nouvelle machine, cache CI expiré) : la copie du bucket est fusionnée
+    # avant la première déduplication
+    uploader = S3Uploader(s3_client=client, dry_run=False, content_index=_content_index())
+    assert _upload_async(uploader, "2025 T 200") == url
+    assert uploader.deduplicated == 1 and uploader.content_index_merged
+    # Rien d'ajouté : la copie du bucket n'est pas réécrite
+    saved = client.objects[BUCKET_KEY]
+    uploader.save_content_index()
+    assert client.objects[BUCKET_KEY] is saved
+
+    _upload_async(uploader, "2025 T 300", PDF + b' v2')
+    uploader.save_content_index()
+    merged = _content_index()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / 'copie.sqlite'
+        assert ContentIndex.download_from_bucket(client, uploader.bucket_name, path)
+        assert merged.merge(path) == 2
+
+
+def test_content_index_not_saved_without_bucket_copy():
+    client = FakeS3Client()
+    client.objects[BUCKET_KEY] = b'pas une base SQLite'
+    uploader = S3Uploader(s3_client=client, dry_run=False, content_index=_content_index())
+
+    # Copie illisible : la déduplication continue avec la base locale, sans écraser la copie
+    assert _upload_async(uploader, "2025 T 100")
+    assert uploader.content_index_merged is False and len(uploader.content_index) == 1
+    uploader.save_content_index()
+    assert client.objects[BUCKET_KEY] == b'pas une base SQLite'
+
+
+def test_content_index_migrated_from_arrete_index():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        legacy = ContentIndex(Path(tmp_dir) / 'arretes_index.sqlite')
+        legacy.open()
+        legacy.add('abc', 'arretes/2025/2025_T_1_abcdef12.pdf', 10, '2025 T 1')
+        legacy.close()
+
+        index = ContentIndex(Path(tmp_dir) / 'pdf_contents.sqlite', legacy_db_path=legacy.db_path)
+        index.open()
+        assert index.get('abc') == 'arretes/2025/2025_T_1_abcdef12.pdf'
+        index.close()
+
+
+def test_rebuild_content_index_from_bucket():
+    client = FakeS3Client()
+    uploader = S3Uploader(s3_client=client, dry_run=False)
+    first_url = _upload_async(uploader, "2025 T 100")
+    _upload_async(uploader, "2025 T 200")  # Même contenu, uploadé plus tard (pas d'index)
+    _upload_async(uploader, "2025 T 300", PDF + b' v2')
+
+    index = _content_index()
+    assert index.rebuild_from_bucket(client, uploader.bucket_name, workers=2) == 3
+    assert len(index) == 2
+    # Le plus ancien des objets identiques est la clé canonique
+    assert f"s3://{uploader.bucket_name}/{index.get(hashlib.sha256(PDF).hexdigest())}" == first_url
+
+
+if __name__ == '__main__':
+    for test in (test_existence_answered_from_inventory, test_upload_updates_inventory,
+                 test_inventory_ttl_refresh, test_listing_runs_outside_lock, test_dry_run_matches_real_run,
+                 test_listing_failure_falls_back_to_head_object, test_known_content_becomes_pointer,
+                 test_concurrent_identical_content_uploaded_once,
+                 test_dry_run_does_not_register_content, test_content_index_kept_in_bucket,
+                 test_content_index_not_saved_without_bucket_copy, test_content_index_migrated_from_arrete_index,
+                 test_rebuild_content_index_from_bucket):
+        test()
+        print(f"✅ {test.__name__}")
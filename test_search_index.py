@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""Test de l'index plein texte (FTS5) : accents, synchronisation incrémentale avec le CSV, texte des PDFs."""
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault('DRY_RUN', 'true')
+
+# Ajouter src au path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from arrete_index import ArreteIndex
+from csv_writer import CsvAppendWriter
+from metrics import Metrics
+from scraper import ArretesScraper
+from search_index import SearchIndex, to_fts_query
+from text_extractor import TextIndex
+
+ROWS = [
+    {'numero_arrete': '2025 T 17714', 'date_publication': '20/10/2025',
+     'titre': "Arrêté n° 2025 T 17714 modifiant, à titre provisoire, le stationnement gênant rue Manin, à Paris 19e.",
+     'autorite_responsable': 'Direction de la Voirie et des Déplacements', 'signataire': 'Jean Dupont'},
+    {'numero_arrete': '2025 T 15835', 'date_publication': '02/09/2025',
+     'titre': "Arrêté n° 2025 T 15835 modifiant la règle du stationnement rue de Rivoli, à Paris 1er.",
+     'autorite_responsable': 'Direction de la Voirie et des Déplacements', 'signataire': 'Hélène Martin'},
+]
+
+
+def _numeros(results):
+    return [result['numero_arrete'] for result in results]
+
+
+def test_accents_are_folded():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = SearchIndex(Path(tmp_dir) / 'index.sqlite', csv_path=None)
+        index.open()
+        index.add_rows(ROWS)
+        assert _numeros(index.search("stationnement genant")) == ['2025 T 17714']
+        assert _numeros(index.search("GÉNANT")) == ['2025 T 17714']
+        assert _numeros(index.search("helene")) == ['2025 T 15835']
+        assert _numeros(index.search("rue de rivoli", phrase=True)) == ['2025 T 15835']
+        assert index.search("rivoli manin") == []
+        assert _numeros(index.search("titre:rivol*", raw=True)) == ['2025 T 15835']
+        # La ponctuation de la saisie ne casse pas la syntaxe FTS5
+        assert len(index.search('n° "2025"')) == 2
+        index.close()
+
+
+def test_to_fts_query():
+    assert to_fts_query('rue  de "Rivoli"') == '"rue" "de" """Rivoli"""'
+    assert to_fts_query('rue de Rivoli', phrase=True) == '"rue de Rivoli"'
+
+
+def test_incremental_sync_with_csv():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = Path(tmp_dir) / 'arretes.csv'
+        writer = CsvAppendWriter(csv_path)
+        writer.open()
+        writer.write_rows(ROWS[:1])
+
+        index = SearchIndex(Path(tmp_dir) / 'index.sqlite', csv_path=csv_path)
+        index.open()
+        index.sync_with_csv()
+        assert len(index) == 1
+
+        writer.write_rows(ROWS[1:])
+        writer.close()
+        index.sync_with_csv()
+        assert len(index) == 2
+        assert _numeros(index.search("rivoli")) == ['2025 T 15835']
+        index.close()
+
+
+def test_csv_rewritten_outside_is_reindexed():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = Path(tmp_dir) / 'arretes.csv'
+        writer = CsvAppendWriter(csv_path)
+        writer.open()
+        writer.write_rows(ROWS)
+        writer.close()
+
+        index = ArreteIndex(Path(tmp_dir) / 'index.sqlite', csv_path=csv_path)
+        index.open()
+        index.sync_with_csv()
+        search_index = SearchIndex(Path(tmp_dir) / 'index.sqlite', csv_path=csv_path)
+        search_index.open()
+        search_index.sync_with_csv()
+
+        # Édition manuelle de même taille : un numéro corrigé
+        size = csv_path.stat().st_size
+        csv_path.write_bytes(csv_path.read_bytes().replace(b'2025 T 15835', b'2025 T 15836'))
+        assert csv_path.stat().st_size == size
+        index.sync_with_csv()
+        search_index.sync_with_csv()
+        assert '2025 T 15836' in index and '2025 T 15835' not in index
+        assert _numeros(search_index.search("rivoli")) == ['2025 T 15836']
+
+        # Réécriture plus grande (numéro corrigé et ligne ajoutée) : pas seulement un ajout en fin de fichier
+        csv_path.write_bytes(csv_path.read_bytes().replace(b'2025 T 17714', b'2025 T 17715'))
+        writer = CsvAppendWriter(csv_path)
+        writer.open()
+        writer.write_rows([{**ROWS[0], 'numero_arrete': '2025 T 17716'}])
+        writer.close()
+        index.sync_with_csv()
+        search_index.sync_with_csv()
+        assert len(index) == 3 and '2025 T 17714' not in index
+        assert sorted(_numeros(search_index.search("manin"))) == ['2025 T 17715', '2025 T 17716']
+        index.close()
+        search_index.close()
+
+
+def test_pdf_text_is_searchable():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        text_db_path = Path(tmp_dir) / 'texts.sqlite'
+        index = SearchIndex(Path(tmp_dir) / 'index.sqlite', csv_path=None, text_db_path=text_db_path)
+        index.open()
+        # Base des textes créée après l'ouverture de l'index plein texte : attachée au premier besoin
+        texts = TextIndex(text_db_path)
+        texts.open()
+
+        # Texte extrait avant la sauvegarde du CSV : repris lors de l'indexation de la ligne
+        texts.add('2025 T 17714', "Considérant les travaux de la société Éiffage", 1)
+        index.add_rows(ROWS)
+        assert _numeros(index.search("eiffage")) == ['2025 T 17714']
+
+        # Texte extrait après : ajouté à la ligne déjà indexée
+        index.set_text('2025 T 15835', "Considérant le marché de Noël")
+        assert _numeros(index.search("noel")) == ['2025 T 15835']
+        assert _numeros(index.search("texte:eiffage", raw=True)) == ['2025 T 17714']
+
+        index.close()
+        texts.close()
+
+
+def test_texts_migrated_from_arrete_index():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        legacy_path = Path(tmp_dir) / 'index.sqlite'
+        legacy = TextIndex(legacy_path)
+        legacy.open()
+        legacy.add('2025 T 17714', "Considérant les travaux de la société Éiffage", 1)
+        legacy.close()
+
+        texts = TextIndex(Path(tmp_dir) / 'texts.sqlite', legacy_db_path=legacy_path)
+        texts.open()
+        assert texts.get('2025 T 17714') == "Considérant les travaux de la société Éiffage"
+        texts.close()
+
+        # L'ancienne table, restée dans la base de l'index, n'est plus lue par l'index plein texte
+        index = SearchIndex(legacy_path, csv_path=None, text_db_path=texts.db_path)
+        index.open()
+        index.conn.execute("UPDATE arrete_texts SET text = 'ancien texte'")
+        index.conn.commit()
+        index.add_rows(ROWS)
+        assert _numeros(index.search("eiffage")) == ['2025 T 17714']
+        assert index.search("ancien") == []
+        index.close()
+
+
+def test_indexing_failure_releases_the_database():
+    """Un échec de l'indexation plein texte ne laisse pas de transaction ouverte sur la base partagée."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = Path(tmp_dir) / 'index.sqlite'
+        scraper = ArretesScraper.__new__(ArretesScraper)
+        scraper.metrics = Metrics()
+        scraper.parquet_store = None
+        scraper._parquet_pending = False
+        scraper.csv_writer = CsvAppendWriter(Path(tmp_dir) / 'arretes.csv')
+        scraper.csv_writer.open()
+        scraper.index = ArreteIndex(db_path, scraper.csv_writer.path)
+        scraper.index.open()
+        scraper.search_index = SearchIndex(db_path, scraper.csv_writer.path)
+        scraper.search_index.open()
+
+        add_rows = scraper.search_index.add_rows
+
+        def failing_add_rows(rows, commit=True):
+            # Échec après avoir commencé à écrire (transaction ouverte)
+            add_rows(rows, commit=False)
+            raise RuntimeError("disque plein")
+
+        scraper.search_index.add_rows = failing_add_rows
+        try:
+            scraper.new_arretes = [ROWS[0]]
+            asyncio.run(scraper._save_to_csv())
+            assert scraper.search_index is None
+
+            # Les écritures des autres connexions à la base ne sont pas bloquées
+            scraper.index.conn.execute("PRAGMA busy_timeout = 100")
+            scraper.new_arretes = [ROWS[1]]
+            asyncio.run(scraper._save_to_csv())
+            assert '2025 T 15835' in scraper.index
+        finally:
+            scraper.index.close()
+            scraper.csv_writer.close()
+
+        # Le lot non indexé est rattrapé au démarrage suivant
+        index = SearchIndex(db_path, scraper.csv_writer.path)
+        index.open()
+        index.sync_with_csv()
+        assert _numeros(index.search("manin")) == ['2025 T 17714']
+        index.close()
+
+
+def test_index_recovery_keeps_the_database():
+    """Un index des arrêtés illisible est recréé depuis le CSV sans supprimer la base ni ses autres tables."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = Path(tmp_dir) / 'index.sqlite'
+        writer = CsvAppendWriter(Path(tmp_dir) / 'arretes.csv')
+        writer.open()
+        writer.write_rows(ROWS)
+        writer.close()
+
+        search_index = SearchIndex(db_path, writer.path)
+        search_index.open()
+        search_index.sync_with_csv()
+        # Table des arrêtés d'un schéma incompatible : l'ouverture de l'index échoue
+        search_index.conn.execute("CREATE TABLE arretes (autre TEXT)")
+        search_index.conn.commit()
+        inode = db_path.stat().st_ino
+
+        scraper = ArretesScraper.__new__(ArretesScraper)
+        scraper.index = ArreteIndex(db_path, writer.path)
+        scraper._load_existing_arretes()
+        try:
+            assert len(scraper.index) == 2 and '2025 T 17714' in scraper.index
+        finally:
+            scraper.index.close()
+
+        assert db_path.stat().st_ino == inode
+        # L'index plein texte est toujours là, et se resynchronise (meta recréée)
+        assert _numeros(search_index.search("manin")) == ['2025 T 17714']
+        search_index.sync_with_csv()
+        assert len(search_index) == 2
+        search_index.close()
+
+
+if __name__ == '__main__':
+    for test in (test_accents_are_folded, test_to_fts_query, test_incremental_sync_with_csv,
+                 test_csv_rewritten_outside_is_reindexed, test_pdf_text_is_searchable, test_texts_migrated_from_arrete_index,
+                 test_indexing_failure_releases_the_database,
+                 test_index_recovery_keeps_the_database):
+        test()
+        print(f"✅ {test.__name__}")
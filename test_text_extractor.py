@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Test de l'extraction du texte des PDFs (pool de processus) et du backfill depuis un S3 simulé."""
+import asyncio
+import csv
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault('DRY_RUN', 'true')
+
+# Ajouter src au path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from config import CSV_COLUMNS
+from search_index import SearchIndex
+from text_extractor import TextExtractor, TextIndex, backfill_from_s3, extract_text
+
+
+def make_pdf(text: str) -> bytes:
+    """PDF minimal d'une page contenant `text` (police standard Helvetica)."""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode('latin-1')
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return pdf
+
+
+class FakeS3Client:
+    """get_object sur un dictionnaire clé -> contenu."""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.reads = []
+
+    def get_object(self, Bucket, Key):
+        self.reads.append(Key)
+        return {'Body': io.BytesIO(self.objects[Key])}
+
+
+def test_extract_text():
+    text, pages = extract_text(make_pdf("Arrete 2025 T 17858 rue de Rivoli"))
+    assert pages == 1
+    assert "rue de Rivoli" in text
+
+
+def test_extract_async_in_process_pool():
+    extractor = TextExtractor(workers=2)
+    try:
+        async def run():
+            return await asyncio.gather(
+                extractor.extract_async(make_pdf("premier"), '2025 T 1'),
+                extractor.extract_async(b'pas un PDF', '2025 T 2'),
+            )
+        ok, failed = asyncio.run(run())
+    finally:
+        extractor.close()
+    assert "premier" in ok[0]
+    assert failed is None
+    assert (extractor.extracted, extractor.failed) == (1, 1)
+
+
+def test_backfill_from_s3():
+    objects = {
+        'arretes/2025/2025_T_1_aaaa.pdf': make_pdf("texte un"),
+        'arretes/2025/2025_T_2_bbbb.pdf': make_pdf("texte deux"),
+    }
+    rows = [
+        {'numero_arrete': '2025 T 1', 'pdf_s3_url': 's3://bucket/arretes/2025/2025_T_1_aaaa.pdf'},
+        {'numero_arrete': '2025 T 2', 'pdf_s3_url': 's3://bucket/arretes/2025/2025_T_2_bbbb.pdf'},
+        # Même PDF republié sous un autre numéro : lu une seule fois
+        {'numero_arrete': '2025 T 3', 'pdf_s3_url': 's3://bucket/arretes/2025/2025_T_2_bbbb.pdf'},
+        {'numero_arrete': '2025 T 4', 'pdf_s3_url': 'ERROR: PDF non téléchargé'},
+    ]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = Path(tmp_dir) / 'arretes.csv'
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, restval='')
+            writer.writeheader()
+            writer.writerows(rows)
+
+        index = TextIndex(Path(tmp_dir) / 'texts.sqlite')
+        index.open()
+        index.add('2025 T 1', 'déjà extrait', 1)
+        search_index = SearchIndex(Path(tmp_dir) / 'index.sqlite', csv_path=csv_path, text_db_path=index.db_path)
+        search_index.open()
+        search_index.sync_with_csv()
+        s3_client = FakeS3Client(objects)
+        extractor = TextExtractor(workers=2)
+        try:
+            processed = backfill_from_s3(index, extractor, s3_client, 'bucket', csv_path=csv_path,
+                                         search_index=search_index)
+        finally:
+            extractor.close()
+
+        assert processed == 1
+        assert s3_client.reads == ['arretes/2025/2025_T_2_bbbb.pdf']
+        assert index.get('2025 T 1') == 'déjà extrait'
+        assert "texte deux" in index.get('2025 T 2')
+        assert index.get('2025 T 3') == index.get('2025 T 2')
+        assert '2025 T 4' not in index
+        # Le texte extrait est recherchable sans reconstruire l'index plein texte
+        found = [row['numero_arrete'] for row in search_index.search('texte:deux', raw=True)]
+        assert sorted(found) == ['2025 T 2', '2025 T 3']
+        search_index.close()
+        index.close()
+
+
+if __name__ == '__main__':
+    for test in (test_extract_text, test_extract_async_in_process_pool, test_backfill_from_s3):
+        test()
+        print(f"✅ {test.__name__}")